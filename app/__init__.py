@@ -32,6 +32,10 @@ def create_app() -> Flask:
         app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
         app.config["SECRET_KEY"] = "dev-secret"
 
+    # Jinja: bytecode en disco (se debe fijar antes del primer uso de app.jinja_env)
+    from app.utils.templates import bytecode_cache, precompilar_templates
+    app.jinja_options = {**app.jinja_options, "bytecode_cache": bytecode_cache(app)}
+
     # Extensiones
     db.init_app(app)
     migrate.init_app(app, db)
@@ -46,6 +50,10 @@ def create_app() -> Flask:
 
     from app.models import User
 
+    # Folios cerrados archivados: ATTACH (SQLite) y sesión de lectura por request
+    from app.services import archivo
+    archivo.init_app(app)
+
     @login_manager.user_loader
     def load_user(user_id: str):
         try:
@@ -56,23 +64,40 @@ def create_app() -> Flask:
     # Filtro jinja: |loads
     @app.template_filter("loads")
     def _json_loads_filter(s):
+        if isinstance(s, (list, dict)):  # columnas db.JSON ya vienen decodificadas
+            return s
         try:
             return json.loads(s) if s else []
         except Exception:
             return []
 
+    # Versión para los ETags (DEPLOY_ID o hash del código), calculada una vez
+    from app.utils import http
+    http.init_app(app)
+
+    # Assets con hash: {{ asset_url('js/archivo.js') }}
+    from app.utils.assets import asset_url
+    app.jinja_env.globals["asset_url"] = asset_url
+
     # Blueprints
     from app.routes.auth import bp as auth_bp
     from app.routes.ventas import bp as ventas_bp
     from app.routes.pricing import bp as pricing_bp
+    from app.routes.assets import bp as assets_bp
+    from app.routes.api import bp as api_bp
 
     app.register_blueprint(auth_bp)          # asumiendo que auth_bp ya trae su url_prefix (p.ej. "/auth")
     app.register_blueprint(ventas_bp)        # si ventas_bp NO tiene url_prefix, cámbialo a: url_prefix="/ventas"
     app.register_blueprint(pricing_bp)       # NO pasar url_prefix aquí: ya está en el blueprint
+    app.register_blueprint(assets_bp)
+    app.register_blueprint(api_bp)           # /api/v1, auth por token (sin sesión)
 
     
     # CLI
     from app.cli import register_cli
     register_cli(app)
 
+    if app.config.get("JINJA_PRECOMPILAR"):
+        precompilar_templates(app)
+
     return app
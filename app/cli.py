@@ -4,7 +4,9 @@ import click
 from decimal import Decimal
 
 from app import db
-from app.models import Concepto
+from app.models import ApiToken, Cliente, Concepto, SerieAnual, Solicitud, User
+from app.utils.normaliza import clave_cliente
+from sqlalchemy import extract, func, select, text, update
 from pathlib import Path
 
 def _read_lines_any_encoding(path_str: str) -> list[str]:
@@ -134,3 +136,347 @@ def register_cli(app):
 
             db.session.commit()
             click.echo(f"Catálogo importado. Nuevos: {added}, Actualizados: {updated}")
+
+
+        @app.cli.command("verificar_series")
+        @click.option("--corregir", is_flag=True,
+                    help="Sube los contadores que estén por debajo del conteo real.")
+        def verificar_series_cmd(corregir):
+            """
+            Compara los contadores de serie_anual contra el conteo real de
+            solicitudes por año. Un contador menor al conteo repetiría series.
+            """
+            anio = extract("year", Solicitud.fecha_solicitud)
+            reales = {
+                int(a): int(n)
+                for a, n in db.session.execute(
+                    select(anio, func.count()).group_by(anio)
+                ).all()
+                if a is not None
+            }
+            contadores = {c.anio: c for c in SerieAnual.query.all()}
+
+            atrasados = 0
+            for a in sorted(set(reales) | set(contadores)):
+                real = reales.get(a, 0)
+                c = contadores.get(a)
+                ultimo = c.ultimo if c else 0
+                if ultimo == real:
+                    click.echo(f"{a}: OK ({ultimo})")
+                    continue
+                estado = "ATRASADO" if ultimo < real else "adelantado"
+                click.echo(f"{a}: {estado} contador={ultimo} solicitudes={real}")
+                if ultimo < real:
+                    atrasados += 1
+                    if corregir:
+                        if c is None:
+                            db.session.add(SerieAnual(anio=a, ultimo=real))
+                        else:
+                            c.ultimo = real
+
+            if corregir and atrasados:
+                db.session.commit()
+                click.echo(f"Contadores corregidos: {atrasados}")
+            elif atrasados:
+                raise click.ClickException(f"{atrasados} contador(es) por debajo del conteo real.")
+
+
+        @app.cli.command("deduplicar_clientes")
+        @click.option("--fusionar", is_flag=True,
+                    help="Junta cada grupo en el cliente más antiguo y re-apunta sus solicitudes.")
+        def deduplicar_clientes_cmd(fusionar):
+            """
+            Reporta clientes duplicados por clave normalizada (clave_cliente) y,
+            con --fusionar, los junta. Úsalo una vez después de la migración de nombre_norm.
+            """
+            grupos: dict[str, list[Cliente]] = {}
+            for c in Cliente.query.order_by(Cliente.id.asc()):
+                grupos.setdefault(clave_cliente(c.nombre), []).append(c)
+
+            dups = {k: v for k, v in grupos.items() if len(v) > 1}
+            for clave, clientes in dups.items():
+                nombres = " | ".join(f"#{c.id} {c.nombre}" for c in clientes)
+                click.echo(f"[{clave}] {nombres}")
+            click.echo(f"Grupos duplicados: {len(dups)}")
+            if not fusionar:
+                return
+
+            fusionados = 0
+            for clave, clientes in dups.items():
+                # se queda el que ya tiene la clave (backfill) o el más antiguo
+                keep = next((c for c in clientes if c.nombre_norm == clave), clientes[0])
+                otros = [c.id for c in clientes if c.id != keep.id]
+                db.session.execute(
+                    update(Solicitud)
+                    .where(Solicitud.cliente_id.in_(otros))
+                    .values(cliente_id=keep.id)
+                    .execution_options(synchronize_session=False)
+                )
+                for c in clientes:
+                    if c.id != keep.id:
+                        db.session.delete(c)
+                        fusionados += 1
+                db.session.flush()
+                keep.nombre_norm = clave
+
+            # claves que quedaron en NULL sin duplicado
+            for clave, clientes in grupos.items():
+                if len(clientes) == 1 and clientes[0].nombre_norm != clave:
+                    clientes[0].nombre_norm = clave
+
+            db.session.commit()
+            click.echo(f"Clientes fusionados: {fusionados}")
+
+
+        @app.cli.command("build_assets")
+        def build_assets_cmd():
+            """
+            Genera app/static/dist: JS/CSS con hash en el nombre, variantes .gz/.br
+            y manifest.json (lo usa asset_url). Correr en cada deploy.
+            """
+            from app.utils.assets import build
+
+            manifest = build(Path(app.static_folder))
+            for src, dst in manifest.items():
+                click.echo(f"{src} -> {dst}")
+            click.echo(f"Assets: {len(manifest)}")
+
+
+        @app.cli.command("bench_templates")
+        @click.option("--repeticiones", default=5, show_default=True, help="Entornos nuevos por medición.")
+        def bench_templates_cmd(repeticiones):
+            """
+            Primer get_template() en un entorno nuevo (como un worker recién levantado):
+            sin caché de bytecode vs con la caché ya poblada.
+            """
+            import tempfile
+            import time
+            from jinja2 import FileSystemBytecodeCache
+
+            grandes = ("Ventas/nueva_solicitud.html", "Pricing/cotizar.html", "Ventas/opciones.html")
+
+            def primer_carga(nombre, cache):
+                env = app.create_jinja_environment()
+                env.bytecode_cache = cache
+                t0 = time.perf_counter()
+                env.get_template(nombre)
+                return (time.perf_counter() - t0) * 1000
+
+            with tempfile.TemporaryDirectory() as tmp:
+                cache = FileSystemBytecodeCache(tmp)
+                total_sin = total_con = 0.0
+                click.echo(f"{'template':<32} {'sin caché':>12} {'con caché':>12}")
+                for nombre in app.jinja_env.list_templates(extensions=("html",)):
+                    sin = min(primer_carga(nombre, None) for _ in range(repeticiones))
+                    primer_carga(nombre, cache)  # puebla la caché
+                    con = min(primer_carga(nombre, cache) for _ in range(repeticiones))
+                    total_sin += sin
+                    total_con += con
+                    if nombre in grandes:
+                        click.echo(f"{nombre:<32} {sin:>10.2f}ms {con:>10.2f}ms")
+                click.echo(f"{'TODOS':<32} {total_sin:>10.2f}ms {total_con:>10.2f}ms")
+
+
+        @app.cli.command("import_budget")
+        @click.option("--max-ms", default=1500, show_default=True, type=int,
+                      help="Tiempo máximo de import de create_app().")
+        @click.option("--top", default=10, show_default=True, type=int, help="Módulos más pesados a mostrar.")
+        def import_budget_cmd(max_ms, top):
+            """
+            Mide `python -X importtime` de create_app() en un proceso nuevo y falla si
+            pasa de --max-ms o si se importó alguna dependencia pesada (deben ser diferidas).
+            """
+            import subprocess
+            import sys
+
+            pesadas = ("weasyprint", "numpy", "openpyxl", "boto3", "brotli")
+            proc = subprocess.run(
+                [sys.executable, "-X", "importtime", "-c", "from app import create_app; create_app()"],
+                capture_output=True, text=True, cwd=Path(app.root_path).parent,
+            )
+            if proc.returncode != 0:
+                raise click.ClickException(f"create_app() falló:\n{proc.stderr[-2000:]}")
+
+            # import time: self [us] | cumulative | imported package
+            modulos = []
+            for line in proc.stderr.splitlines():
+                if not line.startswith("import time:") or "cumulative" in line:
+                    continue
+                _, acumulado, nombre = line[len("import time:"):].split("|")
+                modulos.append((int(acumulado), nombre.rstrip(), nombre.strip()))
+            total_ms = sum(us for us, crudo, _ in modulos if not crudo.startswith("  ")) / 1000
+
+            for us, crudo, _ in sorted((m for m in modulos if not m[1].startswith("  ")), reverse=True)[:top]:
+                click.echo(f"{us / 1000:>9.1f}ms  {crudo.strip()}")
+            click.echo(f"Total: {total_ms:.1f}ms (límite {max_ms}ms)")
+
+            cargadas = sorted({n.split(".")[0] for _, _, n in modulos if n.split(".")[0] in pesadas})
+            if cargadas:
+                raise click.ClickException("Se importan al arrancar: " + ", ".join(cargadas))
+            if total_ms > max_ms:
+                raise click.ClickException(f"El arranque pasó el presupuesto: {total_ms:.1f}ms > {max_ms}ms")
+
+
+        @app.cli.command("crear_token_api")
+        @click.option("--nombre", required=True, help="Para quién es el token (p.ej. 'BI Tableau').")
+        @click.option("--usuario", "email", default=None, help="Email del usuario responsable (opcional).")
+        def crear_token_api_cmd(nombre, email):
+            """Crea un token de sólo lectura para /api/v1 y lo muestra una sola vez."""
+            import secrets
+
+            usuario = None
+            if email:
+                usuario = User.query.filter_by(email=email.strip().lower()).first()
+                if not usuario:
+                    raise click.ClickException(f"No existe el usuario {email}.")
+
+            token = secrets.token_urlsafe(32)
+            db.session.add(ApiToken(nombre=nombre.strip(), token_hash=ApiToken.hash_de(token),
+                                    scope="read", usuario_id=usuario.id if usuario else None))
+            db.session.commit()
+            click.echo(f"Token para '{nombre}' (guárdalo, no se vuelve a mostrar):")
+            click.echo(token)
+
+
+        @app.cli.command("revocar_token_api")
+        @click.argument("token_id", type=int)
+        def revocar_token_api_cmd(token_id):
+            """Desactiva un token de /api/v1 por id."""
+            tok = db.session.get(ApiToken, token_id)
+            if not tok:
+                raise click.ClickException(f"No existe el token {token_id}.")
+            tok.activo = False
+            db.session.commit()
+            click.echo(f"Token {token_id} ({tok.nombre}) revocado.")
+
+
+        @app.cli.command("exportar_solicitudes")
+        @click.option("--salida", required=True, type=click.Path(dir_okay=False), help="Archivo .csv o .xlsx")
+        @click.option("--mes", default=None, help="YYYY-MM (mes completo).")
+        @click.option("--desde", default=None, help="YYYY-MM-DD (incluido).")
+        @click.option("--hasta", default=None, help="YYYY-MM-DD (excluido).")
+        def exportar_solicitudes_cmd(salida, mes, desde, hasta):
+            """
+            Extracto de solicitudes con sus opciones y la decisión de venta
+            (venta_total, profit_total, margen_pct). Formato según la extensión de --salida.
+            """
+            import shutil
+            from app.services import exportar
+
+            try:
+                ini, fin = exportar.rango_fechas(mes, desde, hasta)
+            except ValueError as e:
+                raise click.ClickException(f"Fecha inválida: {e}")
+
+            n = 0
+
+            def contadas(rows):
+                nonlocal n
+                for r in rows:
+                    n += 1
+                    yield r
+
+            rows = contadas(exportar.filas(ini, fin))
+            if salida.lower().endswith(".xlsx"):
+                try:
+                    tmp = exportar.xlsx_archivo(rows)
+                except ValueError as e:
+                    raise click.ClickException(str(e))
+                with tmp, open(salida, "wb") as out:
+                    shutil.copyfileobj(tmp, out)
+            else:
+                with open(salida, "wb") as out:
+                    for chunk in exportar.csv_chunks(rows):
+                        out.write(chunk)
+            click.echo(f"Filas exportadas: {n} -> {salida}")
+
+
+        @app.cli.command("reconstruir_rollups")
+        def reconstruir_rollups_cmd():
+            """Recalcula venta_rollup_diario desde cero (última decisión de cada solicitud)."""
+            from app.services import rollups
+
+            n = rollups.reconstruir()
+            db.session.commit()
+            click.echo(f"Rollup reconstruido: {n} filas.")
+
+
+        @app.cli.command("reconstruir_sla")
+        def reconstruir_sla_cmd():
+            """Recalcula sla_histograma desde solicitud_evento (tiempos en cada estatus)."""
+            from app.services import sla
+
+            n = sla.reconstruir()
+            db.session.commit()
+            click.echo(f"Histograma SLA reconstruido: {n} filas.")
+
+
+        @app.cli.command("archivar")
+        @click.option("--meses", type=int, default=None, help="Antigüedad mínima (por defecto ARCHIVO_MESES).")
+        @click.option("--lote", type=int, default=200, show_default=True, help="Folios por transacción.")
+        @click.option("--max-lotes", type=int, default=None, help="Detenerse tras N lotes.")
+        @click.option("--vacuum", is_flag=True, help="VACUUM al terminar (SQLite) para recuperar espacio.")
+        def archivar_cmd(meses, lote, max_lotes, vacuum):
+            """
+            Mueve al archivo los folios con todas sus hijas ganada/perdida/cerrada y sin cambios
+            en --meses meses, con opciones, ítems, decisiones y tarifas históricas.
+            """
+            from app.services import archivo
+
+            meses = meses if meses is not None else app.config.get("ARCHIVO_MESES", 12)
+            totales = archivo.archivar(meses, lote=lote, max_lotes=max_lotes)
+            for tabla, n in totales.items():
+                click.echo(f"{tabla:22} {n}")
+            if vacuum and db.engine.dialect.name == "sqlite":
+                with db.engine.connect() as conn:
+                    conn.execution_options(isolation_level="AUTOCOMMIT").execute(text("VACUUM main"))
+                click.echo("VACUUM listo.")
+
+
+        @app.cli.command("migrar_pdfs")
+        @click.option("--lote", type=int, default=200, show_default=True, help="Decisiones por commit.")
+        @click.option("--borrar", is_flag=True, help="Borrar el archivo original una vez copiado.")
+        def migrar_pdfs_cmd(lote, borrar):
+            """
+            Copia al almacén (STORAGE_BACKEND) los PDFs guardados con ruta absoluta y deja en
+            venta_decision.pdf_path la clave relativa. Se puede correr varias veces.
+            """
+            import os
+            from app.models import VentaDecision
+            from app.utils.storage import almacen
+
+            alm = almacen()
+            base = Path(app.instance_path).resolve()
+            movidos = faltantes = 0
+            ultimo = 0
+            while True:
+                decs = db.session.scalars(
+                    select(VentaDecision)
+                    .where(VentaDecision.id > ultimo, VentaDecision.pdf_path.isnot(None))
+                    .order_by(VentaDecision.id)
+                    .limit(lote)
+                ).all()
+                if not decs:
+                    break
+                ultimo = decs[-1].id
+                copiados = []
+                for dec in decs:
+                    if not os.path.isabs(dec.pdf_path):
+                        continue
+                    origen = Path(dec.pdf_path)
+                    if not origen.is_file():
+                        faltantes += 1
+                        continue
+                    try:
+                        clave = origen.resolve().relative_to(base).as_posix()
+                    except ValueError:
+                        clave = f"cotizaciones/legado/dec{dec.id}/{origen.name}"
+                    alm.guardar(clave, origen.read_bytes())
+                    dec.pdf_path = clave
+                    copiados.append(origen)
+                db.session.commit()
+                movidos += len(copiados)
+                if borrar:
+                    for origen in copiados:
+                        origen.unlink(missing_ok=True)
+            click.echo(f"PDFs movidos al almacén: {movidos}. Sin archivo en disco: {faltantes}.")
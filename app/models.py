@@ -1,14 +1,21 @@
 from __future__ import annotations
 
-from datetime import datetime
+from datetime import date, datetime
 import enum
-from sqlalchemy import Enum, ForeignKey, func, Numeric
+import hashlib
+from sqlalchemy import Enum, ForeignKey, event, func, Numeric, select
 from sqlalchemy.orm import relationship, Mapped, mapped_column
 from flask_login import UserMixin
 from app import db, bcrypt
+from app.utils.normaliza import CAMPOS_RUTA, clave_cliente, clave_ruta
 from decimal import Decimal
 
 
+# Tablas que app.services.archivo mueve al archivo: en SQLite, AUTOINCREMENT para que
+# la base activa nunca vuelva a asignar un id que ya está archivado
+SIN_REUSO_IDS = {"sqlite_autoincrement": True}
+
+
 # ---------- Enums ----------
 class ItemTipo(enum.Enum):
     ORIGEN = "Origen"
@@ -50,8 +57,15 @@ class Cliente(db.Model):
 
     id: Mapped[int] = mapped_column(primary_key=True)
     nombre: Mapped[str] = mapped_column(db.String(200), unique=True, nullable=False)
+    # clave_cliente(nombre): búsqueda exacta por índice y sin duplicados "ACME SA" / "Acme S.A."
+    nombre_norm: Mapped[str | None] = mapped_column(db.String(200), unique=True, index=True)
     activo: Mapped[bool] = mapped_column(db.Boolean, nullable=False, default=True)
 
+    @db.validates("nombre")
+    def _sync_nombre_norm(self, key, value):
+        self.nombre_norm = clave_cliente(value)
+        return value
+
 
 class Solicitud(db.Model):
     __tablename__ = "solicitud"
@@ -59,18 +73,19 @@ class Solicitud(db.Model):
     
     @property
     def tipo_servicio_resumen(self) -> str | None:
-        sv = self.servicios.order_by(SolicitudServicio.id.asc()).first()
-        return sv.tipo_servicio.value if sv else None
+        return self.tipo_servicio.value if self.tipo_servicio else None
 
     @property
     def modalidad_resumen(self) -> str | None:
-        sv = self.servicios.order_by(SolicitudServicio.id.asc()).first()
-        return sv.modalidad.value if sv and sv.modalidad else None
+        return self.modalidad.value if self.modalidad else None
 
 
     id: Mapped[int] = mapped_column(primary_key=True)
     fecha_solicitud: Mapped[datetime] = mapped_column(db.DateTime, nullable=False, default=func.now())
+    updated_at: Mapped[datetime] = mapped_column(db.DateTime, nullable=False, default=func.now(), onupdate=func.now())
     numero_serie: Mapped[str] = mapped_column(db.String(32), nullable=False, index=True, unique=True)
+    # Serie anual Q####YYYY (contador serie_anual, app.services.solicitudes)
+    numero_serie_anual: Mapped[str | None] = mapped_column(db.String(16), index=True, unique=True)
     usuario_id: Mapped[int] = mapped_column(ForeignKey("usuario.id"), nullable=False)
 
     departamento: Mapped[str] = mapped_column(db.String(2), nullable=False, default="C")
@@ -141,16 +156,28 @@ class Solicitud(db.Model):
     alto_dim: Mapped[float | None] = mapped_column(db.Float)
     peso_dim: Mapped[float | None] = mapped_column(db.Float)
 
-    # JSONs
-    totales_json: Mapped[str | None] = mapped_column(db.Text)
-    dimensiones_json: Mapped[str | None] = mapped_column(db.Text)
+    # JSONs (captura original; los renglones consultables viven en SolicitudPieza)
+    totales_json: Mapped[list | None] = mapped_column(db.JSON)
+    dimensiones_json: Mapped[list | None] = mapped_column(db.JSON)
 
     # Auditoría / estado
-    servicios_solicitados: Mapped[str] = mapped_column(db.Text, nullable=False, default="[]")  # json str
+    servicios_solicitados: Mapped[list] = mapped_column(db.JSON, nullable=False, default=list)
     comentarios: Mapped[str | None] = mapped_column(db.Text)
     asunto_email: Mapped[str | None] = mapped_column(db.String(200))
     estatus: Mapped[str] = mapped_column(db.String(40), nullable=False, default="pendiente", index=True)
 
+    # Copia del único SolicitudServicio (se sincroniza al escribir) para filtrar sin JOIN
+    tipo_servicio: Mapped[TipoServicio | None] = mapped_column(Enum(TipoServicio, name="tipo_servicio_enum"), index=True)
+    modalidad: Mapped[Modalidad | None] = mapped_column(Enum(Modalidad, name="modalidad_enum"), index=True)
+
+    # clave_ruta(): misma ruta/modo -> misma clave; con fecha_solicitud para "recientes en la ruta"
+    lane_key: Mapped[str | None] = mapped_column(db.String(40))
+
+    # Cola de pricing (app.services.cola): quién la tomó y hasta cuándo
+    asignado_a_id: Mapped[int | None] = mapped_column(ForeignKey("usuario.id"), nullable=True)
+    lease_expira: Mapped[datetime | None] = mapped_column(db.DateTime, nullable=True)
+    asignado_a = relationship("User", foreign_keys=[asignado_a_id])
+
     # relaciones
     servicios = relationship(
         "SolicitudServicio",
@@ -165,6 +192,14 @@ class Solicitud(db.Model):
         cascade="all, delete-orphan",
     )
 
+    piezas = relationship(
+        "SolicitudPieza",
+        back_populates="solicitud",
+        lazy="dynamic",
+        cascade="all, delete-orphan",
+        order_by="SolicitudPieza.id",
+    )
+
     cotizacion_opciones = relationship(
     "CotizacionOpcion",
     back_populates="solicitud",
@@ -180,6 +215,9 @@ class Solicitud(db.Model):
 
     __table_args__ = (
         db.UniqueConstraint("folio_id", "child_seq", name="uq_folio_childseq"),
+        db.Index("ix_solicitud_lane_key_fecha", "lane_key", "fecha_solicitud"),
+        db.Index("ix_solicitud_cola", "estatus", "prioridad", "fecha_solicitud"),
+        SIN_REUSO_IDS,
     )
     # app/models.py (dentro de class Solicitud)
     venta_decisiones = relationship(
@@ -194,6 +232,7 @@ class Solicitud(db.Model):
 
 class SolicitudServicio(db.Model):
     __tablename__ = "solicitud_servicio"
+    __table_args__ = SIN_REUSO_IDS
 
     id: Mapped[int] = mapped_column(primary_key=True)
     solicitud_id: Mapped[int] = mapped_column(ForeignKey("solicitud.id"), index=True, nullable=False, unique=True)
@@ -206,8 +245,55 @@ class SolicitudServicio(db.Model):
     solicitud = relationship("Solicitud", back_populates="servicios")
 
 
+@event.listens_for(Solicitud, "before_insert")
+def _lane_key_al_insertar(mapper, connection, target):
+    if target.lane_key is None:
+        target.lane_key = clave_ruta({c: getattr(target, c) for c in CAMPOS_RUTA})
+
+
+@event.listens_for(SolicitudServicio, "after_insert")
+@event.listens_for(SolicitudServicio, "after_update")
+def _sync_tipo_en_solicitud(mapper, connection, target):
+    """Mantiene solicitud.tipo_servicio / modalidad (y su lane_key) iguales a su SolicitudServicio."""
+    sol = Solicitud.__table__
+    row = connection.execute(
+        select(*[sol.c[c] for c in CAMPOS_RUTA]).where(sol.c.id == target.solicitud_id)
+    ).mappings().first()
+    campos = {**(row or {}), "tipo_servicio": target.tipo_servicio, "modalidad": target.modalidad}
+    connection.execute(
+        sol.update()
+        .where(sol.c.id == target.solicitud_id)
+        .values(tipo_servicio=target.tipo_servicio, modalidad=target.modalidad,
+                lane_key=clave_ruta(campos))
+    )
+
+
+class SolicitudPieza(db.Model):
+    """Un renglón de carga de la solicitud (de 'totales' o de 'dimensiones')."""
+    __tablename__ = "solicitud_pieza"
+    __table_args__ = SIN_REUSO_IDS
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    solicitud_id: Mapped[int] = mapped_column(ForeignKey("solicitud.id"), index=True, nullable=False)
+    origen: Mapped[str] = mapped_column(db.String(20), nullable=False, default="totales")  # totales/dimensiones
+    cantidad: Mapped[int] = mapped_column(db.Integer, nullable=False, default=1)
+    # Medidas por pieza, en longitud_unidad
+    largo: Mapped[float | None] = mapped_column(db.Float)
+    ancho: Mapped[float | None] = mapped_column(db.Float)
+    alto: Mapped[float | None] = mapped_column(db.Float)
+    # Pesos y volumen del renglón completo
+    peso: Mapped[float | None] = mapped_column(db.Float)
+    peso_vol: Mapped[float | None] = mapped_column(db.Float)
+    cbm: Mapped[float | None] = mapped_column(db.Float)
+    longitud_unidad: Mapped[str] = mapped_column(db.String(10), nullable=False, default="cm")
+    peso_unidad: Mapped[str] = mapped_column(db.String(10), nullable=False, default="kg")
+
+    solicitud = relationship("Solicitud", back_populates="piezas")
+
+
 class Cotizacion(db.Model):
     __tablename__ = "cotizacion"
+    __table_args__ = SIN_REUSO_IDS
 
     id: Mapped[int] = mapped_column(primary_key=True)
     solicitud_id: Mapped[int] = mapped_column(ForeignKey("solicitud.id"), nullable=False, index=True)
@@ -221,8 +307,24 @@ class Cotizacion(db.Model):
 
     solicitud = relationship("Solicitud", back_populates="cotizaciones")
 
+class SerieAnual(db.Model):
+    """Contador por año para la serie Q####YYYY (se incrementa, no se cuenta)."""
+    __tablename__ = "serie_anual"
+
+    anio: Mapped[int] = mapped_column(db.Integer, primary_key=True, autoincrement=False)
+    ultimo: Mapped[int] = mapped_column(db.Integer, nullable=False, default=0)
+
+class CacheVersion(db.Model):
+    """Versión compartida de un caché en memoria (p.ej. 'clientes'): sube con cada cambio
+    de los datos y cada worker la compara contra la que cargó."""
+    __tablename__ = "cache_version"
+
+    nombre: Mapped[str] = mapped_column(db.String(40), primary_key=True)
+    version: Mapped[int] = mapped_column(db.Integer, nullable=False, default=0)
+
 class Folio(db.Model):
     __tablename__ = "folio"
+    __table_args__ = SIN_REUSO_IDS
     id: Mapped[int] = mapped_column(primary_key=True)
     codigo: Mapped[str] = mapped_column(db.String(32), nullable=False, unique=True, index=True)
     created_at: Mapped[datetime] = mapped_column(db.DateTime, nullable=False, default=func.now())
@@ -253,6 +355,7 @@ class Concepto(db.Model):
 
 class CotizacionOpcion(db.Model):
     __tablename__ = "cotizacion_opcion"
+    __table_args__ = SIN_REUSO_IDS
 
     id: Mapped[int] = mapped_column(primary_key=True)
     solicitud_id: Mapped[int] = mapped_column(ForeignKey("solicitud.id"), nullable=False, index=True)
@@ -274,31 +377,21 @@ class CotizacionOpcion(db.Model):
 
     created_at: Mapped[datetime] = mapped_column(db.DateTime, nullable=False, default=func.now())
     updated_at: Mapped[datetime] = mapped_column(db.DateTime, nullable=False, default=func.now(), onupdate=func.now())
+    # Bloqueo optimista: cada UPDATE del ORM lleva WHERE version = <la leída> y la incrementa
+    version: Mapped[int] = mapped_column(db.Integer, nullable=False, default=1, server_default="1")
 
     solicitud = relationship("Solicitud", back_populates="cotizacion_opciones")
     items = relationship("CotizacionItem", back_populates="opcion",
                          cascade="all, delete-orphan", lazy="dynamic")
 
-    @db.validates("cbm_cotizado")
-    def _round_lcl(self, key, value):
-        """Si la solicitud tiene algún servicio LCL, y 0<cbm<1 => 1"""
-        if value in (None, ""):
-            return value
-        v = Decimal(str(value))
-        try:
-            svcs = self.solicitud.servicios.all()  # lazy="dynamic"
-        except Exception:
-            svcs = list(self.solicitud.servicios or [])
-        is_lcl = any(s.modalidad == Modalidad.LCL for s in svcs if hasattr(s, "modalidad"))
-        if is_lcl and Decimal("0") < v < Decimal("1"):
-            return 1.0
-        return float(v)
+    __mapper_args__ = {"version_id_col": version}
+
 
 class CotizacionItem(db.Model):
     __tablename__ = "cotizacion_item"
 
     id: Mapped[int] = mapped_column(primary_key=True)
-    opcion_id: Mapped[int] = mapped_column(ForeignKey("cotizacion_opcion.id"), nullable=False, index=True)
+    opcion_id: Mapped[int] = mapped_column(ForeignKey("cotizacion_opcion.id"), nullable=False)
 
     concepto_id: Mapped[int | None] = mapped_column(ForeignKey("concepto.id"))
     concepto_nombre: Mapped[str | None] = mapped_column(db.String(255))
@@ -319,10 +412,37 @@ class CotizacionItem(db.Model):
 
     __table_args__ = (
         db.Index("ix_cotizacion_item_opcion_id", "opcion_id"),
+        SIN_REUSO_IDS,
     )
 
+class TarifaHistorica(db.Model):
+    """
+    Precios ya capturados por concepto, proveedor y ruta (origen/destino/modo) para sugerirlos
+    en cotizar. Una fila por ítem con concepto de catálogo; se reescribe al guardar la opción.
+    """
+    __tablename__ = "tarifa_historica"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    concepto_id: Mapped[int] = mapped_column(ForeignKey("concepto.id"), nullable=False)
+    proveedor: Mapped[str] = mapped_column(db.String(200), nullable=False, default="")
+    origen: Mapped[str] = mapped_column(db.String(80), nullable=False, default="")
+    destino: Mapped[str] = mapped_column(db.String(80), nullable=False, default="")
+    modo: Mapped[str] = mapped_column(db.String(20), nullable=False, default="")
+    moneda: Mapped[str] = mapped_column(db.String(3), nullable=False, default="MXN")
+    unidad: Mapped[str | None] = mapped_column(db.String(32))
+    precio_unit: Mapped[Decimal] = mapped_column(Numeric(18, 4), nullable=False, default=Decimal("0"))
+    fecha: Mapped[datetime] = mapped_column(db.DateTime, nullable=False, default=func.now())
+    opcion_id: Mapped[int] = mapped_column(ForeignKey("cotizacion_opcion.id"), nullable=False, index=True)
+
+    __table_args__ = (
+        db.Index("ix_tarifa_historica_ruta", "concepto_id", "origen", "destino", "modo", "proveedor", "fecha"),
+        SIN_REUSO_IDS,
+    )
+
+
 class VentaDecision(db.Model):
     __tablename__ = "venta_decision"
+    __table_args__ = SIN_REUSO_IDS
     id = db.Column(db.Integer, primary_key=True)
     solicitud_id = db.Column(db.Integer, db.ForeignKey("solicitud.id"), nullable=False)
     opcion_id = db.Column(db.Integer, db.ForeignKey("cotizacion_opcion.id"), nullable=False)
@@ -346,7 +466,16 @@ class VentaDecision(db.Model):
     solicitante_tel    = db.Column(db.String(60))
 
     tyc_internos = db.Column(db.Text)       # T&C internos de Compass
-    pdf_path     = db.Column(db.String(300))# dónde guardamos el PDF generad
+    pdf_path     = db.Column(db.String(300))# clave del PDF en el almacén (app.utils.storage)
+
+    # Clave del rollup congelada al confirmar (app.services.rollups.congelar_clave): la opción
+    # y la solicitud siguen editables, pero la oferta y su resultado cuentan en la misma fila
+    rollup_cliente       = db.Column(db.String(200))
+    rollup_ruta          = db.Column(db.String(170))
+    rollup_proveedor     = db.Column(db.String(200))
+    rollup_tipo_servicio = db.Column(db.String(20))
+    rollup_modalidad     = db.Column(db.String(10))
+    rollup_vendedor      = db.Column(db.String(120))
 
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
@@ -361,6 +490,7 @@ class VentaDecision(db.Model):
 
 class VentaDecisionItem(db.Model):
     __tablename__ = "venta_decision_item"
+    __table_args__ = SIN_REUSO_IDS
     id = db.Column(db.Integer, primary_key=True)
     decision_id = db.Column(db.Integer, db.ForeignKey("venta_decision.id"), nullable=False)
 
@@ -384,3 +514,96 @@ class VentaDecisionItem(db.Model):
     venta      = db.Column(db.Numeric(18, 6), default=0)
     margen_pct = db.Column(db.Numeric(10, 4), default=0)  # Profit/Venta *100
     tyc_internos: Mapped[str | None] = mapped_column(db.Text, nullable=True)
+
+
+class ApiToken(db.Model):
+    """Token para /api/v1. Sólo se guarda el sha256; el token en claro se muestra una vez."""
+    __tablename__ = "api_token"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    nombre: Mapped[str] = mapped_column(db.String(120), nullable=False)
+    token_hash: Mapped[str] = mapped_column(db.String(64), nullable=False, unique=True, index=True)
+    scope: Mapped[str] = mapped_column(db.String(40), nullable=False, default="read")
+    usuario_id: Mapped[int | None] = mapped_column(ForeignKey("usuario.id"), nullable=True)
+    activo: Mapped[bool] = mapped_column(db.Boolean, nullable=False, default=True)
+    created_at: Mapped[datetime] = mapped_column(db.DateTime, nullable=False, default=func.now())
+    last_used_at: Mapped[datetime | None] = mapped_column(db.DateTime, nullable=True)
+
+    @staticmethod
+    def hash_de(token: str) -> str:
+        return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+class VentaRollupDiario(db.Model):
+    """
+    Agregado diario de ofertas y resultados por cliente, ruta, proveedor, modo y vendedor.
+    Lo mantiene app.services.rollups (incremental) y `flask reconstruir_rollups` (completo).
+    La fecha es la de la decisión de venta; ganadas/perdidas se cuentan en esa misma fila.
+    """
+    __tablename__ = "venta_rollup_diario"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    fecha: Mapped[date] = mapped_column(db.Date, nullable=False)
+    cliente: Mapped[str] = mapped_column(db.String(200), nullable=False, default="")
+    ruta: Mapped[str] = mapped_column(db.String(170), nullable=False, default="")  # "<origen> - <destino>"
+    proveedor: Mapped[str] = mapped_column(db.String(200), nullable=False, default="")
+    tipo_servicio: Mapped[str] = mapped_column(db.String(20), nullable=False, default="")  # nombre del enum
+    modalidad: Mapped[str] = mapped_column(db.String(10), nullable=False, default="")
+    vendedor: Mapped[str] = mapped_column(db.String(120), nullable=False, default="")
+    moneda: Mapped[str] = mapped_column(db.String(3), nullable=False, default="MXN")
+
+    ofertadas: Mapped[int] = mapped_column(db.Integer, nullable=False, default=0)
+    ganadas: Mapped[int] = mapped_column(db.Integer, nullable=False, default=0)
+    perdidas: Mapped[int] = mapped_column(db.Integer, nullable=False, default=0)
+    venta_total: Mapped[Decimal] = mapped_column(Numeric(18, 6), nullable=False, default=Decimal("0"))
+    profit_total: Mapped[Decimal] = mapped_column(Numeric(18, 6), nullable=False, default=Decimal("0"))
+
+    __table_args__ = (
+        db.UniqueConstraint("fecha", "cliente", "ruta", "proveedor", "tipo_servicio", "modalidad",
+                            "vendedor", "moneda", name="uq_venta_rollup_diario_clave"),
+    )
+
+
+class SolicitudEvento(db.Model):
+    """
+    Bitácora de cambios de estatus de una solicitud (sólo se agregan filas; ver app.services.sla).
+    duracion_seg: tiempo que pasó en estatus_de; la entrada al primer estatus es fecha_solicitud.
+    """
+    __tablename__ = "solicitud_evento"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    solicitud_id: Mapped[int] = mapped_column(ForeignKey("solicitud.id"), nullable=False)
+    estatus_de: Mapped[str | None] = mapped_column(db.String(40))
+    estatus_a: Mapped[str] = mapped_column(db.String(40), nullable=False)
+    usuario_id: Mapped[int | None] = mapped_column(ForeignKey("usuario.id"), nullable=True)
+    fecha: Mapped[datetime] = mapped_column(db.DateTime, nullable=False, default=func.now())
+    duracion_seg: Mapped[int | None] = mapped_column(db.Integer)
+
+    __table_args__ = (
+        db.Index("ix_solicitud_evento_solicitud_fecha", "solicitud_id", "fecha"),
+        SIN_REUSO_IDS,
+    )
+
+
+class SlaHistograma(db.Model):
+    """
+    Histograma de tiempos en cada estatus por día de salida, pricer, modo y prioridad.
+    Cubeta = índice en app.services.sla.CUBETAS_MIN; p50/p90 salen de aquí sin leer eventos.
+    Lo mantiene app.services.sla (incremental) y `flask reconstruir_sla` (completo).
+    """
+    __tablename__ = "sla_histograma"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    fecha: Mapped[date] = mapped_column(db.Date, nullable=False)
+    estatus: Mapped[str] = mapped_column(db.String(40), nullable=False)
+    pricer: Mapped[str] = mapped_column(db.String(120), nullable=False, default="")
+    tipo_servicio: Mapped[str] = mapped_column(db.String(20), nullable=False, default="")  # nombre del enum
+    prioridad: Mapped[str] = mapped_column(db.String(20), nullable=False, default="")
+    cubeta: Mapped[int] = mapped_column(db.Integer, nullable=False)
+    n: Mapped[int] = mapped_column(db.Integer, nullable=False, default=0)
+    suma_seg: Mapped[int] = mapped_column(db.BigInteger, nullable=False, default=0)
+
+    __table_args__ = (
+        db.UniqueConstraint("fecha", "estatus", "pricer", "tipo_servicio", "prioridad", "cubeta",
+                            name="uq_sla_histograma_clave"),
+    )
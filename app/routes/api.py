@@ -0,0 +1,228 @@
+# app/routes/api.py
+from __future__ import annotations
+import base64
+import enum
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any
+
+from flask import Blueprint, Response, g, request
+from sqlalchemy import select, update
+
+from app import db
+from app.models import (
+    ApiToken, CotizacionItem, CotizacionOpcion, Modalidad, Solicitud, TipoServicio, VentaDecision,
+)
+
+try:
+    import orjson
+except ImportError:  # opcional: con orjson la serialización es varias veces más rápida
+    orjson = None
+
+bp = Blueprint("api", __name__, url_prefix="/api/v1")
+
+LIMIT_DEFAULT = 100
+LIMIT_MAX = 1000
+
+
+# ---------- Serialización ----------
+def _default(o: Any):
+    if isinstance(o, Decimal):
+        return float(o)
+    if isinstance(o, enum.Enum):
+        return o.value
+    if isinstance(o, (datetime, date)):
+        return o.isoformat()
+    raise TypeError(f"No serializable: {type(o).__name__}")
+
+
+def _json(data: Any, status: int = 200) -> Response:
+    if orjson is not None:
+        body = orjson.dumps(data, default=_default)
+    else:
+        body = json.dumps(data, default=_default, ensure_ascii=False, separators=(",", ":"))
+    return Response(body, status=status, mimetype="application/json")
+
+
+def _error(msg: str, status: int) -> Response:
+    return _json({"error": msg}, status)
+
+
+# ---------- Auth: Bearer token con scope de lectura ----------
+@bp.before_request
+def _autenticar():
+    auth = request.headers.get("Authorization", "")
+    token = auth[7:].strip() if auth.lower().startswith("bearer ") else ""
+    if not token:
+        return _error("Falta el header Authorization: Bearer <token>.", 401)
+    tok = db.session.scalar(
+        select(ApiToken).where(ApiToken.token_hash == ApiToken.hash_de(token), ApiToken.activo.is_(True))
+    )
+    if tok is None:
+        return _error("Token inválido.", 401)
+    if "read" not in (tok.scope or "").split():
+        return _error("El token no tiene permiso de lectura.", 403)
+    g.api_token = tok
+    db.session.execute(
+        update(ApiToken).where(ApiToken.id == tok.id).values(last_used_at=datetime.utcnow())
+    )
+    db.session.commit()
+
+
+# ---------- Recursos ----------
+def _columnas(model, excluir: tuple[str, ...] = ()) -> dict[str, Any]:
+    return {c.key: c for c in model.__table__.c if c.key not in excluir}
+
+
+def _fecha(v: str) -> datetime:
+    return datetime.fromisoformat(v)
+
+
+# filtro -> (columna, operador, convertidor)
+RECURSOS: dict[str, dict[str, Any]] = {
+    "solicitudes": dict(
+        model=Solicitud,
+        campos=_columnas(Solicitud),
+        default=("id", "numero_serie", "folio_id", "cliente", "cliente_id", "tipo_servicio",
+                 "modalidad", "estatus", "fecha_solicitud", "updated_at"),
+        filtros={
+            "estatus": (Solicitud.estatus, "eq", str),
+            "tipo_servicio": (Solicitud.tipo_servicio, "eq", TipoServicio),
+            "modalidad": (Solicitud.modalidad, "eq", lambda v: Modalidad[v.upper()]),
+            "cliente_id": (Solicitud.cliente_id, "eq", int),
+            "folio_id": (Solicitud.folio_id, "eq", int),
+            "desde": (Solicitud.fecha_solicitud, "ge", _fecha),
+            "hasta": (Solicitud.fecha_solicitud, "lt", _fecha),
+            "updated_desde": (Solicitud.updated_at, "ge", _fecha),
+        },
+    ),
+    "opciones": dict(
+        model=CotizacionOpcion,
+        campos=_columnas(CotizacionOpcion),
+        default=("id", "solicitud_id", "proveedor", "moneda", "cbm_cotizado", "tipo_servicio", "updated_at"),
+        filtros={
+            "solicitud_id": (CotizacionOpcion.solicitud_id, "eq", int),
+            "tipo_servicio": (CotizacionOpcion.tipo_servicio, "eq", str),
+            "proveedor": (CotizacionOpcion.proveedor, "eq", str),
+            "updated_desde": (CotizacionOpcion.updated_at, "ge", _fecha),
+        },
+    ),
+    "items": dict(
+        model=CotizacionItem,
+        campos=_columnas(CotizacionItem),
+        default=("id", "opcion_id", "concepto_id", "concepto_nombre", "moneda", "unidad",
+                 "cantidad", "precio_unit"),
+        filtros={
+            "opcion_id": (CotizacionItem.opcion_id, "eq", int),
+            "concepto_id": (CotizacionItem.concepto_id, "eq", int),
+        },
+    ),
+    "decisiones": dict(
+        model=VentaDecision,
+        # pdf_path es interno (clave del almacén): no se expone
+        campos=_columnas(VentaDecision, excluir=("pdf_path",)),
+        default=("id", "solicitud_id", "opcion_id", "moneda", "venta_total", "profit_total",
+                 "margen_pct", "created_at"),
+        filtros={
+            "solicitud_id": (VentaDecision.solicitud_id, "eq", int),
+            "opcion_id": (VentaDecision.opcion_id, "eq", int),
+            "desde": (VentaDecision.created_at, "ge", _fecha),
+            "hasta": (VentaDecision.created_at, "lt", _fecha),
+        },
+    ),
+}
+
+
+def _cursor_a_id(cursor: str) -> int:
+    return int(base64.urlsafe_b64decode(cursor.encode() + b"=" * (-len(cursor) % 4)).decode())
+
+
+def _id_a_cursor(id_: int) -> str:
+    return base64.urlsafe_b64encode(str(id_).encode()).decode().rstrip("=")
+
+
+def _campos_pedidos(rec: dict[str, Any]) -> list[str] | Response:
+    """`fields=a,b,c` (sparse fieldset); `fields=*` para todas. id siempre va."""
+    raw = (request.args.get("fields") or "").strip()
+    if not raw:
+        nombres = list(rec["default"])
+    elif raw == "*":
+        nombres = list(rec["campos"])
+    else:
+        nombres = [f.strip() for f in raw.split(",") if f.strip()]
+        desconocidos = [f for f in nombres if f not in rec["campos"]]
+        if desconocidos:
+            return _error("Campos desconocidos: " + ", ".join(desconocidos), 400)
+    return ["id"] + [n for n in dict.fromkeys(nombres) if n != "id"]
+
+
+def _consulta(nombre: str) -> Response:
+    rec = RECURSOS[nombre]
+    nombres = _campos_pedidos(rec)
+    if isinstance(nombres, Response):
+        return nombres
+
+    try:
+        limit = min(max(int(request.args.get("limit", LIMIT_DEFAULT)), 1), LIMIT_MAX)
+        despues = _cursor_a_id(request.args["cursor"]) if request.args.get("cursor") else None
+    except (ValueError, UnicodeDecodeError):
+        return _error("limit o cursor inválido.", 400)
+
+    id_col = rec["campos"]["id"]
+    q = select(*[rec["campos"][n] for n in nombres])
+    for param, (col, op, conv) in rec["filtros"].items():
+        v = request.args.get(param)
+        if v in (None, ""):
+            continue
+        try:
+            v = conv(v)
+        except (KeyError, ValueError):
+            return _error(f"Valor inválido para {param}: {request.args.get(param)}", 400)
+        q = q.where({"eq": col == v, "ge": col >= v, "lt": col < v}[op])
+    if despues is not None:
+        q = q.where(id_col > despues)
+    # keyset: orden por id; se pide uno de más para saber si hay otra página
+    filas = db.session.execute(q.order_by(id_col.asc()).limit(limit + 1)).all()
+
+    hay_mas = len(filas) > limit
+    filas = filas[:limit]
+    data = [dict(zip(nombres, f)) for f in filas]
+    return _json({
+        "data": data,
+        "next_cursor": _id_a_cursor(filas[-1][0]) if hay_mas else None,
+    })
+
+
+@bp.get("/solicitudes")
+def solicitudes():
+    return _consulta("solicitudes")
+
+
+@bp.get("/solicitudes/<int:sol_id>")
+def solicitud(sol_id: int):
+    rec = RECURSOS["solicitudes"]
+    nombres = _campos_pedidos(rec)
+    if isinstance(nombres, Response):
+        return nombres
+    fila = db.session.execute(
+        select(*[rec["campos"][n] for n in nombres]).where(Solicitud.id == sol_id)
+    ).first()
+    if fila is None:
+        return _error("No existe.", 404)
+    return _json({"data": dict(zip(nombres, fila))})
+
+
+@bp.get("/opciones")
+def opciones():
+    return _consulta("opciones")
+
+
+@bp.get("/items")
+def items():
+    return _consulta("items")
+
+
+@bp.get("/decisiones")
+def decisiones():
+    return _consulta("decisiones")
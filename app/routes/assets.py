@@ -0,0 +1,42 @@
+# app/routes/assets.py
+from __future__ import annotations
+import mimetypes
+
+from flask import Blueprint, abort, request, send_from_directory
+from werkzeug.security import safe_join
+
+from app.utils.assets import dist_dir
+
+bp = Blueprint("assets", __name__)
+
+UN_ANIO = 365 * 24 * 3600
+
+# (codificación, extensión) en orden de preferencia
+_VARIANTES = (("br", ".br"), ("gzip", ".gz"))
+
+
+@bp.get("/assets/<path:filename>")
+def servir(filename: str):
+    """
+    Archivos de static/dist (nombre con hash): caché inmutable de un año y,
+    si el navegador lo acepta, la variante precomprimida .br o .gz.
+    """
+    base = dist_dir()
+    if filename.endswith((".gz", ".br")) or not safe_join(str(base), filename):
+        abort(404)
+
+    aceptadas = request.accept_encodings
+    enviar, encoding = filename, None
+    for enc, ext in _VARIANTES:
+        if aceptadas[enc] and (base / (filename + ext)).is_file():
+            enviar, encoding = filename + ext, enc
+            break
+
+    mimetype = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+    resp = send_from_directory(base, enviar, mimetype=mimetype, max_age=UN_ANIO)
+    if encoding:
+        resp.headers["Content-Encoding"] = encoding
+    resp.vary.add("Accept-Encoding")
+    resp.cache_control.public = True
+    resp.cache_control.immutable = True
+    return resp
@@ -1,24 +1,39 @@
 # app/routes/pricing.py
 from __future__ import annotations
+from datetime import date, datetime, timedelta
 from decimal import Decimal
 import json
+from types import SimpleNamespace
 import csv
 from io import TextIOWrapper
 
-from flask import Blueprint, render_template, request, redirect, url_for, flash, abort
+from flask import (
+    Blueprint, render_template, request, redirect, url_for, flash, abort, jsonify, g, make_response,
+    current_app,
+)
 from flask_login import login_required, current_user
-from sqlalchemy import func
+from sqlalchemy import func, select
+from sqlalchemy.orm import joinedload
+from sqlalchemy.orm.exc import StaleDataError
 
 from app import db
 from app.models import (
     Solicitud,
-    SolicitudServicio,
     Concepto,
     CotizacionOpcion,
     CotizacionItem,
     TipoServicio,
     Modalidad,
+    SolicitudPieza,
+)
+from app.services import archivo, cola, sla
+from app.services.peso_cargable import calcular, calcular_lote
+from app.services.cotizacion import (
+    copiar_opcion as _copiar_opcion, crear_opciones_lote, firma_solicitud, items_desde_datos,
+    normalizar_cbm, recientes_misma_ruta,
 )
+from app.services.tarifas import registrar_tarifas_opcion, ultimas_tarifas
+from app.utils.http import con_validadores, etag_de, no_modificado
 
 bp = Blueprint("pricing", __name__)  # el url_prefix lo añade create_app al registrar
 
@@ -27,55 +42,49 @@ TIPOS_CANON = ("aereo", "maritimo", "terrestre")
 
 
 # ---------- Helpers ----------
-def _siblings_for_pills(sol: Solicitud) -> dict[str, int]:
+def _tipos_por_folio(sol: Solicitud) -> dict[str, int]:
     """
-    Devuelve {'aereo': id, 'maritimo': id, 'terrestre': id} para las hijas del mismo folio.
-    Si la solicitud no tiene folio, retorna solo su propio tipo -> id.
+    {'aereo': id, 'maritimo': id, 'terrestre': id} para las hijas del folio de `sol`
+    (o sólo la propia si no tiene folio). Una sola consulta sobre solicitud.tipo_servicio,
+    memoizada en `g` durante la petición.
     """
-    out: dict[str, int] = {}
-
-    # tipo de la solicitud actual
-    cur_srv = sol.servicios.first()
-    if cur_srv:
-        out[cur_srv.tipo_servicio.value] = sol.id
-
-    # Si no hay folio no hay hermanas
-    if not sol.folio_id:
-        return out
-
-    # Junta todas las solicitudes del mismo folio y mapea por tipo
-    hermanas = (
-        Solicitud.query
-        .join(SolicitudServicio, SolicitudServicio.solicitud_id == Solicitud.id)
-        .filter(Solicitud.folio_id == sol.folio_id)
-        .all()
-    )
-    for h in hermanas:
-        srv = h.servicios.first()
-        if srv:
-            out[srv.tipo_servicio.value] = h.id
+    memo = g.setdefault("_tipos_por_folio", {})
+    key = ("folio", sol.folio_id) if sol.folio_id else ("sol", sol.id)
+    if key not in memo:
+        q = (
+            select(Solicitud.tipo_servicio, Solicitud.id)
+            .where(Solicitud.tipo_servicio.isnot(None))
+            .order_by(Solicitud.id.asc())
+        )
+        q = q.where(Solicitud.folio_id == sol.folio_id) if sol.folio_id else q.where(Solicitud.id == sol.id)
+        memo[key] = {t.value: sid for t, sid in db.session.execute(q)}
+    return memo[key]
+
 
-    return out
+def _siblings_for_pills(sol: Solicitud) -> dict[str, int]:
+    """Mapa tipo -> solicitud_id para las píldoras (ver _tipos_por_folio)."""
+    return dict(_tipos_por_folio(sol))
 
 
 def _is_lcl(sol: Solicitud, tipo: str) -> bool:
     # tipo viene en minúsculas: 'aereo' | 'maritimo' | 'terrestre'
-    svc = (
-        SolicitudServicio.query
-        .filter_by(solicitud_id=sol.id)
-        .filter(SolicitudServicio.tipo_servicio == TipoServicio(tipo))
-        .first()
-    )
-    return bool(svc and svc.modalidad == Modalidad.LCL)
+    return sol.tipo_servicio == TipoServicio(tipo) and sol.modalidad == Modalidad.LCL
+
 
+def _carga(sol: Solicitud, tipo: str) -> dict | None:
+    """Totales de carga calculados desde las piezas; None si la solicitud no tiene piezas."""
+    piezas = sol.piezas.all()
+    return calcular(piezas, tipo) if piezas else None
 
-def _cbm_prefill(sol: Solicitud) -> float | None:
+
+def _cbm_prefill(sol: Solicitud, carga: dict | None = None) -> float | None:
+    if carga and carga["cbm"]:
+        return carga["cbm"]
     return sol.cbm_totales or sol.volumen_cbm or None
 
 
 def _tipo_servicio_referencial(s: Solicitud) -> str:
-    first = s.servicios.order_by(SolicitudServicio.id.asc()).first()
-    return first.tipo_servicio.value if first else "maritimo"
+    return s.tipo_servicio.value if s.tipo_servicio else "maritimo"
 
 
 # ---------- Rutas de navegación de Pricing (navbar) ----------
@@ -94,14 +103,97 @@ def panel():
     return render_template("Pricing/panel.html", recientes=recientes, conteos=conteos)
 
 
+@bp.get("/sla")
+@login_required
+def sla_tablero():
+    """Tiempo en pendiente / en cotización / ofertado (p50, p90) por pricer, modo o prioridad."""
+    por = request.args.get("por", "pricer")
+    if por not in sla.DIMENSIONES:
+        por = "pricer"
+    estatus = request.args.get("estatus", "pendiente")
+    if estatus not in sla.ESTATUS_SLA:
+        estatus = "pendiente"
+    hoy = datetime.utcnow().date()
+    try:
+        desde = date.fromisoformat(request.args["desde"]) if request.args.get("desde") else hoy - timedelta(days=30)
+        hasta = date.fromisoformat(request.args["hasta"]) if request.args.get("hasta") else hoy
+    except ValueError:
+        abort(400)
+    filas = sla.resumen(por, estatus, desde, hasta)
+    return render_template("Pricing/sla.html", filas=filas, por=por, estatus=estatus, desde=desde,
+                           hasta=hasta, dimensiones=list(sla.DIMENSIONES), estatuses=sla.ESTATUS_SLA)
+
+
 @bp.route("/pendientes")
 @login_required
 def pendientes():
+    # Cola: urgentes primero, luego la más vieja; se muestra quién tiene cada una
     q = (Solicitud.query
-         .filter(Solicitud.estatus.in_(["pendiente", "en cotizacion"]))
-         .order_by(Solicitud.id.desc()))
+         .options(joinedload(Solicitud.asignado_a))
+         .filter(Solicitud.estatus.in_(cola.ESTATUS_COLA))
+         .order_by(cola.orden_prioridad(), Solicitud.fecha_solicitud, Solicitud.id))
+
+    # Filtros opcionales por modo y modalidad (columnas indexadas en solicitud)
+    tipo, modalidad, filtros = _filtros_cola(request.args)
+    if filtros:
+        q = q.filter(*filtros)
+
     solicitudes = q.limit(200).all()
-    return render_template("Pricing/pendientes.html", solicitudes=solicitudes)
+    ahora = datetime.utcnow()
+    duenos = {s.id: cola.dueno(s, ahora) for s in solicitudes}
+    return render_template("Pricing/pendientes.html", solicitudes=solicitudes, duenos=duenos,
+                           tipo=tipo, modalidad=modalidad)
+
+
+def _filtros_cola(args) -> tuple[str, str, tuple]:
+    tipo = (args.get("tipo") or "").lower().strip()
+    modalidad = (args.get("modalidad") or "").upper().strip()
+    filtros = []
+    if tipo in TIPOS_CANON:
+        filtros.append(Solicitud.tipo_servicio == TipoServicio(tipo))
+    else:
+        tipo = ""
+    if modalidad in Modalidad.__members__:
+        filtros.append(Solicitud.modalidad == Modalidad[modalidad])
+    else:
+        modalidad = ""
+    return tipo, modalidad, tuple(filtros)
+
+
+@bp.post("/cola/tomar")
+@login_required
+def cola_tomar_siguiente():
+    """Asigna al usuario la siguiente solicitud libre (respeta los filtros de la cola) y la abre."""
+    tipo, modalidad, filtros = _filtros_cola(request.form)
+    sol_id = cola.tomar_siguiente(current_user.id, current_app.config.get("COLA_LEASE_MIN", 30), filtros)
+    db.session.commit()
+    if sol_id is None:
+        flash("No hay solicitudes libres en la cola.", "info")
+        return redirect(url_for("pricing.pendientes", tipo=tipo or None, modalidad=modalidad or None))
+    return redirect(url_for("pricing.solicitud", sol_id=sol_id))
+
+
+@bp.post("/cola/<int:sol_id>/tomar")
+@login_required
+def cola_tomar(sol_id: int):
+    if cola.tomar(sol_id, current_user.id, current_app.config.get("COLA_LEASE_MIN", 30)):
+        db.session.commit()
+        return redirect(url_for("pricing.solicitud", sol_id=sol_id))
+    db.session.rollback()
+    flash("Esa solicitud ya la tiene otro pricer.", "warning")
+    return redirect(request.referrer or url_for("pricing.pendientes"))
+
+
+@bp.post("/cola/<int:sol_id>/soltar")
+@login_required
+def cola_soltar(sol_id: int):
+    es_admin = (getattr(current_user, "rol", "") or "").lower() == "admin"
+    if cola.soltar(sol_id, None if es_admin else current_user.id):
+        db.session.commit()
+        flash("Solicitud liberada.", "success")
+    else:
+        flash("Sólo quien la tomó puede liberarla.", "warning")
+    return redirect(request.referrer or url_for("pricing.pendientes"))
 
 
 # ---------- Cotizar ----------
@@ -124,30 +216,21 @@ def cotizar(sol_id: int, tipo: str, op_id: int | None = None):
     if op_id and (not opcion or opcion.solicitud_id != sol_id):
         abort(404)
 
-    is_lcl = _is_lcl(s, tipo)
-    cbm_prefill = _cbm_prefill(s)
+    is_lcl = _is_lcl(s, tipo)  # una vez por solicitud; la regla se aplica en app.services.cotizacion
+    carga = _carga(s, tipo)
+    cbm_prefill = _cbm_prefill(s, carga)
 
     # --- Selector de las 3 solicitudes del mismo folio para tabs visuales ---
     selector_tres = []
     if s.folio_id:
-        try:
-            folio_sols = s.folio.solicitudes.order_by(Solicitud.id.asc()).all()
-        except Exception:
-            folio_sols = Solicitud.query.filter_by(folio_id=s.folio_id).all()
-
-        by_tipo = {}
-        for sx in folio_sols:
-            t = (_tipo_servicio_referencial(sx) or "").lower()
-            if t in TIPOS_CANON:
-                by_tipo[t] = sx
-
+        by_tipo = _tipos_por_folio(s)
         for t in TIPOS_CANON:
-            sx = by_tipo.get(t)
+            sx_id = by_tipo.get(t)
             selector_tres.append(dict(
                 tipo=t,
-                exists=bool(sx),
-                sol_id=(sx.id if sx else None),
-                is_current=bool(sx and sx.id == s.id),
+                exists=bool(sx_id),
+                sol_id=sx_id,
+                is_current=bool(sx_id and sx_id == s.id),
                 etiqueta=t.capitalize(),
             ))
     else:
@@ -167,21 +250,24 @@ def cotizar(sol_id: int, tipo: str, op_id: int | None = None):
     ]
 
     # Ítems existentes (si editas)
-    items = []
-    if opcion:
-        for it in opcion.items.order_by(CotizacionItem.id):
-            items.append(dict(
-                concepto_id=it.concepto_id,
-                concepto_nombre=it.concepto_nombre,
-                proveedor=it.proveedor or "",
-                moneda=it.moneda,
-                unidad=it.unidad or "",
-                cantidad=float(it.cantidad or 0),
-                precio_unit=float(it.precio_unit or 0),
-                iva_pct=float(it.iva_pct or 0),
-                ret_iva_pct=float(it.ret_iva_pct or 0),
-                isr_pct=float(it.isr_pct or 0),
-            ))
+    items = _items_opcion(opcion) if opcion else []
+
+    def pantalla(op_vista, items_vista, conflicto=None):
+        return render_template(
+            "Pricing/cotizar.html",
+            s=s,
+            opcion=op_vista,
+            tipo=tipo,
+            has_lcl=is_lcl,
+            is_lcl=is_lcl,
+            cbm_prefill=cbm_prefill,
+            carga=carga,
+            conceptos=conceptos_json,
+            items=items_vista,
+            moneda_default=(op_vista.moneda if (op_vista and op_vista.moneda) else "MXN"),
+            siblings=siblings,
+            conflicto=conflicto,
+        )
 
     if request.method == "POST":
         # Estos dos campos quedan como opcionales/auxiliares (sin validación obligatoria)
@@ -205,6 +291,10 @@ def cotizar(sol_id: int, tipo: str, op_id: int | None = None):
             flash("Formato de items inválido.", "danger")
             return redirect(request.url)
 
+        # Otro usuario guardó la opción después de que se abrió este form
+        if opcion is not None and request.form.get("version", type=int) != opcion.version:
+            return pantalla(*_conflicto_opcion(opcion, request.form, items_data, is_lcl)), 409
+
         if opcion is None:
             opcion = CotizacionOpcion(
                 solicitud_id=s.id,
@@ -215,10 +305,7 @@ def cotizar(sol_id: int, tipo: str, op_id: int | None = None):
         # Asignaciones a la opción
         opcion.proveedor = proveedor
         opcion.moneda = moneda
-        try:
-            opcion.cbm_cotizado = float(cbm_cotizado) if cbm_cotizado not in (None, "",) else None
-        except Exception:
-            opcion.cbm_cotizado = None
+        opcion.cbm_cotizado = normalizar_cbm(cbm_cotizado, is_lcl)
         opcion.origen_final = origen_final
         opcion.destino_final = destino_final
         opcion.frecuencia = frecuencia
@@ -228,69 +315,262 @@ def cotizar(sol_id: int, tipo: str, op_id: int | None = None):
 
         # Limpia items previos si estás editando
         if opcion.id:
+            # Siempre hay UPDATE (aunque sólo cambien ítems): WHERE version = <leída> antes de
+            # tocar los ítems; si alguien guardó entre la lectura y aquí, StaleDataError
+            opcion.updated_at = datetime.utcnow()
+            try:
+                db.session.flush()
+            except StaleDataError:
+                db.session.rollback()
+                actual = db.session.get(CotizacionOpcion, op_id)
+                return pantalla(*_conflicto_opcion(actual, request.form, items_data, is_lcl)), 409
             # relación lazy="dynamic": borra en bloque
             opcion.items.delete(synchronize_session=False)
 
-        # Regla LCL server-side (CBM en (0,1) => 1) cuando la unidad es CBM
-        def norm_cant(unidad: str | None, cant: float) -> float:
-            if is_lcl and (unidad or "").upper() == "CBM" and 0 < cant < 1:
-                return 1.0
-            return cant
-
-        # Inserta ítems
-        for it in items_data:
-            try:
-                cantidad = float(it.get("cantidad") or 0)
-            except Exception:
-                cantidad = 0.0
-            unidad = (it.get("unidad") or "").upper()
-            item = CotizacionItem(
-                opcion=opcion,
-                concepto_id=it.get("concepto_id"),
-                concepto_nombre=(it.get("concepto_nombre") or "").strip() or None,
-                proveedor=(it.get("proveedor") or "").strip() or None,
-                moneda=(it.get("moneda") or moneda).upper(),
-                unidad=unidad or None,
-                cantidad=Decimal(str(norm_cant(unidad, cantidad))),
-                precio_unit=Decimal(str(it.get("precio_unit") or 0)),
-                iva_pct=Decimal(str(it.get("iva_pct") or 0)),       # 0–1
-                ret_iva_pct=Decimal(str(it.get("ret_iva_pct") or 0)),# 0–1
-                isr_pct=Decimal(str(it.get("isr_pct") or 0)),       # 0–1
-            )
-            db.session.add(item)
+        # Inserta ítems (regla LCL server-side: CBM en (0,1) => 1 cuando la unidad es CBM)
+        for it in items_desde_datos(items_data, moneda, is_lcl):
+            db.session.add(CotizacionItem(opcion=opcion, **it))
 
         if s.estatus == "pendiente":
-            s.estatus = "en cotizacion"
+            sla.cambiar_estatus(s, "en cotizacion", current_user.id)
 
+        db.session.flush()
+        registrar_tarifas_opcion([opcion.id])
         db.session.commit()
         flash("Opción guardada.", "success")
         return redirect(url_for("pricing.solicitud", sol_id=s.id))
 
     # GET
-    return render_template(
-        "Pricing/cotizar.html",
-        s=s,
-        opcion=opcion,
-        tipo=tipo,
-        has_lcl=is_lcl,
-        is_lcl=is_lcl,
-        cbm_prefill=cbm_prefill,
-        conceptos=conceptos_json,
-        items=items,
-        moneda_default=(opcion.moneda if (opcion and opcion.moneda) else "MXN"),
-        siblings=siblings,
+    return pantalla(opcion, items)
+
+
+def _items_opcion(opcion: CotizacionOpcion) -> list[dict]:
+    return [
+        dict(
+            concepto_id=it.concepto_id,
+            concepto_nombre=it.concepto_nombre,
+            proveedor=it.proveedor or "",
+            moneda=it.moneda,
+            unidad=it.unidad or "",
+            cantidad=float(it.cantidad or 0),
+            precio_unit=float(it.precio_unit or 0),
+            iva_pct=float(it.iva_pct or 0),
+            ret_iva_pct=float(it.ret_iva_pct or 0),
+            isr_pct=float(it.isr_pct or 0),
+        )
+        for it in opcion.items.order_by(CotizacionItem.id)
+    ]
+
+
+# Campos del form de cotizar que se comparan en un conflicto
+CAMPOS_CONFLICTO = (
+    ("cbm_cotizado", "CBM cotizado"),
+    ("origen_final", "Origen final"),
+    ("destino_final", "Destino final"),
+    ("frecuencia", "Frecuencia"),
+    ("transito_estimado_dias", "TT (días)"),
+    ("dias_libres_destino", "Días libres"),
+    ("terminos_condiciones", "Términos y condiciones"),
+)
+
+
+def _conflicto_opcion(actual: CotizacionOpcion, form, items_data: list, is_lcl: bool):
+    """
+    (borrador, ítems, conflicto) para volver a pintar cotizar con lo que el usuario envió,
+    pero con la version actual: al guardar de nuevo sobrescribe a sabiendas.
+    `conflicto` trae los campos que difieren y los ítems que quedaron guardados.
+    """
+    def entero(v):
+        return int(v) if (v and str(v).isdigit()) else None
+
+    borrador = SimpleNamespace(
+        id=actual.id,
+        version=actual.version,
+        proveedor=(form.get("proveedor") or "").strip(),
+        moneda=(form.get("moneda") or actual.moneda or "MXN").strip().upper(),
+        cbm_cotizado=normalizar_cbm(form.get("cbm_cotizado"), is_lcl),
+        origen_final=form.get("origen_final") or None,
+        destino_final=form.get("destino_final") or None,
+        frecuencia=form.get("frecuencia") or None,
+        transito_estimado_dias=entero(form.get("transito_estimado_dias")),
+        dias_libres_destino=entero(form.get("dias_libres_destino")),
+        terminos_condiciones=form.get("terminos_condiciones") or None,
+    )
+    campos = [
+        dict(etiqueta=etiqueta, guardado=getattr(actual, k), tuyo=getattr(borrador, k))
+        for k, etiqueta in CAMPOS_CONFLICTO
+        if (getattr(actual, k) or None) != (getattr(borrador, k) or None)
+    ]
+    conflicto = dict(
+        actualizada=actual.updated_at,
+        campos=campos,
+        items_guardados=_items_opcion(actual),
+        items_tuyos=len(items_data),
+    )
+    return borrador, items_data, conflicto
+
+
+# ---------- Opciones en lote ----------
+MAX_OPCIONES_LOTE = 5000
+
+@bp.post("/opciones/lote")
+@login_required
+def crear_opciones_en_lote():
+    """
+    JSON: {"opciones": [{"solicitud_id", "proveedor", "moneda", "cbm_cotizado",
+                         "tipo_servicio", ..., "items": [{concepto_id, cantidad, unidad, precio_unit, ...}]}]}
+    Regresa {"ids": [...]} en el mismo orden.
+    """
+    data = request.get_json(silent=True) or {}
+    opciones = data.get("opciones")
+    if not isinstance(opciones, list) or not all(isinstance(o, dict) for o in opciones):
+        return jsonify(error="opciones debe ser una lista de objetos"), 400
+    if len(opciones) > MAX_OPCIONES_LOTE:
+        return jsonify(error=f"máximo {MAX_OPCIONES_LOTE} opciones por petición"), 413
+    try:
+        for i, o in enumerate(opciones):
+            try:
+                o["solicitud_id"] = int(o["solicitud_id"])
+                if o.get("tipo_servicio") and o["tipo_servicio"] not in TIPOS_CANON:
+                    raise ValueError(f"tipo_servicio inválido: {o['tipo_servicio']}")
+                if not isinstance(o.get("items") or [], list):
+                    raise ValueError("items debe ser una lista")
+            except KeyError as e:
+                raise ValueError(f"opciones[{i}]: falta {e.args[0]}") from None
+            except (TypeError, ValueError) as e:
+                raise ValueError(f"opciones[{i}]: {e}") from None
+        ids = crear_opciones_lote(opciones, usuario_id=current_user.id)
+    except (KeyError, TypeError, ValueError, ArithmeticError) as e:
+        db.session.rollback()
+        return jsonify(error=str(e) or "datos inválidos"), 400
+    db.session.commit()
+    return jsonify(ids=ids), 201
+
+
+# ---------- Copiar opción a otra solicitud ----------
+@bp.post("/opcion/<int:op_id>/copiar")
+@login_required
+def copiar_opcion(op_id: int):
+    """
+    Form: destino = numero_serie o id de la solicitud destino; impuestos=si para
+    tomar IVA/ret/ISR del catálogo actual. Abre la copia en cotizar.
+    """
+    origen = db.session.get(CotizacionOpcion, op_id)
+    if not origen:
+        abort(404)
+    ref = (request.form.get("destino") or "").strip()
+    destino = None
+    if ref:
+        destino = db.session.scalar(select(Solicitud).where(Solicitud.numero_serie == ref))
+        if destino is None and ref.isdigit():
+            destino = db.session.get(Solicitud, int(ref))
+    if destino is None:
+        flash(f"No existe la solicitud '{ref}'.", "warning")
+        return redirect(request.referrer or url_for("pricing.solicitud", sol_id=origen.solicitud_id))
+
+    nuevo_id = _copiar_opcion(op_id, destino.id,
+                              actualizar_impuestos=(request.form.get("impuestos") or "").lower() in ("si", "sí", "1", "on"),
+                              usuario_id=current_user.id)
+    db.session.commit()
+    flash(f"Opción #{op_id} copiada a {destino.numero_serie} como #{nuevo_id}.", "success")
+    return redirect(url_for("pricing.cotizar", sol_id=destino.id, tipo=_tipo_servicio_referencial(destino),
+                            op_id=nuevo_id))
+
+
+# ---------- Memoria de tarifas ----------
+@bp.get("/tarifas/historial")
+@login_required
+def tarifas_historial():
+    """
+    ?sol_id=&tipo=&concepto_id=1&concepto_id=2...&n=3[&proveedor=&excluir_opcion=]
+    -> {"tarifas": {concepto_id: [{precio_unit, moneda, unidad, proveedor, fecha, opcion_id}]}}
+    La ruta (origen/destino) sale de la solicitud.
+    """
+    s = db.session.get(Solicitud, request.args.get("sol_id", type=int))
+    if not s:
+        abort(404)
+    tipo = (request.args.get("tipo") or "").lower().strip()
+    if tipo not in TIPOS_CANON:
+        return jsonify(error="tipo debe ser aereo, maritimo o terrestre"), 400
+    ids = request.args.getlist("concepto_id", type=int)
+    tarifas = ultimas_tarifas(
+        ids, s.origen_ciudad, s.destino_ciudad, tipo,
+        proveedor=(request.args.get("proveedor") or "").strip() or None,
+        n=request.args.get("n", 3, type=int),
+        excluir_opcion=request.args.get("excluir_opcion", type=int),
     )
+    return jsonify(tarifas={str(k): v for k, v in tarifas.items()})
+
+
+# ---------- Peso cargable en lote ----------
+MAX_PIEZAS_LOTE = 50000
+
+@bp.post("/peso_cargable")
+@login_required
+def peso_cargable():
+    """
+    JSON: {"tipo": "aereo", "divisor": opcional,
+           "envios": [[{cantidad, largo, ancho, alto, peso, cbm, longitud_unidad, peso_unidad}, ...], ...]}
+    o     {"tipo": "aereo", "solicitud_ids": [1, 2, ...]} para usar las piezas guardadas.
+    Regresa {"resultados": [...]} en el mismo orden.
+    """
+    data = request.get_json(silent=True) or {}
+    tipo = str(data.get("tipo") or "").lower().strip()
+    if tipo not in TIPOS_CANON:
+        return jsonify(error="tipo debe ser aereo, maritimo o terrestre"), 400
+
+    if "solicitud_ids" in data:
+        try:
+            ids = [int(x) for x in data["solicitud_ids"]]
+        except (TypeError, ValueError):
+            return jsonify(error="solicitud_ids inválido"), 400
+        por_sol: dict[int, list] = {i: [] for i in ids}
+        for p in SolicitudPieza.query.filter(SolicitudPieza.solicitud_id.in_(ids)):
+            por_sol[p.solicitud_id].append(p)
+        envios = [por_sol[i] for i in ids]
+    else:
+        envios = data.get("envios")
+        if not isinstance(envios, list) or not all(isinstance(e, list) for e in envios):
+            return jsonify(error="envios debe ser una lista de listas de piezas"), 400
+
+    if sum(len(e) for e in envios) > MAX_PIEZAS_LOTE:
+        return jsonify(error=f"máximo {MAX_PIEZAS_LOTE} piezas por petición"), 413
+
+    try:
+        divisor = float(data["divisor"]) if data.get("divisor") else None
+    except (TypeError, ValueError):
+        return jsonify(error="divisor inválido"), 400
+    return jsonify(resultados=calcular_lote(envios, tipo, divisor))
 
 
 @bp.route("/solicitud/<int:sol_id>")
 @login_required
 def solicitud(sol_id: int):
+    firma = firma_solicitud(sol_id)
+    if not firma:
+        s, archivada = archivo.obtener(Solicitud, sol_id)
+        if not s:
+            abort(404)
+        opciones = s.cotizacion_opciones.order_by(CotizacionOpcion.created_at.desc()).all()
+        return render_template("Pricing/solicitud.html", s=s, opciones=opciones,
+                               tipo=_tipo_servicio_referencial(s), archivada=archivada)
+    # Otras solicitudes de la ruta: cambian sin tocar esta, así que entran al ETag
+    lane_key = db.session.scalar(select(Solicitud.lane_key).where(Solicitud.id == sol_id))
+    misma_ruta = recientes_misma_ruta(lane_key, excluir_ids=[sol_id],
+                                      dias=current_app.config.get("RUTA_RECIENTES_DIAS", 30))
+    etag = etag_de("pricing.solicitud", current_user.id, *firma[0],
+                   [(r["id"], r["estatus"], [(o["id"], o["updated_at"]) for o in r["opciones"]])
+                    for r in misma_ruta])
+    resp = no_modificado(etag, firma[1])
+    if resp:
+        return resp
+
     s = db.session.get(Solicitud, sol_id)
-    if not s:
-        abort(404)
     opciones = s.cotizacion_opciones.order_by(CotizacionOpcion.created_at.desc()).all()
     tipo = _tipo_servicio_referencial(s)
-    return render_template("Pricing/solicitud.html", s=s, opciones=opciones, tipo=tipo)
+    html = render_template("Pricing/solicitud.html", s=s, opciones=opciones, tipo=tipo,
+                           misma_ruta=misma_ruta)
+    return con_validadores(make_response(html), etag, firma[1])
 
 
 # --- Importar catálogo de conceptos desde CSV ---
@@ -1,118 +1,50 @@
 # app/routes/ventas.py
 from __future__ import annotations
-import json
-from datetime import datetime
-from typing import Dict, Any, Optional
-from flask import Blueprint, render_template, request, redirect, url_for, flash, abort
+from datetime import date, datetime, timedelta
+from typing import Dict, Any
+from flask import (
+    Blueprint, Response, render_template, request, redirect, url_for, flash, abort, jsonify,
+    make_response, stream_with_context, current_app,
+)
 from decimal import Decimal
 
 from flask_login import login_required, current_user
-from sqlalchemy import and_
 from app import db
 from app.models import (
-    Solicitud, SolicitudServicio, TipoServicio,
-    Cliente, ClienteTipo, Modalidad, Folio,
+    Solicitud, SolicitudServicio, SolicitudPieza,
+    Cliente, ClienteTipo, Folio,
     CotizacionOpcion, CotizacionItem,
-    VentaDecision, VentaDecisionItem
+    VentaDecision, VentaDecisionItem,
 )
+from app.utils.piezas import piezas_de
+from app.services.clonar_folio import clonar_folio as _clonar_folio
+from app.services.clientes_index import indice_clientes
+from app.services.cotizacion import firma_solicitud, recientes_misma_ruta
+from app.services.solicitudes import (
+    TIPO_MAP, bool_from_radio, campos_solicitud, detalle_servicio, ensure_cliente_for_name,
+    generar_codigo_folio, map_modalidad, reservar_series_anuales,
+)
+from app.services import archivo, licitacion_import, rollups, sla
+from app.utils.http import con_validadores, etag_de, no_modificado
+from app.utils.storage import almacen
 from flask import send_file
 import os
 
 bp = Blueprint("ventas", __name__)
 
+# El PDF de una decisión no cambia una vez generado
+PDF_MAX_AGE = 24 * 3600
 
 # ----------------- Helpers -----------------
-def generar_numero_serie_anual() -> str:
-    """Si quisieras seguir usando esta serie, queda disponible."""
-    hoy = datetime.utcnow()
-    ini = datetime(hoy.year, 1, 1)
-    fin = datetime(hoy.year, 12, 31, 23, 59, 59, 999999)
-    count = (Solicitud.query
-             .filter(and_(Solicitud.fecha_solicitud >= ini,
-                          Solicitud.fecha_solicitud <= fin))
-             .count())
-    return f"Q{count + 1:04d}{hoy.year}"
-
-def generar_codigo_folio() -> str:
-    """Código único de folio padre."""
-    return "F-" + datetime.utcnow().strftime("%Y%m%d-%H%M%S")
-
-def _bool_from_radio(val: str | None) -> bool:
-    return (val or "").strip().lower() in {"si", "sí", "true", "1", "on", "yes"}
-
-def _to_float_or_none(v: Any) -> Optional[float]:
-    if v is None:
-        return None
-    s = str(v).strip()
-    if s == "":
-        return None
-    try:
-        return float(s)
-    except ValueError:
-        return None
-
-def _get_serv_detail(prefix: str) -> Dict[str, Any]:
-    """
-    Extrae el bloque de campos de un servicio con prefijo: aereo|maritimo|terrestre.
-    'modalidad' sólo aplica realmente a marítimo (FCL/LCL) según tu Enum.
-    """
-    modalidad = (request.form.get(f"{prefix}_modalidad") or "").upper().strip()
-    d = {
-        "modalidad": modalidad,  # útil para marítimo
-        "tipo_embarque": request.form.get(f"{prefix}_tipo_embarque") or "",
-        "incoterm": request.form.get(f"{prefix}_incoterm") or "",
-        "un_clase": request.form.get(f"{prefix}_un_clase") or "",
-        "estibable": _bool_from_radio(request.form.get(f"{prefix}_estibable")),
-        "seguro": _bool_from_radio(request.form.get(f"{prefix}_seguro") or "no"),
-        "valor_factura": (request.form.get(f"{prefix}_valor_factura") or "").strip(),
-        "tipo_cambio": request.form.get(f"{prefix}_tipo_cambio") or "",
-        "origen": {
-            "pais": request.form.get(f"{prefix}_origen_pais") or "",
-            "ciudad": request.form.get(f"{prefix}_origen_ciudad") or "",
-            "cp": request.form.get(f"{prefix}_origen_cp") or "",
-            "recoleccion": request.form.get(f"{prefix}_origen_recoleccion") or "",
-            "puerto": request.form.get(f"{prefix}_origen_puerto") or "",
-            "cruce": request.form.get(f"{prefix}_origen_cruce") or "",
-            "despacho": request.form.get(f"{prefix}_origen_despacho") or "",
-        },
-        "destino": {
-            "pais": request.form.get(f"{prefix}_destino_pais") or "",
-            "ciudad": request.form.get(f"{prefix}_destino_ciudad") or "",
-            "cp": request.form.get(f"{prefix}_destino_cp") or "",
-            "entrega": request.form.get(f"{prefix}_destino_entrega") or "",
-            "puerto": request.form.get(f"{prefix}_destino_puerto") or "",
-            "cruce": request.form.get(f"{prefix}_destino_cruce") or "",
-            "despacho": request.form.get(f"{prefix}_destino_despacho") or "",
-        },
-        "unidad": request.form.get(f"{prefix}_unidad") or "",
-        "servicio_unidad": request.form.get(f"{prefix}_servicio_unidad") or "",
-        "maniobra": request.form.get(f"{prefix}_maniobra") or "",
-    }
-
-    # Para marítimo-FCL admitimos lista de contenedores (si tu form los manda)
-    if modalidad == "FCL" and prefix == "maritimo":
-        cont_types = []
-        for k, v in request.form.items():
-            if k.startswith(f"{prefix}_cont_") and k.endswith("_tipo") and v:
-                base = k[:-5]  # quitar _tipo
-                cant = (request.form.get(f"{base}_cantidad") or "").strip()
-                cont_types.append({"tipo": v, "cantidad": int(cant or "0")})
-        if cont_types:
-            d["contenedores"] = cont_types
-            d["numero_contenedor"] = sum(c["cantidad"] for c in cont_types)
-    return d
-
-def _ensure_cliente_for_name(nombre: str) -> Cliente:
-    nm = (nombre or "").strip()
-    if not nm:
-        raise ValueError("Nombre de cliente vacío.")
-    c = Cliente.query.filter(Cliente.nombre.ilike(nm)).first()
-    if c:
-        return c
-    c = Cliente(nombre=nm, activo=True)
-    db.session.add(c)
-    db.session.flush()
-    return c
+def _piezas_form(form) -> list[Dict[str, Any]]:
+    """Renglones de carga del form (los mismos para todas las hijas del folio)."""
+    return piezas_de(
+        form.get("cotiza_por") or "totales",
+        form.get("totales_json"),
+        form.get("dimensiones_json"),
+        longitud_unidad=form.get("longitud_unidad") or "cm",
+        peso_unidad=form.get("peso_unidad") or "kg",
+    )
 
 def _resolver_cliente(form):
     tipo_raw = (form.get("cliente_tipo") or "cliente").strip().lower()
@@ -133,7 +65,7 @@ def _resolver_cliente(form):
             nombre_cli = cliente_label or (form.get("cliente") or "").strip()
             if not nombre_cli:
                 return cli_tipo, None, None, ""
-            cliente = _ensure_cliente_for_name(nombre_cli)
+            cliente = ensure_cliente_for_name(nombre_cli)
             cliente_id = cliente.id
             cliente_label = cliente.nombre.strip()
     else:
@@ -145,39 +77,58 @@ def _resolver_cliente(form):
 
     return cli_tipo, cliente_id, (prospecto_nombre or None), cliente_label.strip()
 
-def _map_modalidad(tipo: str, raw: str | None) -> Modalidad | None:
-    """
-    Sólo tu Enum: FCL, LCL. Aplica a marítimo.
-    Para aéreo/terrestre regresamos None (no hay modalidad en el Enum para esos).
-    """
-    if tipo != "maritimo":
-        return None
-    v = (raw or "").strip().upper()
-    if v in {"FCL", "LCL"}:
-        return Modalidad[v]
-    # Por defecto, si no vino valor, asumimos LCL (ajústalo si prefieres FCL)
-    return Modalidad.LCL
-
 # ----------------- Vistas -----------------
 @bp.get("/dashboard")
 @login_required
 def dashboard():
     return render_template("Ventas/dashboard.html")
 
+@bp.get("/analitica")
+@login_required
+def analitica():
+    """Win rate y margen por cliente/ruta/proveedor/modo/vendedor; sólo lee venta_rollup_diario."""
+    por = request.args.get("por", "cliente")
+    if por not in rollups.DIMENSIONES:
+        por = "cliente"
+    hoy = datetime.utcnow().date()
+    try:
+        desde = date.fromisoformat(request.args["desde"]) if request.args.get("desde") else hoy - timedelta(days=90)
+        hasta = date.fromisoformat(request.args["hasta"]) if request.args.get("hasta") else hoy
+    except ValueError:
+        abort(400)
+    filas = rollups.resumen(por, desde, hasta)
+    return render_template("Ventas/analitica.html", filas=filas, por=por, desde=desde, hasta=hasta,
+                           dimensiones=list(rollups.DIMENSIONES))
+
 @bp.get("/solicitudes")
 @login_required
 def listar_solicitudes():
-    solicitudes = (Solicitud.query
-                   .order_by(Solicitud.fecha_solicitud.desc())
-                   .limit(200).all())
-    return render_template("Ventas/historial.html", solicitudes=solicitudes)
+    q = (request.args.get("q") or "").strip()
+    archivadas: set[int] = set()
+    if q:
+        # Búsqueda por serie/cliente: incluye folios ya archivados
+        encontradas = archivo.buscar_solicitudes(q)
+        solicitudes = [s for s, _ in encontradas]
+        archivadas = {s.id for s, arch in encontradas if arch}
+    else:
+        solicitudes = (Solicitud.query
+                       .order_by(Solicitud.fecha_solicitud.desc())
+                       .limit(200).all())
+    return render_template("Ventas/historial.html", solicitudes=solicitudes, q=q, archivadas=archivadas)
+
+@bp.get("/clientes/buscar")
+@login_required
+def buscar_clientes():
+    """Typeahead de clientes activos: ?q=<texto>&limit=<n> -> {"items": [{id, nombre}]}"""
+    q = (request.args.get("q") or "").strip()
+    limit = max(1, min(request.args.get("limit", 10, type=int), 50))
+    return jsonify(items=indice_clientes.buscar(q, limit))
 
 @bp.route("/nueva", methods=["GET", "POST"])
 @login_required
 def crear_solicitud():
     if request.method == "GET":
-        clientes = Cliente.query.filter_by(activo=True).order_by(Cliente.nombre.asc()).all()
-        return render_template("Ventas/nueva_solicitud.html", clientes=clientes)
+        return render_template("Ventas/nueva_solicitud.html")
 
     # --- Cliente / prospecto ---
     cliente_tipo, cliente_id, prospecto_nombre, cliente_label = _resolver_cliente(request.form)
@@ -191,21 +142,17 @@ def crear_solicitud():
         flash("Selecciona al menos un tipo de servicio.", "warning")
         return redirect(url_for("ventas.crear_solicitud"))
 
-    detalle_por_tipo: Dict[str, Dict[str, Any]] = {s: _get_serv_detail(s) for s in servicios_sel}
+    detalle_por_tipo: Dict[str, Dict[str, Any]] = {s: detalle_servicio(s, request.form) for s in servicios_sel}
+    piezas = _piezas_form(request.form)
 
     # --- Folio padre ---
     folio = Folio(codigo=generar_codigo_folio())
     db.session.add(folio)
     db.session.flush()  # folio.id
 
-    tipo_map = {
-        "aereo": TipoServicio.AEREO,
-        "maritimo": TipoServicio.MARITIMO,
-        "terrestre": TipoServicio.TERRESTRE,
-    }
-
     creadas: list[Solicitud] = []
     child_seq = 0
+    series_anuales = reservar_series_anuales(len(servicios_sel))
 
     for tipo in servicios_sel:
         det = detalle_por_tipo.get(tipo, {})
@@ -219,93 +166,133 @@ def crear_solicitud():
             folio_id=folio.id,
             child_seq=child_seq,
             numero_serie=numero_serie,
+            numero_serie_anual=series_anuales[child_seq - 1],
 
             usuario_id=current_user.id,
-            departamento=request.form.get("departamento") or "C",
-            vendedor=request.form.get("vendedor") or "",
             sales_support=(getattr(current_user, "nombre", None) or current_user.email),
-            prioridad=request.form.get("prioridad") or "estándar",
 
             cliente=cliente_label,
             cliente_tipo=cliente_tipo,
             cliente_id=cliente_id,
             prospecto_nombre=prospecto_nombre,
 
-            tipo_embarque=det.get("tipo_embarque", ""),
-            incoterm=det.get("incoterm", ""),
-            un_clase=det.get("un_clase") or None,
-            estibable=bool(det.get("estibable", False)),
-            tipo_cambio=(det.get("tipo_cambio") or "") or None,
-            valor_factura=_to_float_or_none(det.get("valor_factura")) if det.get("seguro") else None,
-            seguro=bool(det.get("seguro", False)),
-
-            origen_pais=det.get("origen", {}).get("pais", ""),
-            origen_ciudad=det.get("origen", {}).get("ciudad", ""),
-            origen_cp=det.get("origen", {}).get("cp", ""),
-            origen_recoleccion=det.get("origen", {}).get("recoleccion") or None,
-            origen_puerto=det.get("origen", {}).get("puerto") or None,
-            origen_cruce=det.get("origen", {}).get("cruce") or None,
-            origen_despacho=det.get("origen", {}).get("despacho") or None,
-
-            destino_pais=det.get("destino", {}).get("pais", ""),
-            destino_ciudad=det.get("destino", {}).get("ciudad", ""),
-            destino_cp=det.get("destino", {}).get("cp", ""),
-            destino_entrega=det.get("destino", {}).get("entrega") or None,
-            destino_puerto=det.get("destino", {}).get("puerto") or None,
-            destino_cruce=det.get("destino", {}).get("cruce") or None,
-            destino_despacho=det.get("destino", {}).get("despacho") or None,
-
-            unidad=det.get("unidad", "") or "N/A",
-            servicio_unidad=det.get("servicio_unidad", "") or "sencillo",
-            maniobra=det.get("maniobra", "") or "ninguna",
-            numero_contenedor=str(det.get("numero_contenedor", "") or ""),
-            tipo_contenedor=(request.form.get(f"{tipo}_tipo_contenedor") or "") or None,
-
-            commodity=request.form.get("commodity") or "",
-            tipo_carga=request.form.get("tipo_carga") or "",
-            peso_unidad=request.form.get("peso_unidad") or "kg",
-            longitud_unidad=request.form.get("longitud_unidad") or "cm",
-            volumen_cbm=_to_float_or_none(request.form.get("volumen_cbm")) or 0.0,
-
-            cotiza_por=request.form.get("cotiza_por") or "totales",
-
-            no_s=int(request.form.get("no_s") or 0) or None,
-            dimensiones_totales=(request.form.get("dimensiones_totales") or "").strip()[:200] or None,
-            cbm_totales=_to_float_or_none(request.form.get("cbm_totales")),
-            gw_totales=_to_float_or_none(request.form.get("gw_totales")),
-            vw_totales=_to_float_or_none(request.form.get("vw_totales")),
-
-            no_dim=int(request.form.get("no_dim") or 0) or None,
-            largo_dim=_to_float_or_none(request.form.get("largo_dim")),
-            ancho_dim=_to_float_or_none(request.form.get("ancho_dim")),
-            alto_dim=_to_float_or_none(request.form.get("alto_dim")),
-            peso_dim=_to_float_or_none(request.form.get("peso_dim")),
-
-            totales_json=(request.form.get("totales_json") or None),
-            dimensiones_json=(request.form.get("dimensiones_json") or None),
-
-            # Cada hija conoce sólo su tipo
-            servicios_solicitados=json.dumps([tipo]),
-            comentarios=request.form.get("comentarios") or None,
-            asunto_email=request.form.get("asunto_email") or None,
-
             estatus="pendiente",
+            **campos_solicitud(tipo, det, request.form),
         )
         db.session.add(s)
         db.session.flush()  # s.id
 
         svc = SolicitudServicio(
             solicitud_id=s.id,
-            tipo_servicio=tipo_map[tipo],
-            modalidad=_map_modalidad(tipo, det.get("modalidad")),
+            tipo_servicio=TIPO_MAP[tipo],
+            modalidad=map_modalidad(tipo, det.get("modalidad")),
             detalle_json=det,  # JSON
         )
         db.session.add(svc)
+        db.session.add_all(SolicitudPieza(solicitud_id=s.id, **p) for p in piezas)
 
         creadas.append(s)
 
     db.session.commit()
     flash(f"Folio {folio.codigo} creado con {len(creadas)} solicitud(es).", "success")
+
+    # Avisa si pricing ya cotizó esa ruta hace poco (se puede reusar la cotización)
+    dias = current_app.config.get("RUTA_RECIENTES_DIAS", 30)
+    hermanas = [x.id for x in creadas]
+    for s in creadas:
+        previas = recientes_misma_ruta(s.lane_key, excluir_ids=hermanas, dias=dias, limite=5)
+        if previas:
+            detalle = ", ".join(
+                f"{p['numero_serie']} ({p['estatus']}, {len(p['opciones'])} opción(es))" for p in previas
+            )
+            flash(f"{s.numero_serie}: misma ruta cotizada en los últimos {dias} días: {detalle}.", "info")
+    return redirect(url_for("ventas.listar_solicitudes"))
+
+# --- EXPORTACIÓN (CSV/XLSX en streaming) ---
+@bp.get("/exportar/solicitudes")
+@login_required
+def exportar_solicitudes():
+    """?formato=csv|xlsx&mes=YYYY-MM (o desde/hasta=YYYY-MM-DD). Sólo admin."""
+    if (getattr(current_user, "rol", "") or "").lower() != "admin":
+        abort(403)
+    from app.services import exportar
+
+    formato = (request.args.get("formato") or "csv").lower()
+    try:
+        desde, hasta = exportar.rango_fechas(request.args.get("mes"), request.args.get("desde"),
+                                             request.args.get("hasta"))
+    except ValueError:
+        abort(400)
+    nombre = f"solicitudes_{request.args.get('mes') or datetime.utcnow().strftime('%Y%m%d')}"
+
+    if formato == "xlsx":
+        try:
+            f = exportar.xlsx_archivo(exportar.filas(desde, hasta))
+        except ValueError as e:
+            flash(str(e), "warning")
+            return redirect(url_for("ventas.listar_solicitudes"))
+        return Response(exportar.archivo_chunks(f),
+                        mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                        headers={"Content-Disposition": f'attachment; filename="{nombre}.xlsx"'})
+
+    # CSV: el primer bloque sale en cuanto hay filas; nada se junta en memoria
+    return Response(stream_with_context(exportar.csv_chunks(exportar.filas(desde, hasta))),
+                    mimetype="text/csv",
+                    headers={"Content-Disposition": f'attachment; filename="{nombre}.csv"',
+                             "X-Accel-Buffering": "no"})
+
+# --- LICITACIONES: muchas solicitudes desde un CSV/XLSX ---
+@bp.route("/licitaciones/importar", methods=["GET", "POST"])
+@login_required
+def importar_licitacion():
+    if request.method == "GET":
+        return render_template("Ventas/importar_licitacion.html", reporte=None)
+
+    f = request.files.get("file")
+    if not f or f.filename == "":
+        flash("Sube un archivo CSV o XLSX.", "warning")
+        return redirect(request.url)
+
+    try:
+        reporte = licitacion_import.importar_licitacion(
+            f.stream, f.filename,
+            usuario_id=current_user.id,
+            sales_support=(getattr(current_user, "nombre", None) or current_user.email),
+        )
+    except ValueError as e:
+        flash(str(e), "danger")
+        return redirect(request.url)
+
+    db.session.commit()
+    cat = "success" if not reporte["errores"] else "warning"
+    flash(f"Licitación procesada. Solicitudes creadas: {len(reporte['creadas'])}, "
+          f"filas con error: {len(reporte['errores'])}.", cat)
+    return render_template("Ventas/importar_licitacion.html", reporte=reporte)
+
+# --- CLONAR FOLIO (embarques repetidos) ---
+@bp.post("/folio/<int:folio_id>/clonar")
+@login_required
+def clonar_folio(folio_id: int):
+    folio = db.session.get(Folio, folio_id)
+    if not folio:
+        abort(404)
+    con_opciones = bool_from_radio(request.form.get("con_opciones"))
+
+    nuevo, copiadas = _clonar_folio(
+        folio.id,
+        codigo=generar_codigo_folio(),
+        usuario_id=current_user.id,
+        sales_support=(getattr(current_user, "nombre", None) or current_user.email),
+        con_opciones=con_opciones,
+    )
+    if not copiadas:
+        db.session.rollback()
+        flash("El folio no tiene solicitudes para clonar.", "warning")
+        return redirect(url_for("ventas.listar_solicitudes"))
+
+    db.session.commit()
+    extra = " con su última opción" if con_opciones else ""
+    flash(f"Folio {nuevo.codigo} creado desde {folio.codigo}: {copiadas} solicitud(es){extra}.", "success")
     return redirect(url_for("ventas.listar_solicitudes"))
 
 # --- COMPARADOR DE OPCIONES ---
@@ -313,9 +300,18 @@ def crear_solicitud():
 @bp.get("/solicitud/<int:sol_id>/opciones")
 @login_required
 def comparar_opciones(sol_id: int):
-    s = db.session.get(Solicitud, sol_id)
-    if not s:
-        abort(404)
+    firma = firma_solicitud(sol_id)
+    archivada = False
+    if firma:
+        etag = etag_de("ventas.comparar_opciones", current_user.id, *firma[0])
+        resp = no_modificado(etag, firma[1])
+        if resp:
+            return resp
+        s = db.session.get(Solicitud, sol_id)
+    else:
+        s, archivada = archivo.obtener(Solicitud, sol_id)
+        if not s:
+            abort(404)
     opciones = (s.cotizacion_opciones
                 .order_by(CotizacionOpcion.created_at.asc())
                 .all())
@@ -328,12 +324,16 @@ def comparar_opciones(sol_id: int):
                   .all())
         opciones_items[op.id] = rows
 
-    return render_template(
+    html = render_template(
         "Ventas/opciones.html",
         s=s,
         opciones=opciones,
         opciones_items=opciones_items,
+        archivada=archivada,
     )
+    if archivada:
+        return html
+    return con_validadores(make_response(html), etag, firma[1])
 
 
 # --- CONFIRMAR OPCIÓN ELEGIDA ---
@@ -373,6 +373,7 @@ def confirmar_opcion(op_id: int):
 
         r = (markup_pct / Decimal("100"))  # fracción
         rows = op.items.order_by(CotizacionItem.id.asc()).all()
+        estatus_anterior = s.estatus
 
         dec = VentaDecision(
             solicitud_id=s.id,
@@ -430,18 +431,19 @@ def confirmar_opcion(op_id: int):
         dec.margen_pct   = (sum_profit / sum_venta * Decimal("100")) if sum_venta > 0 else Decimal("0")
 
         # ---- mover estatus a OFERTADO ----
-        s.estatus = "ofertado"
+        sla.cambiar_estatus(s, "ofertado", current_user.id)
 
+        db.session.flush()
+        rollups.registrar_oferta(s, dec, estatus_anterior)
         db.session.commit()  # necesitamos dec.id para nombrar el PDF
 
-        # ---- generar PDF y guardar ruta ----
+        # ---- generar PDF y guardar su clave en el almacén ----
         out_rel = f"cotizaciones/{s.numero_serie}/cotizacion-op{op.id}-dec{dec.id}.pdf"
-        pdf_path = render_pdf(
+        dec.pdf_path = render_pdf(
             "Ventas/pdf_cotizacion.html",   # template del PDF
             out_rel_path=out_rel,
             s=s, op=op, rows=rows, dec=dec, now=datetime.utcnow
         )
-        dec.pdf_path = pdf_path
         db.session.commit()
 
         flash("Opción confirmada, PDF generado y estatus cambiado a 'ofertado'.", "success")
@@ -465,7 +467,8 @@ def marcar_resultado(sol_id: int, resultado: str):
     if resultado not in ("ganada", "perdida"):
         abort(400)
 
-    s.estatus = resultado
+    sla.cambiar_estatus(s, resultado, current_user.id)
+    rollups.registrar_resultado(s, resultado)
     db.session.commit()
     flash(f"Solicitud marcada como {resultado}.", "success")
     return redirect(url_for("ventas.listar_solicitudes"))
@@ -473,23 +476,63 @@ def marcar_resultado(sol_id: int, resultado: str):
 @bp.get("/decision/<int:dec_id>/pdf")
 @login_required
 def descargar_decision_pdf(dec_id: int):
-    dec = db.session.get(VentaDecision, dec_id)
+    dec, _ = archivo.obtener(VentaDecision, dec_id)
     if not dec:
         abort(404)
     pdf_path = (dec.pdf_path or "").strip()
-    if not pdf_path or not os.path.exists(pdf_path):
-        flash("El PDF no está disponible en el servidor.", "warning")
-        # vuelve al historial o a la solicitud asociada
-        if dec.solicitud_id:
-            return redirect(url_for("ventas.comparar_opciones", sol_id=dec.solicitud_id))
-        return redirect(url_for("ventas.listar_solicitudes"))
-
     # Sugerimos un nombre amigable de descarga
     filename = f"{dec.moneda or 'MXN'}_{dec.id}.pdf"
-    try:
-        return send_file(pdf_path, as_attachment=True, download_name=filename)
-    except Exception:
-        flash("No se pudo enviar el archivo.", "danger")
-        if dec.solicitud_id:
-            return redirect(url_for("ventas.comparar_opciones", sol_id=dec.solicitud_id))
-        return redirect(url_for("ventas.listar_solicitudes"))
+
+    if os.path.isabs(pdf_path):
+        # PDFs de antes del almacén (ruta absoluta); `flask migrar_pdfs` los mueve
+        if not os.path.exists(pdf_path):
+            return _pdf_no_disponible(dec)
+        try:
+            # conditional: ETag/Last-Modified del archivo, 304 y Range (werkzeug)
+            resp = send_file(pdf_path, as_attachment=True, download_name=filename,
+                             conditional=True, max_age=PDF_MAX_AGE)
+            resp.cache_control.public = False
+            resp.cache_control.private = True
+            return resp
+        except Exception:
+            flash("No se pudo enviar el archivo.", "danger")
+            return _pdf_no_disponible(dec, avisar=False)
+
+    alm = almacen()
+    info = alm.info(pdf_path) if pdf_path else None
+    if info is None:
+        return _pdf_no_disponible(dec)
+
+    # gzip tal cual si el cliente lo acepta; si no, se descomprime al vuelo.
+    # Son dos representaciones distintas: cada una con su ETag.
+    crudo = info.gzip and "gzip" in request.accept_encodings
+    codificacion = "gzip" if crudo else "identity"
+    etag = etag_de("pdf", pdf_path, info.tamano, info.modificado, codificacion)
+    resp = no_modificado(etag, info.modificado)
+    if resp is None:
+        resp = Response(alm.chunks(pdf_path, crudo=crudo, info=info),
+                        mimetype="application/pdf")
+        if crudo:
+            resp.headers["Content-Encoding"] = "gzip"
+            resp.content_length = info.tamano
+        resp.headers["Content-Disposition"] = f'attachment; filename="{filename}"'
+        con_validadores(resp, etag, info.modificado)
+        if not info.gzip:
+            # Guardado sin gzip: los bytes son los del archivo, así que ETag fuerte
+            # (If-Range lo exige) y Range/206 como send_file(conditional=True)
+            resp.set_etag(etag)
+            resp.make_conditional(request, accept_ranges=True, complete_length=info.tamano)
+    if info.gzip:
+        resp.vary.add("Accept-Encoding")
+    resp.cache_control.no_cache = None
+    resp.cache_control.max_age = PDF_MAX_AGE
+    return resp
+
+
+def _pdf_no_disponible(dec: VentaDecision, avisar: bool = True):
+    if avisar:
+        flash("El PDF no está disponible en el servidor.", "warning")
+    # vuelve al historial o a la solicitud asociada
+    if dec.solicitud_id:
+        return redirect(url_for("ventas.comparar_opciones", sol_id=dec.solicitud_id))
+    return redirect(url_for("ventas.listar_solicitudes"))
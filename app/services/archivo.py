@@ -0,0 +1,246 @@
+# app/services/archivo.py
+from __future__ import annotations
+
+import os
+from datetime import datetime, timedelta
+from typing import Any
+
+from flask import g
+from sqlalchemy import (
+    Column, Index, MetaData, Table, case, delete, event, func, insert, inspect, or_, select, text,
+)
+from sqlalchemy.exc import OperationalError, ProgrammingError
+from sqlalchemy.orm import Session
+
+from app import db
+from app.models import Solicitud
+
+# SQLite: nombre del ATTACH; otro motor: schema con ese nombre
+ESQUEMA = "archivo"
+ESTATUS_CERRADOS = ("ganada", "perdida", "cerrada")
+
+# Padres primero para copiar; se borran en orden inverso
+TABLAS = (
+    "folio", "solicitud", "solicitud_servicio", "solicitud_pieza", "solicitud_evento", "cotizacion",
+    "cotizacion_opcion", "cotizacion_item", "tarifa_historica", "venta_decision",
+    "venta_decision_item",
+)
+# Catálogos que las relaciones cargan junto con lo archivado: copia completa en cada corrida
+REFERENCIAS = ("concepto",)
+
+# Mismas tablas sin llaves foráneas (usuario/cliente se quedan en la base activa)
+_META = MetaData()
+
+
+def ruta_archivo(app) -> str:
+    return app.config.get("ARCHIVO_DB") or os.path.join(app.instance_path, "archivo.db")
+
+
+def init_app(app) -> None:
+    """SQLite: ATTACH de la base de archivo en cada conexión nueva del pool."""
+    app.teardown_appcontext(_cerrar_sesion)
+    if not app.config["SQLALCHEMY_DATABASE_URI"].startswith("sqlite"):
+        return
+    ruta = ruta_archivo(app)
+    with app.app_context():
+        engine = db.engine
+
+    @event.listens_for(engine, "connect")
+    def _attach(dbapi_conn, _record):
+        os.makedirs(os.path.dirname(ruta) or ".", exist_ok=True)
+        dbapi_conn.execute(f"ATTACH DATABASE ? AS {ESQUEMA}", (ruta,))
+
+
+# ---------- Lectura ----------
+def sesion_archivo() -> Session:
+    """Sesión de sólo lectura sobre el archivo: mismos modelos vía schema_translate_map."""
+    if "sesion_archivo" not in g:
+        g.sesion_archivo = Session(bind=db.engine.execution_options(schema_translate_map={None: ESQUEMA}))
+    return g.sesion_archivo
+
+
+def _cerrar_sesion(_exc=None) -> None:
+    s = g.pop("sesion_archivo", None)
+    if s is not None:
+        s.close()
+
+
+def obtener(modelo, pk: int) -> tuple[Any, bool]:
+    """(objeto, archivado): primero la base activa, luego el archivo. (None, False) si no está."""
+    obj = db.session.get(modelo, pk)
+    if obj is not None:
+        return obj, False
+    try:
+        obj = sesion_archivo().get(modelo, pk)
+    except (OperationalError, ProgrammingError):  # archivo aún sin tablas
+        sesion_archivo().rollback()
+        return None, False
+    return obj, obj is not None
+
+
+def buscar_solicitudes(q: str, limite: int = 200) -> list[tuple[Solicitud, bool]]:
+    """Por serie o cliente en la base activa y en el archivo: [(solicitud, archivada), ...]."""
+    patron = f"%{q.strip()}%"
+    stmt = (
+        select(Solicitud)
+        .where(or_(Solicitud.numero_serie.ilike(patron), Solicitud.cliente.ilike(patron)))
+        .order_by(Solicitud.fecha_solicitud.desc())
+        .limit(limite)
+    )
+    out = [(s, False) for s in db.session.scalars(stmt)]
+    if len(out) < limite:
+        try:
+            out += [(s, True) for s in sesion_archivo().scalars(stmt.limit(limite - len(out)))]
+        except (OperationalError, ProgrammingError):
+            sesion_archivo().rollback()
+    return out
+
+
+# ---------- Archivado ----------
+def _tabla_archivo(nombre: str) -> Table:
+    if f"{ESQUEMA}.{nombre}" in _META.tables:
+        return _META.tables[f"{ESQUEMA}.{nombre}"]
+    t = db.metadata.tables[nombre]
+    cols = [Column(c.name, c.type, primary_key=c.primary_key, nullable=c.nullable,
+                   autoincrement=False) for c in t.c]
+    # Índices de la tabla activa + uno por cada columna que era FK (para las relaciones)
+    indices = {tuple(c.name for c in ix.columns): ix.name for ix in t.indexes}
+    for c in t.c:
+        if c.foreign_keys and (c.name,) not in indices:
+            indices[(c.name,)] = f"ix_{nombre}_{c.name}"
+    ta = Table(nombre, _META, *cols, schema=ESQUEMA)
+    for columnas, ix_nombre in indices.items():
+        Index(ix_nombre, *[ta.c[c] for c in columnas])
+    return ta
+
+
+def preparar() -> None:
+    """Crea el schema (si no es SQLite) y las tablas del archivo que falten; refresca REFERENCIAS."""
+    conn = db.session.connection()
+    if conn.dialect.name != "sqlite":
+        conn.execute(text(f"CREATE SCHEMA IF NOT EXISTS {ESQUEMA}"))
+    else:
+        _exigir_autoincrement(conn)
+    for nombre in TABLAS + REFERENCIAS:
+        _tabla_archivo(nombre)
+    _META.create_all(conn, checkfirst=True)
+    _agregar_columnas(conn)
+    for nombre in REFERENCIAS:
+        t, ta = db.metadata.tables[nombre], _tabla_archivo(nombre)
+        conn.execute(delete(ta))
+        conn.execute(insert(ta).from_select([c.name for c in t.c], select(*t.c)))
+    db.session.commit()
+
+
+def _exigir_autoincrement(conn) -> None:
+    """
+    SQLite sin AUTOINCREMENT reasigna max(id)+1: un id archivado volvería a aparecer en la
+    base activa y obtener() daría el registro equivocado. No se archiva sin él.
+    """
+    sin = [
+        nombre for nombre in TABLAS
+        if "AUTOINCREMENT" not in (conn.execute(
+            text("SELECT sql FROM main.sqlite_master WHERE type = 'table' AND name = :n"), {"n": nombre}
+        ).scalar() or "").upper()
+    ]
+    if sin:
+        raise RuntimeError(f"Tablas sin AUTOINCREMENT ({', '.join(sin)}): corre `flask db upgrade` antes de archivar.")
+
+
+def _agregar_columnas(conn) -> None:
+    """Columnas nuevas en la base activa (migraciones posteriores) -> ADD COLUMN en el archivo."""
+    insp = inspect(conn)
+    for ta in _META.tables.values():
+        existentes = {c["name"] for c in insp.get_columns(ta.name, schema=ESQUEMA)}
+        for c in ta.c:
+            if c.name not in existentes:
+                conn.execute(text(f"ALTER TABLE {ESQUEMA}.{ta.name} ADD COLUMN {c.name} "
+                                  f"{c.type.compile(conn.dialect)}"))
+
+
+def candidatos(antes_de: datetime, limite: int) -> tuple[list[int], list[int]]:
+    """
+    (folio_ids, solicitud_ids) de un lote: folios cuyas hijas están TODAS cerradas y sin
+    cambios desde `antes_de`, más solicitudes cerradas y viejas sin folio.
+    """
+    abiertas = func.sum(case((Solicitud.estatus.in_(ESTATUS_CERRADOS), 0), else_=1))
+    folios = db.session.scalars(
+        select(Solicitud.folio_id)
+        .where(Solicitud.folio_id.isnot(None))
+        .group_by(Solicitud.folio_id)
+        .having(abiertas == 0, func.max(Solicitud.updated_at) < antes_de)
+        .order_by(Solicitud.folio_id)
+        .limit(limite)
+    ).all()
+    sols = db.session.scalars(
+        select(Solicitud.id).where(Solicitud.folio_id.in_(folios))
+    ).all() if folios else []
+    if len(folios) < limite:
+        sols += db.session.scalars(
+            select(Solicitud.id)
+            .where(Solicitud.folio_id.is_(None), Solicitud.estatus.in_(ESTATUS_CERRADOS),
+                   Solicitud.updated_at < antes_de)
+            .order_by(Solicitud.id)
+            .limit(limite - len(folios))
+        ).all()
+    return list(folios), list(sols)
+
+
+def _filtros(folio_ids: list[int], sol_ids: list[int]) -> dict[str, Any]:
+    """WHERE de cada tabla (sobre la tabla activa) para las filas del lote."""
+    t = db.metadata.tables
+    opciones = select(t["cotizacion_opcion"].c.id).where(t["cotizacion_opcion"].c.solicitud_id.in_(sol_ids))
+    decisiones = select(t["venta_decision"].c.id).where(t["venta_decision"].c.solicitud_id.in_(sol_ids))
+    return {
+        "folio": t["folio"].c.id.in_(folio_ids),
+        "solicitud": t["solicitud"].c.id.in_(sol_ids),
+        "solicitud_servicio": t["solicitud_servicio"].c.solicitud_id.in_(sol_ids),
+        "solicitud_pieza": t["solicitud_pieza"].c.solicitud_id.in_(sol_ids),
+        "solicitud_evento": t["solicitud_evento"].c.solicitud_id.in_(sol_ids),
+        "cotizacion": t["cotizacion"].c.solicitud_id.in_(sol_ids),
+        "cotizacion_opcion": t["cotizacion_opcion"].c.solicitud_id.in_(sol_ids),
+        "cotizacion_item": t["cotizacion_item"].c.opcion_id.in_(opciones),
+        "tarifa_historica": t["tarifa_historica"].c.opcion_id.in_(opciones),
+        "venta_decision": t["venta_decision"].c.solicitud_id.in_(sol_ids),
+        "venta_decision_item": t["venta_decision_item"].c.decision_id.in_(decisiones),
+    }
+
+
+def archivar_lote(folio_ids: list[int], sol_ids: list[int]) -> dict[str, int]:
+    """
+    Copia el lote al archivo (INSERT ... SELECT, mismos ids) y lo borra de la base activa,
+    hijos primero. Los ids no se reasignan (secuencias; en SQLite, AUTOINCREMENT). Una transacción por lote. Regresa filas movidas por tabla.
+    """
+    filtros = _filtros(folio_ids, sol_ids)
+    movidas: dict[str, int] = {}
+    try:
+        for nombre in TABLAS:
+            t = db.metadata.tables[nombre]
+            cols = [c.name for c in t.c]
+            res = db.session.execute(
+                insert(_tabla_archivo(nombre)).from_select(cols, select(*t.c).where(filtros[nombre]))
+            )
+            movidas[nombre] = res.rowcount
+        for nombre in reversed(TABLAS):
+            db.session.execute(delete(db.metadata.tables[nombre]).where(filtros[nombre]))
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return movidas
+
+
+def archivar(meses: int, lote: int = 200, max_lotes: int | None = None) -> dict[str, int]:
+    """Mueve por lotes los folios cerrados sin cambios en `meses` meses. Regresa totales por tabla."""
+    preparar()
+    antes_de = datetime.utcnow() - timedelta(days=30 * meses)
+    totales = dict.fromkeys(TABLAS, 0)
+    n = 0
+    while max_lotes is None or n < max_lotes:
+        folio_ids, sol_ids = candidatos(antes_de, lote)
+        if not sol_ids and not folio_ids:
+            break
+        for k, v in archivar_lote(folio_ids, sol_ids).items():
+            totales[k] += v
+        n += 1
+    return totales
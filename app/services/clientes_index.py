@@ -0,0 +1,136 @@
+# app/services/clientes_index.py
+from __future__ import annotations
+
+import threading
+import time
+from bisect import bisect_left
+from typing import Any
+
+from flask import current_app
+from sqlalchemy import event, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app import db
+from app.models import CacheVersion, Cliente
+from app.utils.normaliza import texto_norm
+
+# Entradas revisadas como máximo por búsqueda (prefijos muy cortos como "a")
+MAX_ESCANEO = 400
+
+# Fila de cache_version que sube con cada cambio de Cliente (compartida entre workers)
+VERSION = "clientes"
+
+
+class IndiceClientes:
+    """
+    Índice de prefijos de los clientes activos. Cada nombre entra una vez por cada
+    inicio de palabra ('grupo acme' -> 'grupo acme', 'acme'), en una lista ordenada
+    que se busca con bisect. Se reconstruye completo cuando cambia algún Cliente
+    (en cualquier worker: cada búsqueda compara cache_version con la cargada)
+    o cuando vence el TTL.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        # (claves, entradas) se publican juntas en un solo atributo: quien busca sin el lock
+        # nunca ve claves nuevas con entradas viejas. entradas: (posición de la palabra, id, nombre)
+        self._datos: tuple[list[str], list[tuple[int, int, str]]] = ([], [])
+        self._cargado_en: float | None = None
+        self._version: int | None = None
+
+    def invalidar(self) -> None:
+        self._cargado_en = None
+
+    def _vigente(self, version: int) -> bool:
+        if self._cargado_en is None or self._version != version:
+            return False
+        ttl = current_app.config.get("CLIENTES_INDICE_TTL", 300)
+        return (time.monotonic() - self._cargado_en) < ttl
+
+    def _construir(self, version: int) -> None:
+        filas = db.session.execute(
+            select(Cliente.id, Cliente.nombre).where(Cliente.activo.is_(True))
+        ).all()
+        items: list[tuple[str, int, int, str]] = []
+        for cid, nombre in filas:
+            palabras = texto_norm(nombre).split()
+            for i in range(len(palabras)):
+                items.append((" ".join(palabras[i:]), i, cid, nombre))
+        items.sort()
+        self._datos = ([it[0] for it in items], [it[1:] for it in items])
+        self._version = version
+        self._cargado_en = time.monotonic()
+
+    def buscar(self, q: str, limit: int = 10) -> list[dict[str, Any]]:
+        """Los `limit` clientes cuyo nombre tiene una palabra que empieza con `q`.
+        Primero los que empiezan con `q`, luego por nombre."""
+        texto = texto_norm(q)
+        if not texto:
+            return []
+        # lectura por PK; se toma antes de construir: un cambio a media carga fuerza otra
+        version = db.session.execute(
+            select(CacheVersion.version).where(CacheVersion.nombre == VERSION)
+        ).scalar() or 0
+        if not self._vigente(version):
+            with self._lock:
+                if not self._vigente(version):
+                    self._construir(version)
+
+        claves, entradas = self._datos
+        vistos: dict[int, tuple[int, str]] = {}
+        i = bisect_left(claves, texto)
+        fin = min(len(claves), i + MAX_ESCANEO)
+        while i < fin and claves[i].startswith(texto):
+            pos, cid, nombre = entradas[i]
+            if cid not in vistos or pos < vistos[cid][0]:
+                vistos[cid] = (pos, nombre)
+            i += 1
+
+        orden = sorted(vistos.items(), key=lambda kv: (kv[1][0] > 0, kv[1][1].casefold()))
+        return [{"id": cid, "nombre": nombre} for cid, (_, nombre) in orden[:limit]]
+
+
+indice_clientes = IndiceClientes()
+
+
+# ----------------- Invalidación -----------------
+@event.listens_for(Session, "after_flush")
+def _marcar_cambios_cliente(session, flush_context):
+    if any(isinstance(o, Cliente) for o in (*session.new, *session.dirty, *session.deleted)):
+        session.info["clientes_cambiaron"] = True
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _marcar_dml_cliente(orm_execute_state):
+    # INSERT/UPDATE/DELETE en bloque (p.ej. la importación de licitaciones) no pasan por el flush
+    if (orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete) \
+            and orm_execute_state.bind_mapper is not None \
+            and orm_execute_state.bind_mapper.class_ is Cliente:
+        orm_execute_state.session.info["clientes_cambiaron"] = True
+
+
+@event.listens_for(Session, "before_commit")
+def _subir_version(session):
+    # lo que aún no se ha flusheado también cuenta: el commit lo va a escribir
+    if not (session.info.get("clientes_cambiaron")
+            or any(isinstance(o, Cliente) for o in (*session.new, *session.dirty, *session.deleted))):
+        return
+    session.info["clientes_cambiaron"] = True
+    upd = (update(CacheVersion)
+           .where(CacheVersion.nombre == VERSION)
+           .values(version=CacheVersion.version + 1)
+           .execution_options(synchronize_session=False))
+    if session.execute(upd).rowcount == 0:
+        try:
+            with session.begin_nested():
+                session.add(CacheVersion(nombre=VERSION, version=1))
+        except IntegrityError:
+            session.execute(upd)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidar_indice(session):
+    if session.info.pop("clientes_cambiaron", False):
+        indice_clientes.invalidar()
+
@@ -0,0 +1,139 @@
+# app/services/clonar_folio.py
+from __future__ import annotations
+
+from sqlalchemy import String, and_, case, cast, func, insert, literal, null, select
+
+from app import db
+from app.models import (
+    Folio, Solicitud, SolicitudServicio, SolicitudPieza, CotizacionOpcion, CotizacionItem,
+)
+from app.services.solicitudes import reservar_series_anuales
+
+
+def _columnas(tabla, omitir: set[str]) -> list[str]:
+    return [c.name for c in tabla.c if c.name not in omitir]
+
+
+def clonar_folio(folio_id: int, codigo: str, usuario_id: int, sales_support: str,
+                 con_opciones: bool = False) -> tuple[Folio, int]:
+    """
+    Copia un folio con sus solicitudes hijas, sus SolicitudServicio y SolicitudPieza y, opcionalmente,
+    la última CotizacionOpcion de cada hija con sus ítems.
+    Todo son INSERT ... SELECT sobre la sesión actual (el commit lo hace quien llama).
+    Retorna (folio_nuevo, solicitudes_copiadas).
+    """
+    nuevo = Folio(codigo=codigo)
+    db.session.add(nuevo)
+    db.session.flush()  # nuevo.id
+
+    sol = Solicitud.__table__
+    orig = sol.alias("orig")
+    nueva = sol.alias("nueva")
+
+    # Serie por hija basada en folio: <codigo>-NN
+    seq = cast(orig.c.child_seq, String)
+    serie = literal(f"{codigo}-").concat(
+        case((orig.c.child_seq < 10, literal("0").concat(seq)), else_=seq)
+    )
+    # Serie anual Q####YYYY: un bloque reservado del contador, asignado en orden de child_seq
+    seqs = db.session.scalars(
+        select(orig.c.child_seq)
+        .where(orig.c.folio_id == folio_id, orig.c.child_seq.isnot(None))
+        .order_by(orig.c.child_seq)
+    ).all()
+    series_anuales = dict(zip(seqs, reservar_series_anuales(len(seqs))))
+    override = {
+        "folio_id": literal(nuevo.id),
+        "numero_serie": serie,
+        "numero_serie_anual": case(series_anuales, value=orig.c.child_seq) if series_anuales else null(),
+        "usuario_id": literal(usuario_id),
+        "sales_support": literal(sales_support),
+        "fecha_solicitud": func.now(),
+        "updated_at": func.now(),
+        "estatus": literal("pendiente"),
+        # la copia entra a la cola libre, sin el pricer ni el lease del original
+        "asignado_a_id": null(),
+        "lease_expira": null(),
+    }
+    cols = _columnas(sol, {"id"})
+    res = db.session.execute(
+        insert(sol).from_select(
+            cols,
+            select(*[override.get(c, orig.c[c]) for c in cols])
+            .where(orig.c.folio_id == folio_id, orig.c.child_seq.isnot(None))
+            .order_by(orig.c.child_seq),
+        )
+    )
+    copiadas = res.rowcount
+
+    # hija original -> hija nueva (mismo child_seq)
+    pares = orig.join(nueva, and_(nueva.c.folio_id == nuevo.id,
+                                  nueva.c.child_seq == orig.c.child_seq))
+
+    ss = SolicitudServicio.__table__
+    override = {"solicitud_id": nueva.c.id, "created_at": func.now()}
+    cols = _columnas(ss, {"id"})
+    db.session.execute(
+        insert(ss).from_select(
+            cols,
+            select(*[override.get(c, ss.c[c]) for c in cols])
+            .select_from(ss.join(pares, orig.c.id == ss.c.solicitud_id))
+            .where(orig.c.folio_id == folio_id),
+        )
+    )
+
+    pz = SolicitudPieza.__table__
+    override = {"solicitud_id": nueva.c.id}
+    cols = _columnas(pz, {"id"})
+    db.session.execute(
+        insert(pz).from_select(
+            cols,
+            select(*[override.get(c, pz.c[c]) for c in cols])
+            .select_from(pz.join(pares, orig.c.id == pz.c.solicitud_id))
+            .where(orig.c.folio_id == folio_id)
+            .order_by(pz.c.id),
+        )
+    )
+
+    if con_opciones:
+        op = CotizacionOpcion.__table__
+        it = CotizacionItem.__table__
+
+        # última opción de cada hija original
+        ultimas = (
+            select(func.max(op.c.id).label("id"))
+            .join(orig, orig.c.id == op.c.solicitud_id)
+            .where(orig.c.folio_id == folio_id)
+            .group_by(op.c.solicitud_id)
+            .subquery("ultimas")
+        )
+        override = {"solicitud_id": nueva.c.id, "created_at": func.now(), "updated_at": func.now()}
+        cols = _columnas(op, {"id", "version"})  # la copia arranca en version 1 (server_default)
+        db.session.execute(
+            insert(op).from_select(
+                cols,
+                select(*[override.get(c, op.c[c]) for c in cols])
+                .select_from(op.join(ultimas, ultimas.c.id == op.c.id)
+                             .join(pares, orig.c.id == op.c.solicitud_id)),
+            )
+        )
+
+        # ítems: opción original -> opción nueva (cada hija nueva tiene sólo la copiada)
+        op_nueva = op.alias("op_nueva")
+        override = {"opcion_id": op_nueva.c.id}
+        cols = _columnas(it, {"id"})
+        db.session.execute(
+            insert(it).from_select(
+                cols,
+                select(*[override.get(c, it.c[c]) for c in cols])
+                .select_from(
+                    it.join(ultimas, ultimas.c.id == it.c.opcion_id)
+                    .join(op, op.c.id == it.c.opcion_id)
+                    .join(pares, orig.c.id == op.c.solicitud_id)
+                    .join(op_nueva, op_nueva.c.solicitud_id == nueva.c.id)
+                )
+                .order_by(it.c.id),
+            )
+        )
+
+    return nuevo, copiadas
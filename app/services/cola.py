@@ -0,0 +1,97 @@
+# app/services/cola.py
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+from typing import Any
+
+from sqlalchemy import case, or_, select, update
+
+from app import db
+from app.models import Solicitud
+
+# Orden de atención: primero todas las urgentes, luego las estándar; dentro, la más vieja
+PRIORIDADES = ("urgente", "estándar")
+ESTATUS_COLA = ("pendiente", "en cotizacion")
+# Se toman sólo las que nadie ha empezado
+ESTATUS_TOMABLE = "pendiente"
+
+# Reintentos de "tomar siguiente" cuando otro pricer gana la misma fila
+REINTENTOS = 5
+
+
+def libre(ahora: datetime):
+    """Sin dueño o con el lease vencido."""
+    return or_(Solicitud.asignado_a_id.is_(None), Solicitud.lease_expira < ahora)
+
+
+def orden_prioridad():
+    return case({p: i for i, p in enumerate(PRIORIDADES)}, value=Solicitud.prioridad, else_=len(PRIORIDADES))
+
+
+def _reservar(sol_id, usuario_id: int, lease_min: int, ahora: datetime, *cond) -> int | None:
+    """
+    UPDATE condicional: sólo asigna si la fila sigue libre (o ya es del usuario) al escribir.
+    Dos pricers sobre la misma fila: uno actualiza 1 fila, el otro 0.
+    """
+    return db.session.execute(
+        update(Solicitud)
+        .where(Solicitud.id == sol_id, or_(libre(ahora), Solicitud.asignado_a_id == usuario_id), *cond)
+        .values(asignado_a_id=usuario_id, lease_expira=ahora + timedelta(minutes=lease_min))
+        .returning(Solicitud.id)
+        .execution_options(synchronize_session=False)
+    ).scalar()
+
+
+def tomar_siguiente(usuario_id: int, lease_min: int = 30, filtros: tuple = ()) -> int | None:
+    """
+    Asigna al usuario la solicitud 'pendiente' libre más prioritaria y más vieja.
+    Cada prioridad es un rango de ix_solicitud_cola (estatus, prioridad, fecha_solicitud):
+    el primer candidato se encuentra por índice y sólo se saltan las filas ya tomadas.
+    Regresa el id o None si la cola está vacía. El commit lo hace quien llama.
+    """
+    for _ in range(REINTENTOS):
+        ahora = datetime.utcnow()
+        candidato = None
+        for prioridad in PRIORIDADES + (None,):
+            q = select(Solicitud.id).where(Solicitud.estatus == ESTATUS_TOMABLE, libre(ahora), *filtros)
+            if prioridad is None:
+                q = q.where(Solicitud.prioridad.not_in(PRIORIDADES))
+            else:
+                q = q.where(Solicitud.prioridad == prioridad)
+            # Postgres: no esperar filas que otro pricer está tomando (SQLite lo ignora)
+            candidato = db.session.scalar(
+                q.order_by(Solicitud.fecha_solicitud, Solicitud.id).limit(1).with_for_update(skip_locked=True)
+            )
+            if candidato is not None:
+                break
+        if candidato is None:
+            return None
+        if _reservar(candidato, usuario_id, lease_min, ahora, Solicitud.estatus == ESTATUS_TOMABLE):
+            return candidato
+    return None
+
+
+def tomar(sol_id: int, usuario_id: int, lease_min: int = 30) -> bool:
+    """Toma (o renueva) una solicitud concreta si está libre o ya es del usuario."""
+    return _reservar(sol_id, usuario_id, lease_min, datetime.utcnow(),
+                     Solicitud.estatus.in_(ESTATUS_COLA)) is not None
+
+
+def soltar(sol_id: int, usuario_id: int | None = None) -> bool:
+    """Libera la solicitud; con usuario_id sólo si es suya (None: cualquiera, p. ej. admin)."""
+    q = update(Solicitud).where(Solicitud.id == sol_id, Solicitud.asignado_a_id.isnot(None))
+    if usuario_id is not None:
+        q = q.where(Solicitud.asignado_a_id == usuario_id)
+    res = db.session.execute(
+        q.values(asignado_a_id=None, lease_expira=None).execution_options(synchronize_session=False)
+    )
+    return bool(res.rowcount)
+
+
+def dueno(s: Solicitud, ahora: datetime | None = None) -> dict[str, Any] | None:
+    """{id, nombre, expira} del pricer si la solicitud tiene un lease vigente; si no, None."""
+    ahora = ahora or datetime.utcnow()
+    if not s.asignado_a_id or not s.lease_expira or s.lease_expira < ahora:
+        return None
+    u = s.asignado_a
+    return dict(id=s.asignado_a_id, nombre=(u.nombre or u.email) if u else "", expira=s.lease_expira)
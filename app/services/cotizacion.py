@@ -0,0 +1,285 @@
+# app/services/cotizacion.py
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Any, Iterable
+
+from sqlalchemy import and_, case, func, insert, literal, select
+
+from app import db
+from app.models import Concepto, CotizacionItem, CotizacionOpcion, Modalidad, Solicitud, VentaDecision
+from app.services.sla import cambiar_estatus_lote
+from app.services.tarifas import registrar_tarifas_opcion
+
+CAMPOS_OPCION = (
+    "proveedor", "moneda", "origen_final", "destino_final", "frecuencia",
+    "transito_estimado_dias", "dias_libres_destino", "terminos_condiciones", "tipo_servicio",
+)
+# CAMPOS_OPCION enteros (días); el resto es texto
+CAMPOS_OPCION_DIAS = ("transito_estimado_dias", "dias_libres_destino")
+
+
+# ---------- Regla LCL ----------
+def es_lcl(sol: Solicitud) -> bool:
+    return sol.modalidad == Modalidad.LCL
+
+
+def lcl_por_solicitud(solicitud_ids: Iterable[int]) -> dict[int, bool]:
+    """{solicitud_id: es LCL} con una sola consulta (columna modalidad de solicitud)."""
+    ids = set(solicitud_ids)
+    if not ids:
+        return {}
+    rows = db.session.execute(
+        select(Solicitud.id, Solicitud.modalidad).where(Solicitud.id.in_(ids))
+    ).all()
+    return {sid: mod == Modalidad.LCL for sid, mod in rows}
+
+
+def normalizar_cbm(valor: Any, lcl: bool) -> float | None:
+    """CBM cotizado; en LCL un volumen entre 0 y 1 se cobra como 1. Inválido -> None."""
+    if valor in (None, ""):
+        return None
+    try:
+        v = Decimal(str(valor))
+    except ArithmeticError:
+        return None
+    if lcl and Decimal("0") < v < Decimal("1"):
+        return 1.0
+    return float(v)
+
+
+def norm_cant(unidad: str | None, cant: float, lcl: bool) -> float:
+    """Cantidad de un ítem; en LCL con unidad CBM, 0<cant<1 => 1."""
+    if lcl and (unidad or "").upper() == "CBM" and 0 < cant < 1:
+        return 1.0
+    return cant
+
+
+def items_desde_datos(items_data: list[dict[str, Any]], moneda: str, lcl: bool) -> list[dict[str, Any]]:
+    """Columnas de CotizacionItem (sin opcion_id) a partir de los ítems del form/JSON."""
+    out = []
+    for it in items_data:
+        try:
+            cantidad = float(it.get("cantidad") or 0)
+        except (TypeError, ValueError):
+            cantidad = 0.0
+        unidad = (it.get("unidad") or "").upper()
+        out.append(dict(
+            concepto_id=it.get("concepto_id"),
+            concepto_nombre=(it.get("concepto_nombre") or "").strip() or None,
+            proveedor=(it.get("proveedor") or "").strip() or None,
+            moneda=(it.get("moneda") or moneda).upper(),
+            unidad=unidad or None,
+            cantidad=Decimal(str(norm_cant(unidad, cantidad, lcl))),
+            precio_unit=Decimal(str(it.get("precio_unit") or 0)),
+            iva_pct=Decimal(str(it.get("iva_pct") or 0)),        # 0–1
+            ret_iva_pct=Decimal(str(it.get("ret_iva_pct") or 0)),  # 0–1
+            isr_pct=Decimal(str(it.get("isr_pct") or 0)),        # 0–1
+        ))
+    return out
+
+
+# ---------- Alta en lote ----------
+def campos_opcion(o: dict[str, Any]) -> dict[str, Any]:
+    """
+    CAMPOS_OPCION de un dict del JSON, con las mismas reglas que el form de cotizar:
+    textos recortados (vacío = no viene), días como entero >= 0. Tipo inválido -> ValueError.
+    """
+    fila = {}
+    for k in CAMPOS_OPCION:
+        v = o.get(k)
+        if k in CAMPOS_OPCION_DIAS:
+            if isinstance(v, str):
+                v = v.strip() or None
+                if v is not None and not v.isdigit():
+                    raise ValueError(f"{k} debe ser un entero >= 0: {v!r}")
+            elif v is not None and (isinstance(v, bool) or not isinstance(v, int) or v < 0):
+                raise ValueError(f"{k} debe ser un entero >= 0: {v!r}")
+            v = int(v) if v is not None else None
+        elif v is not None:
+            if not isinstance(v, str):
+                raise ValueError(f"{k} debe ser texto: {v!r}")
+            v = v.strip() or None
+        if v is not None:
+            fila[k] = v
+    return fila
+
+
+def crear_opciones_lote(opciones: list[dict[str, Any]], usuario_id: int | None = None) -> list[int]:
+    """
+    Crea muchas CotizacionOpcion con sus ítems: una consulta para saber qué
+    solicitudes son LCL y un INSERT en lote por tabla, sin consultas por fila.
+    Cada dict trae solicitud_id, los CAMPOS_OPCION que apliquen, cbm_cotizado e
+    `items`. Las solicitudes 'pendiente' pasan a 'en cotizacion'. Un campo inválido
+    -> ValueError con el índice de la opción ('opciones[3]: ...').
+    Regresa los ids en el mismo orden; el commit lo hace quien llama.
+    """
+    if not opciones:
+        return []
+    lcl = lcl_por_solicitud(o["solicitud_id"] for o in opciones)
+    faltan = {o["solicitud_id"] for o in opciones} - set(lcl)
+    if faltan:
+        raise ValueError(f"Solicitudes inexistentes: {sorted(faltan)}")
+
+    filas = []
+    for i, o in enumerate(opciones):
+        try:
+            fila = campos_opcion(o)
+        except ValueError as e:
+            raise ValueError(f"opciones[{i}]: {e}") from None
+        fila["moneda"] = (fila.get("moneda") or "MXN").upper()
+        fila["solicitud_id"] = o["solicitud_id"]
+        fila["cbm_cotizado"] = normalizar_cbm(o.get("cbm_cotizado"), lcl[o["solicitud_id"]])
+        filas.append(fila)
+
+    ids = db.session.scalars(
+        insert(CotizacionOpcion).returning(CotizacionOpcion.id, sort_by_parameter_order=True),
+        filas,
+    ).all()
+
+    items = [
+        dict(opcion_id=op_id, **it)
+        for op_id, o, fila in zip(ids, opciones, filas)
+        for it in items_desde_datos(o.get("items") or [], fila["moneda"], lcl[o["solicitud_id"]])
+    ]
+    if items:
+        db.session.execute(insert(CotizacionItem), items)
+
+    cambiar_estatus_lote(set(lcl), "pendiente", "en cotizacion", usuario_id)
+    registrar_tarifas_opcion(ids)
+    return list(ids)
+
+
+# ---------- Copiar opción ----------
+def copiar_opcion(opcion_id: int, destino_sol_id: int, actualizar_impuestos: bool = False,
+                 usuario_id: int | None = None) -> int:
+    """
+    Duplica una CotizacionOpcion y sus ítems en otra solicitud (de cualquier folio):
+    un INSERT ... SELECT para la opción y otro para todos los ítems.
+    Aplica la regla LCL del destino al CBM cotizado y a las cantidades en CBM.
+    Con `actualizar_impuestos`, IVA/ret/ISR salen del catálogo actual de Concepto
+    (los ítems sin concepto conservan los suyos).
+    Regresa el id de la opción nueva; el commit lo hace quien llama.
+    """
+    lcl = lcl_por_solicitud([destino_sol_id]).get(destino_sol_id)
+    if lcl is None:
+        raise ValueError(f"No existe la solicitud {destino_sol_id}.")
+    tipo = db.session.scalar(select(Solicitud.tipo_servicio).where(Solicitud.id == destino_sol_id))
+
+    op = CotizacionOpcion.__table__
+    uno = literal(1.0)
+    cbm = op.c.cbm_cotizado
+    override = {
+        "solicitud_id": literal(destino_sol_id),
+        "cbm_cotizado": case((and_(cbm > 0, cbm < 1), uno), else_=cbm) if lcl else cbm,
+        "tipo_servicio": literal(tipo.value) if tipo else op.c.tipo_servicio,
+        "created_at": func.now(),
+        "updated_at": func.now(),
+    }
+    cols = [c.name for c in op.c if c.name not in ("id", "version")]
+    nuevo_id = db.session.execute(
+        insert(op).from_select(cols, select(*[override.get(c, op.c[c]) for c in cols])
+                               .where(op.c.id == opcion_id))
+        .returning(op.c.id)
+    ).scalar()
+    if nuevo_id is None:
+        raise ValueError(f"No existe la opción {opcion_id}.")
+
+    it = CotizacionItem.__table__
+    con = Concepto.__table__
+    cant = it.c.cantidad
+    override = {"opcion_id": literal(nuevo_id)}
+    if lcl:
+        override["cantidad"] = case(
+            (and_(func.upper(it.c.unidad) == "CBM", cant > 0, cant < 1), literal(Decimal("1"))),
+            else_=cant,
+        )
+    if actualizar_impuestos:
+        for c in ("iva_pct", "ret_iva_pct", "isr_pct"):
+            override[c] = func.coalesce(con.c[c], it.c[c])
+    cols = [c.name for c in it.c if c.name != "id"]
+    db.session.execute(
+        insert(it).from_select(
+            cols,
+            select(*[override.get(c, it.c[c]) for c in cols])
+            .select_from(it.outerjoin(con, con.c.id == it.c.concepto_id))
+            .where(it.c.opcion_id == opcion_id)
+            .order_by(it.c.id),
+        )
+    )
+
+    cambiar_estatus_lote([destino_sol_id], "pendiente", "en cotizacion", usuario_id)
+    return nuevo_id
+
+
+# ---------- Firma para caché HTTP ----------
+def firma_solicitud(sol_id: int) -> tuple[tuple, datetime | None] | None:
+    """
+    Valores que cambian cuando cambia algo visible de la solicitud, sus opciones,
+    sus ítems o sus decisiones, en una sola consulta de agregados:
+    ((partes...), última modificación). None si la solicitud no existe.
+    Los ítems no tienen timestamp, pero se reemplazan al editar: max(id) y count los delatan.
+    """
+    op, it, dec = CotizacionOpcion, CotizacionItem, VentaDecision
+    ops = select(op.id).where(op.solicitud_id == sol_id)
+    row = db.session.execute(
+        select(
+            Solicitud.updated_at,
+            select(func.max(op.updated_at)).where(op.solicitud_id == sol_id).scalar_subquery(),
+            select(func.count()).select_from(op).where(op.solicitud_id == sol_id).scalar_subquery(),
+            select(func.max(it.id)).where(it.opcion_id.in_(ops)).scalar_subquery(),
+            select(func.count()).select_from(it).where(it.opcion_id.in_(ops)).scalar_subquery(),
+            select(func.max(dec.created_at)).where(dec.solicitud_id == sol_id).scalar_subquery(),
+            select(func.max(dec.id)).where(dec.solicitud_id == sol_id).scalar_subquery(),
+        ).where(Solicitud.id == sol_id)
+    ).first()
+    if row is None:
+        return None
+    fechas = [f for f in (row[0], row[1], row[5]) if f is not None]
+    return tuple(row), (max(fechas) if fechas else None)
+
+
+# ---------- Misma ruta ----------
+def recientes_misma_ruta(lane_key: str | None, excluir_ids: Iterable[int] = (), dias: int = 30,
+                         limite: int = 10) -> list[dict[str, Any]]:
+    """
+    Solicitudes de los últimos `dias` con la misma lane_key (ix_solicitud_lane_key_fecha),
+    más recientes primero, con sus opciones y el total sin impuestos de cada una.
+    Dos consultas en total, sin importar cuántas solicitudes regrese.
+    """
+    if not lane_key:
+        return []
+    q = (
+        select(Solicitud.id, Solicitud.numero_serie, Solicitud.cliente, Solicitud.estatus,
+               Solicitud.fecha_solicitud)
+        .where(Solicitud.lane_key == lane_key,
+               Solicitud.fecha_solicitud >= datetime.utcnow() - timedelta(days=dias))
+        .order_by(Solicitud.fecha_solicitud.desc())
+        .limit(limite)
+    )
+    excluir = list(excluir_ids)
+    if excluir:
+        q = q.where(Solicitud.id.not_in(excluir))
+    sols = [dict(r._mapping, opciones=[]) for r in db.session.execute(q)]
+    if not sols:
+        return []
+
+    por_id = {s["id"]: s for s in sols}
+    op, it = CotizacionOpcion, CotizacionItem
+    total = (
+        select(func.sum(it.cantidad * it.precio_unit))
+        .where(it.opcion_id == op.id)
+        .correlate(op)
+        .scalar_subquery()
+    )
+    for r in db.session.execute(
+        select(op.id, op.solicitud_id, op.proveedor, op.moneda, op.updated_at, total.label("total"))
+        .where(op.solicitud_id.in_(list(por_id)))
+        .order_by(op.updated_at.desc(), op.id.desc())
+    ):
+        por_id[r.solicitud_id]["opciones"].append(dict(
+            id=r.id, proveedor=r.proveedor, moneda=r.moneda, updated_at=r.updated_at,
+            total=Decimal(str(r.total or 0)),
+        ))
+    return sols
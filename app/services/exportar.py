@@ -0,0 +1,145 @@
+# app/services/exportar.py
+from __future__ import annotations
+
+import csv
+import io
+import tempfile
+from datetime import datetime
+from decimal import Decimal
+from enum import Enum
+from typing import Any, Iterator
+
+from sqlalchemy import and_, select
+
+from app import db
+from app.models import CotizacionOpcion, Folio, Solicitud, VentaDecision
+
+# Filas por fetch del cursor del servidor
+YIELD_PER = 2000
+# Filas CSV por bloque enviado
+BLOQUE_CSV = 500
+
+COLUMNAS = (
+    ("folio", Folio.codigo),
+    ("solicitud_id", Solicitud.id),
+    ("numero_serie", Solicitud.numero_serie),
+    ("fecha_solicitud", Solicitud.fecha_solicitud),
+    ("cliente", Solicitud.cliente),
+    ("vendedor", Solicitud.vendedor),
+    ("tipo_servicio", Solicitud.tipo_servicio),
+    ("modalidad", Solicitud.modalidad),
+    ("estatus", Solicitud.estatus),
+    ("origen", Solicitud.origen_ciudad),
+    ("destino", Solicitud.destino_ciudad),
+    ("opcion_id", CotizacionOpcion.id),
+    ("proveedor", CotizacionOpcion.proveedor),
+    ("moneda_opcion", CotizacionOpcion.moneda),
+    ("cbm_cotizado", CotizacionOpcion.cbm_cotizado),
+    ("decision_id", VentaDecision.id),
+    ("moneda_venta", VentaDecision.moneda),
+    ("venta_total", VentaDecision.venta_total),
+    ("profit_total", VentaDecision.profit_total),
+    ("margen_pct", VentaDecision.margen_pct),
+    ("fecha_decision", VentaDecision.created_at),
+)
+ENCABEZADOS = [n for n, _ in COLUMNAS]
+
+
+def rango_fechas(mes: str | None = None, desde: str | None = None,
+                 hasta: str | None = None) -> tuple[datetime | None, datetime | None]:
+    """`mes` = 'YYYY-MM' (mes completo) o `desde`/`hasta` = 'YYYY-MM-DD' (hasta exclusivo)."""
+    if mes:
+        ini = datetime.strptime(mes, "%Y-%m")
+        fin = ini.replace(year=ini.year + 1, month=1) if ini.month == 12 else ini.replace(month=ini.month + 1)
+        return ini, fin
+    return (datetime.fromisoformat(desde) if desde else None,
+            datetime.fromisoformat(hasta) if hasta else None)
+
+
+def consulta(desde: datetime | None = None, hasta: datetime | None = None):
+    """Una fila por (solicitud, opción); la decisión de venta si esa opción fue la elegida."""
+    q = (
+        select(*[c for _, c in COLUMNAS])
+        .select_from(Solicitud)
+        .outerjoin(Folio, Folio.id == Solicitud.folio_id)
+        .outerjoin(CotizacionOpcion, CotizacionOpcion.solicitud_id == Solicitud.id)
+        .outerjoin(VentaDecision, and_(VentaDecision.opcion_id == CotizacionOpcion.id,
+                                       VentaDecision.solicitud_id == Solicitud.id))
+        .order_by(Solicitud.id, CotizacionOpcion.id, VentaDecision.id)
+    )
+    if desde:
+        q = q.where(Solicitud.fecha_solicitud >= desde)
+    if hasta:
+        q = q.where(Solicitud.fecha_solicitud < hasta)
+    return q
+
+
+def _valor(v: Any) -> Any:
+    if isinstance(v, Enum):
+        return v.value
+    if isinstance(v, Decimal):
+        return float(v)
+    if isinstance(v, datetime):
+        return v.replace(microsecond=0)
+    return v
+
+
+def filas(desde: datetime | None = None, hasta: datetime | None = None) -> Iterator[tuple]:
+    """Itera con cursor del servidor (stream_results + yield_per): memoria constante."""
+    res = db.session.execute(
+        consulta(desde, hasta).execution_options(stream_results=True, yield_per=YIELD_PER)
+    )
+    try:
+        for row in res:
+            yield tuple(_valor(v) for v in row)
+    finally:
+        res.close()
+
+
+def csv_chunks(rows: Iterator[tuple]) -> Iterator[bytes]:
+    """CSV UTF-8 con BOM (Excel), en bloques de BLOQUE_CSV filas."""
+    buf = io.StringIO()
+    w = csv.writer(buf)
+    buf.write("\ufeff")
+    w.writerow(ENCABEZADOS)
+    n = 0
+    for r in rows:
+        w.writerow(["" if v is None else v for v in r])
+        n += 1
+        if n % BLOQUE_CSV == 0:
+            yield buf.getvalue().encode("utf-8")
+            buf.seek(0)
+            buf.truncate()
+    yield buf.getvalue().encode("utf-8")
+
+
+def xlsx_archivo(rows: Iterator[tuple]):
+    """
+    XLSX en modo write_only de openpyxl (las filas van a disco, no a memoria).
+    Regresa un archivo temporal ya rebobinado; quien llama lo cierra.
+    """
+    try:
+        from openpyxl import Workbook
+    except ImportError:
+        raise ValueError("Para exportar XLSX instala openpyxl o usa CSV.")
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("solicitudes")
+    ws.append(ENCABEZADOS)
+    for r in rows:
+        ws.append(list(r))
+    tmp = tempfile.TemporaryFile()
+    wb.save(tmp)
+    tmp.seek(0)
+    return tmp
+
+
+def archivo_chunks(f, tam: int = 64 * 1024) -> Iterator[bytes]:
+    try:
+        while True:
+            data = f.read(tam)
+            if not data:
+                break
+            yield data
+    finally:
+        f.close()
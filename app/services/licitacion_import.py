@@ -0,0 +1,243 @@
+# app/services/licitacion_import.py
+from __future__ import annotations
+
+import csv
+from io import TextIOWrapper
+from typing import Any, Iterator
+
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+from app.models import Cliente, ClienteTipo, Folio, Solicitud, SolicitudPieza, SolicitudServicio
+from app.utils.normaliza import clave_cliente
+from app.utils.piezas import piezas_de
+from app.services.solicitudes import (
+    SERV_DETALLE_CAMPOS, TIPO_MAP, campos_solicitud, detalle_servicio, generar_codigo_folio, map_modalidad,
+    reservar_series_anuales,
+)
+
+# Filas por INSERT en lote
+LOTE = 500
+
+COLUMNAS_REQUERIDAS = ("cliente", "servicio")
+# Mismos nombres que los campos generales del form de nueva solicitud
+COLUMNAS_GENERALES = (
+    "cliente_tipo", "departamento", "vendedor", "prioridad", "commodity", "tipo_carga",
+    "peso_unidad", "longitud_unidad", "volumen_cbm", "cotiza_por",
+    "cbm_totales", "gw_totales", "vw_totales", "comentarios", "asunto_email",
+    "tipo_contenedor",
+)
+COLUMNAS_VALIDAS = set(COLUMNAS_REQUERIDAS) | set(COLUMNAS_GENERALES) | set(SERV_DETALLE_CAMPOS)
+COLUMNAS_NUMERICAS = ("volumen_cbm", "cbm_totales", "gw_totales", "vw_totales", "valor_factura")
+
+
+def _norm_header(h: Any) -> str:
+    return str(h if h is not None else "").strip().lower().replace(" ", "_")
+
+
+def leer_filas(archivo, nombre: str) -> tuple[list[str], Iterator[dict[str, str]]]:
+    """
+    Abre un CSV (UTF-8) o XLSX y regresa (encabezados, iterador de filas).
+    Las filas se leen una por una; nunca se carga el archivo completo.
+    """
+    ext = (nombre or "").rsplit(".", 1)[-1].lower()
+    if ext == "xlsx":
+        try:
+            from openpyxl import load_workbook
+        except ImportError:
+            raise ValueError("Para importar XLSX instala openpyxl o sube el archivo como CSV.")
+        wb = load_workbook(archivo, read_only=True, data_only=True)
+        rows = wb.active.iter_rows(values_only=True)
+        header = [_norm_header(h) for h in next(rows, ())]
+
+        def _xlsx():
+            try:
+                for r in rows:
+                    yield {h: ("" if v is None else str(v).strip()) for h, v in zip(header, r) if h}
+            finally:
+                wb.close()
+        return header, _xlsx()
+
+    if ext in ("csv", "txt"):
+        reader = csv.reader(TextIOWrapper(archivo, encoding="utf-8-sig", newline=""))
+        header = [_norm_header(h) for h in next(reader, [])]
+
+        def _csv():
+            for r in reader:
+                yield {h: (v or "").strip() for h, v in zip(header, r) if h}
+        return header, _csv()
+
+    raise ValueError("Formato no soportado: sube un archivo .csv o .xlsx.")
+
+
+def _preparar_fila(row: dict[str, str]) -> dict[str, Any]:
+    """Valida una fila y la traduce a los campos de Solicitud/SolicitudServicio."""
+    cliente = row.get("cliente", "")
+    if not cliente:
+        raise ValueError("Falta el cliente.")
+    tipo = row.get("servicio", "").lower()
+    if tipo not in TIPO_MAP:
+        raise ValueError(f"Servicio inválido '{row.get('servicio', '')}' (aereo, maritimo o terrestre).")
+    for col in COLUMNAS_NUMERICAS:
+        v = row.get(col, "")
+        if v:
+            try:
+                float(v)
+            except ValueError:
+                raise ValueError(f"'{col}' no es numérico: {v}")
+
+    # Reusa las funciones del form: los campos de servicio van como <tipo>_<campo>
+    form = {k: v for k, v in row.items() if k not in SERV_DETALLE_CAMPOS}
+    form.update({f"{tipo}_{k}": v for k, v in row.items() if k in SERV_DETALLE_CAMPOS})
+    if "tipo_contenedor" in row:
+        form[f"{tipo}_tipo_contenedor"] = row["tipo_contenedor"]
+    det = detalle_servicio(tipo, form)
+
+    # Los totales del carril quedan como un renglón de carga
+    piezas = piezas_de("totales", [{"piezas": None, "cbm": row.get("cbm_totales"),
+                                     "gw": row.get("gw_totales"), "vw": row.get("vw_totales")}], None,
+                       longitud_unidad=form.get("longitud_unidad") or "cm",
+                       peso_unidad=form.get("peso_unidad") or "kg")
+
+    es_prospecto = row.get("cliente_tipo", "").lower() == "prospecto"
+    return dict(
+        piezas=piezas,
+        tipo=tipo,
+        det=det,
+        cliente=cliente,
+        cliente_tipo=ClienteTipo.PROSPECTO if es_prospecto else ClienteTipo.CLIENTE,
+        campos=campos_solicitud(tipo, det, form),
+    )
+
+
+def _resolver_clientes(nombres: set[str]) -> dict[str, int]:
+    """{clave_cliente(nombre): cliente_id} con una consulta; crea en bloque los que falten."""
+    claves = {clave_cliente(nm): nm for nm in nombres}
+    ids = dict(db.session.execute(
+        select(Cliente.nombre_norm, Cliente.id)
+        .where(Cliente.nombre_norm.in_(list(claves)))
+    ).all())
+    faltan = [k for k in claves if k not in ids]
+    if faltan:
+        nuevos = db.session.scalars(
+            insert(Cliente).returning(Cliente.id, sort_by_parameter_order=True),
+            [{"nombre": claves[k], "nombre_norm": k, "activo": True} for k in faltan],
+        ).all()
+        ids.update(zip(faltan, nuevos))
+    return ids
+
+
+def _insertar_lote(lote: list[dict[str, Any]], usuario_id: int, sales_support: str) -> None:
+    """Un folio con una solicitud por carril; un INSERT en lote por tabla."""
+    clientes = _resolver_clientes({f["cliente"] for f in lote if f["cliente_tipo"] == ClienteTipo.CLIENTE})
+
+    series_anuales = reservar_series_anuales(len(lote))
+
+    folio_ids = db.session.scalars(
+        insert(Folio).returning(Folio.id, sort_by_parameter_order=True),
+        [{"codigo": f["codigo"]} for f in lote],
+    ).all()
+
+    sol_ids = db.session.scalars(
+        insert(Solicitud).returning(Solicitud.id, sort_by_parameter_order=True),
+        [
+            dict(
+                folio_id=folio_id,
+                child_seq=1,
+                numero_serie=f["serie"],
+                numero_serie_anual=serie_anual,
+                usuario_id=usuario_id,
+                sales_support=sales_support,
+                cliente=f["cliente"],
+                cliente_tipo=f["cliente_tipo"],
+                cliente_id=clientes.get(clave_cliente(f["cliente"])) if f["cliente_tipo"] == ClienteTipo.CLIENTE else None,
+                prospecto_nombre=f["cliente"] if f["cliente_tipo"] == ClienteTipo.PROSPECTO else None,
+                estatus="pendiente",
+                **f["campos"],
+            )
+            for folio_id, serie_anual, f in zip(folio_ids, series_anuales, lote)
+        ],
+    ).all()
+
+    db.session.execute(
+        insert(SolicitudServicio),
+        [
+            dict(
+                solicitud_id=sol_id,
+                tipo_servicio=TIPO_MAP[f["tipo"]],
+                modalidad=map_modalidad(f["tipo"], f["det"].get("modalidad")),
+                detalle_json=f["det"],
+            )
+            for sol_id, f in zip(sol_ids, lote)
+        ],
+    )
+
+    piezas = [dict(solicitud_id=sol_id, **p) for sol_id, f in zip(sol_ids, lote) for p in f["piezas"]]
+    if piezas:
+        db.session.execute(insert(SolicitudPieza), piezas)
+
+
+def _volcar_lote(lote: list[dict[str, Any]], reporte: dict[str, Any], usuario_id: int, sales_support: str) -> None:
+    """
+    Inserta el lote en un savepoint: si choca con la base (IntegrityError) se deshace sólo
+    ese lote, se reporta en su primera fila y la carga sigue con el siguiente.
+    """
+    try:
+        with db.session.begin_nested():
+            _insertar_lote(lote, usuario_id, sales_support)
+    except IntegrityError as e:
+        primera, ultima = lote[0]["num"], lote[-1]["num"]
+        reporte["errores"].append(
+            (primera, f"No se guardaron las filas {primera}-{ultima}: {getattr(e, 'orig', e)}")
+        )
+        return
+    reporte["creadas"].extend((f["num"], f["serie"]) for f in lote)
+
+
+def importar_licitacion(archivo, nombre: str, usuario_id: int, sales_support: str) -> dict[str, Any]:
+    """
+    Crea un folio + solicitud por cada carril (fila) de la licitación.
+    Las filas inválidas no detienen la carga: se reportan con su número de fila
+    (y un lote rechazado por la base, con su rango de filas).
+    El commit lo hace quien llama.
+    """
+    header, filas = leer_filas(archivo, nombre)
+    reporte: dict[str, Any] = {"filas": 0, "creadas": [], "errores": []}
+
+    faltan = [c for c in COLUMNAS_REQUERIDAS if c not in header]
+    desconocidas = [h for h in header if h and h not in COLUMNAS_VALIDAS]
+    if faltan or desconocidas:
+        msg = []
+        if faltan:
+            msg.append("faltan columnas: " + ", ".join(faltan))
+        if desconocidas:
+            msg.append("columnas desconocidas: " + ", ".join(desconocidas))
+        reporte["errores"].append((1, "; ".join(msg).capitalize() + "."))
+        return reporte
+
+    base = generar_codigo_folio()
+    n = 0
+    lote: list[dict[str, Any]] = []
+    for num, row in enumerate(filas, start=2):  # 2 por el header
+        if not any(row.values()):
+            continue
+        reporte["filas"] += 1
+        try:
+            f = _preparar_fila(row)
+        except ValueError as e:
+            reporte["errores"].append((num, str(e)))
+            continue
+
+        n += 1
+        f["num"] = num
+        f["codigo"] = f"{base}-L{n:04d}"
+        f["serie"] = f"{f['codigo']}-01"
+        lote.append(f)
+        if len(lote) >= LOTE:
+            _volcar_lote(lote, reporte, usuario_id, sales_support)
+            lote = []
+
+    if lote:
+        _volcar_lote(lote, reporte, usuario_id, sales_support)
+    return reporte
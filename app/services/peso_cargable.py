@@ -0,0 +1,91 @@
+# app/services/peso_cargable.py
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any, Iterable, Mapping, Sequence
+
+from flask import current_app
+
+if TYPE_CHECKING:
+    import numpy as np
+
+DIVISORES_DEFAULT = {"aereo": 6000, "maritimo": 1000, "terrestre": 3000}
+
+# Factores a cm y a kg
+CM_POR_UNIDAD = {"cm": 1.0, "m": 100.0, "mm": 0.1, "in": 2.54, "ft": 30.48}
+KG_POR_UNIDAD = {"kg": 1.0, "lb": 0.45359237, "t": 1000.0}
+
+CAMPOS_PIEZA = ("cantidad", "largo", "ancho", "alto", "peso", "cbm", "peso_vol")
+
+
+def divisores() -> dict[str, float]:
+    cfg = current_app.config.get("DIVISORES_VOLUMETRICOS") or {}
+    return {**DIVISORES_DEFAULT, **cfg}
+
+
+def _valor(p: Any, campo: str):
+    return p.get(campo) if isinstance(p, Mapping) else getattr(p, campo, None)
+
+
+def _columna(piezas: Sequence[Any], campo: str) -> np.ndarray:
+    """Columna float de las piezas; vacíos y no numéricos -> NaN."""
+    import numpy as np
+    out = np.full(len(piezas), np.nan)
+    for i, p in enumerate(piezas):
+        v = _valor(p, campo)
+        if v not in (None, ""):
+            try:
+                out[i] = float(v)
+            except (TypeError, ValueError):
+                pass
+    return out
+
+
+def _factores(piezas: Sequence[Any], campo: str, tabla: dict[str, float], default: str) -> np.ndarray:
+    import numpy as np
+    return np.array([tabla.get(str(_valor(p, campo) or default).lower(), 1.0) for p in piezas])
+
+
+def calcular_lote(envios: Sequence[Sequence[Any]], tipo: str,
+                  divisor: float | None = None) -> list[dict[str, float]]:
+    """
+    Totales por envío para muchos envíos a la vez. Cada envío es una lista de piezas
+    (dicts o SolicitudPieza) con cantidad, largo/ancho/alto por pieza, peso y cbm del
+    renglón, y longitud_unidad/peso_unidad. Todas las piezas se calculan en un solo
+    arreglo y se suman por envío con bincount.
+
+    Si un renglón no trae medidas se usa su cbm capturado, y si tampoco, su peso_vol.
+    """
+    import numpy as np  # diferido: no pesa en el arranque de workers/CLI
+
+    div = float(divisor or divisores().get(tipo, DIVISORES_DEFAULT["aereo"]))
+    piezas = [p for env in envios for p in env]
+    idx = np.repeat(np.arange(len(envios)), [len(env) for env in envios])
+    n = len(envios)
+
+    cant = np.nan_to_num(_columna(piezas, "cantidad"), nan=1.0)
+    cant[cant <= 0] = 1.0
+    cm = _factores(piezas, "longitud_unidad", CM_POR_UNIDAD, "cm")
+    kg = _factores(piezas, "peso_unidad", KG_POR_UNIDAD, "kg")
+
+    cm3 = _columna(piezas, "largo") * _columna(piezas, "ancho") * _columna(piezas, "alto") * cm ** 3 * cant
+    cbm = np.where(np.isnan(cm3), _columna(piezas, "cbm"), cm3 / 1e6)
+    peso = np.nan_to_num(_columna(piezas, "peso") * kg)
+    peso_vol = np.where(np.isnan(cbm), _columna(piezas, "peso_vol") * kg, cbm * 1e6 / div)
+
+    tot_piezas = np.bincount(idx, weights=cant, minlength=n)
+    tot_cbm = np.bincount(idx, weights=np.nan_to_num(cbm), minlength=n)
+    tot_peso = np.bincount(idx, weights=peso, minlength=n)
+    tot_vol = np.bincount(idx, weights=np.nan_to_num(peso_vol), minlength=n)
+    cargable = np.maximum(tot_peso, tot_vol)
+
+    return [
+        dict(piezas=int(tot_piezas[i]), cbm=round(float(tot_cbm[i]), 4),
+             peso_bruto_kg=round(float(tot_peso[i]), 2), peso_vol_kg=round(float(tot_vol[i]), 2),
+             peso_cargable_kg=round(float(cargable[i]), 2), divisor=div)
+        for i in range(n)
+    ]
+
+
+def calcular(piezas: Iterable[Any], tipo: str, divisor: float | None = None) -> dict[str, float]:
+    """Totales de un solo envío (ver calcular_lote)."""
+    return calcular_lote([list(piezas)], tipo, divisor)[0]
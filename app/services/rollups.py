@@ -0,0 +1,190 @@
+# app/services/rollups.py
+from __future__ import annotations
+
+from datetime import date
+from decimal import Decimal
+from typing import Any
+
+from sqlalchemy import String, and_, case, delete, func, insert, literal, select, update
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+from app.models import CotizacionOpcion, Solicitud, VentaDecision, VentaRollupDiario
+
+R = VentaRollupDiario
+
+CLAVE = ("fecha", "cliente", "ruta", "proveedor", "tipo_servicio", "modalidad", "vendedor", "moneda")
+METRICAS = ("ofertadas", "ganadas", "perdidas", "venta_total", "profit_total")
+
+# Agrupaciones de la página de analítica -> columnas del rollup
+DIMENSIONES = {
+    "cliente": (R.cliente,),
+    "ruta": (R.ruta,),
+    "proveedor": (R.proveedor,),
+    "modo": (R.tipo_servicio, R.modalidad),
+    "vendedor": (R.vendedor,),
+}
+
+
+def _ultima_decision(sol_id: int, antes_de: int | None = None) -> VentaDecision | None:
+    q = select(VentaDecision).where(VentaDecision.solicitud_id == sol_id)
+    if antes_de is not None:
+        q = q.where(VentaDecision.id < antes_de)
+    return db.session.scalar(q.order_by(VentaDecision.id.desc()).limit(1))
+
+
+def congelar_clave(s: Solicitud, dec: VentaDecision) -> None:
+    """
+    Copia a la decisión cliente/ruta/proveedor/modo/vendedor tal como están al confirmarla.
+    Después la opción y la solicitud se pueden editar sin mover la oferta de fila.
+    """
+    proveedor = db.session.scalar(
+        select(CotizacionOpcion.proveedor).where(CotizacionOpcion.id == dec.opcion_id)
+    )
+    dec.rollup_cliente = s.cliente or ""
+    dec.rollup_ruta = f"{s.origen_ciudad or ''} - {s.destino_ciudad or ''}"
+    dec.rollup_proveedor = proveedor or ""
+    dec.rollup_tipo_servicio = s.tipo_servicio.name if s.tipo_servicio else ""
+    dec.rollup_modalidad = s.modalidad.name if s.modalidad else ""
+    dec.rollup_vendedor = s.vendedor or ""
+
+
+def clave_de(s: Solicitud, dec: VentaDecision) -> dict[str, Any]:
+    """Fila del rollup a la que cuenta la decisión `dec`: su clave congelada (se congela si falta)."""
+    if dec.rollup_ruta is None:
+        congelar_clave(s, dec)
+    return dict(
+        fecha=(dec.created_at or s.fecha_solicitud).date(),
+        cliente=dec.rollup_cliente,
+        ruta=dec.rollup_ruta,
+        proveedor=dec.rollup_proveedor,
+        tipo_servicio=dec.rollup_tipo_servicio,
+        modalidad=dec.rollup_modalidad,
+        vendedor=dec.rollup_vendedor,
+        moneda=dec.moneda or "MXN",
+    )
+
+
+def _aporte(dec: VentaDecision, estatus: str | None, signo: int) -> dict[str, Any]:
+    return dict(
+        ofertadas=signo,
+        ganadas=signo if estatus == "ganada" else 0,
+        perdidas=signo if estatus == "perdida" else 0,
+        venta_total=signo * Decimal(str(dec.venta_total or 0)),
+        profit_total=signo * Decimal(str(dec.profit_total or 0)),
+    )
+
+
+def _aplicar(clave: dict[str, Any], delta: dict[str, Any]) -> None:
+    """UPDATE ... SET col = col + delta sobre la fila; si no existe, INSERT."""
+    valores = {k: getattr(R, k) + v for k, v in delta.items() if v}
+    if not valores:
+        return
+    cond = and_(*[getattr(R, k) == v for k, v in clave.items()])
+    stmt = update(R).where(cond).values(**valores).execution_options(synchronize_session=False)
+    if db.session.execute(stmt).rowcount:
+        return
+    try:
+        with db.session.begin_nested():
+            db.session.execute(insert(R).values(**clave, **{m: delta.get(m, 0) for m in METRICAS}))
+    except IntegrityError:
+        # otra transacción creó la fila entre el UPDATE y el INSERT
+        db.session.execute(stmt)
+
+
+def registrar_oferta(s: Solicitud, dec: VentaDecision, estatus_anterior: str | None) -> None:
+    """
+    Cuenta una decisión nueva (ya con flush y totales) y le congela la clave. Si la
+    solicitud ya tenía otra decisión, la de antes deja de contar junto con su resultado:
+    sólo cuenta la última.
+    """
+    congelar_clave(s, dec)
+    anterior = _ultima_decision(s.id, antes_de=dec.id)
+    if anterior:
+        _aplicar(clave_de(s, anterior), _aporte(anterior, estatus_anterior, -1))
+    _aplicar(clave_de(s, dec), _aporte(dec, s.estatus, 1))
+
+
+def registrar_resultado(s: Solicitud, resultado: str) -> None:
+    """Suma la ganada/perdida a la fila de la última decisión (su clave congelada, no la actual)."""
+    dec = _ultima_decision(s.id)
+    if dec and resultado in ("ganada", "perdida"):
+        _aplicar(clave_de(s, dec), {"ganadas" if resultado == "ganada" else "perdidas": 1})
+
+
+def reconstruir() -> int:
+    """
+    Borra y recalcula todo el rollup con un INSERT ... SELECT agrupado, con la clave
+    congelada de cada decisión (la actual sólo si no tiene). Retorna filas.
+    """
+    ultimas = (
+        select(func.max(VentaDecision.id).label("id"))
+        .group_by(VentaDecision.solicitud_id)
+        .subquery("ultimas")
+    )
+    vacio = literal("", String)
+    claves = [
+        func.date(func.coalesce(VentaDecision.created_at, Solicitud.fecha_solicitud)),
+        func.coalesce(VentaDecision.rollup_cliente, Solicitud.cliente),
+        func.coalesce(VentaDecision.rollup_ruta,
+                      Solicitud.origen_ciudad.concat(" - ").concat(Solicitud.destino_ciudad)),
+        func.coalesce(VentaDecision.rollup_proveedor, CotizacionOpcion.proveedor, vacio),
+        func.coalesce(VentaDecision.rollup_tipo_servicio, Solicitud.tipo_servicio, vacio),
+        func.coalesce(VentaDecision.rollup_modalidad, Solicitud.modalidad, vacio),
+        func.coalesce(VentaDecision.rollup_vendedor, Solicitud.vendedor),
+        func.coalesce(VentaDecision.moneda, literal("MXN", String)),
+    ]
+    metricas = [
+        func.count(),
+        func.sum(case((Solicitud.estatus == "ganada", 1), else_=0)),
+        func.sum(case((Solicitud.estatus == "perdida", 1), else_=0)),
+        func.sum(func.coalesce(VentaDecision.venta_total, 0)),
+        func.sum(func.coalesce(VentaDecision.profit_total, 0)),
+    ]
+    db.session.execute(delete(R))
+    res = db.session.execute(
+        insert(R).from_select(
+            list(CLAVE + METRICAS),
+            select(*claves, *metricas)
+            .select_from(VentaDecision)
+            .join(ultimas, ultimas.c.id == VentaDecision.id)
+            .join(Solicitud, Solicitud.id == VentaDecision.solicitud_id)
+            .outerjoin(CotizacionOpcion, CotizacionOpcion.id == VentaDecision.opcion_id)
+            .group_by(*claves),
+        )
+    )
+    return res.rowcount
+
+
+def resumen(por: str, desde: date, hasta: date, limite: int = 100) -> list[dict[str, Any]]:
+    """
+    Totales por dimensión en [desde, hasta] leyendo sólo el rollup.
+    win_rate = ganadas / (ganadas + perdidas); margen = profit / venta.
+    Los montos no se mezclan entre monedas.
+    """
+    dims = DIMENSIONES[por]
+    ofertadas = func.sum(R.ofertadas)
+    rows = db.session.execute(
+        select(*dims, R.moneda, ofertadas.label("ofertadas"),
+               func.sum(R.ganadas).label("ganadas"), func.sum(R.perdidas).label("perdidas"),
+               func.sum(R.venta_total).label("venta"), func.sum(R.profit_total).label("profit"))
+        .where(R.fecha >= desde, R.fecha <= hasta)
+        .group_by(*dims, R.moneda)
+        .having(ofertadas > 0)
+        .order_by(ofertadas.desc())
+        .limit(limite)
+    ).all()
+
+    out = []
+    for r in rows:
+        etiqueta = " · ".join(str(v) for v in r[:len(dims)] if v) or "—"
+        cerradas = (r.ganadas or 0) + (r.perdidas or 0)
+        venta = Decimal(str(r.venta or 0))
+        out.append(dict(
+            etiqueta=etiqueta, moneda=r.moneda,
+            ofertadas=r.ofertadas, ganadas=r.ganadas, perdidas=r.perdidas,
+            win_rate=(r.ganadas / cerradas * 100) if cerradas else None,
+            venta=venta, profit=Decimal(str(r.profit or 0)),
+            margen=(Decimal(str(r.profit or 0)) / venta * 100) if venta else None,
+        ))
+    return out
@@ -0,0 +1,250 @@
+# app/services/sla.py
+from __future__ import annotations
+
+from bisect import bisect_left
+from collections import defaultdict
+from datetime import date, datetime
+from typing import Any, Iterable
+
+from sqlalchemy import and_, bindparam, delete, func, insert, select, update
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+from app.models import SlaHistograma, Solicitud, SolicitudEvento, User
+
+H = SlaHistograma
+E = SolicitudEvento
+
+# Límites superiores (minutos) de cada cubeta; la última cubeta (len) es "más de 7 días"
+CUBETAS_MIN = (5, 15, 30, 60, 120, 240, 480, 1440, 2880, 5760, 10080)
+
+# Estatus cuyo tiempo de espera se mide en el tablero
+ESTATUS_SLA = ("pendiente", "en cotizacion", "ofertado")
+
+DIMENSIONES = {
+    "pricer": (H.pricer,),
+    "modo": (H.tipo_servicio,),
+    "prioridad": (H.prioridad,),
+}
+
+
+def cubeta(segundos: int) -> int:
+    return bisect_left(CUBETAS_MIN, segundos / 60)
+
+
+def _nombre(usuario_id: int | None) -> str:
+    u = db.session.get(User, usuario_id) if usuario_id else None
+    return (u.nombre or u.email) if u else ""
+
+
+def _pricer(sol_id: int, estatus_de: str, usuario_id: int | None) -> str:
+    """
+    Quien sale de 'pendiente' es quien toma la solicitud; para los estatus siguientes
+    el pricer es quien la pasó a 'en cotizacion' por primera vez.
+    """
+    if estatus_de == "pendiente":
+        return _nombre(usuario_id)
+    primero = db.session.scalar(
+        select(E.usuario_id)
+        .where(E.solicitud_id == sol_id, E.estatus_a == "en cotizacion")
+        .order_by(E.id)
+        .limit(1)
+    )
+    return _nombre(primero)
+
+
+def _entrada(sol_id: int, estatus: str, fecha_solicitud: datetime | None) -> datetime | None:
+    """Cuándo entró la solicitud a `estatus`: su último evento, o fecha_solicitud si no hay."""
+    ultimo = db.session.execute(
+        select(E.estatus_a, E.fecha).where(E.solicitud_id == sol_id).order_by(E.id.desc()).limit(1)
+    ).first()
+    if ultimo is None:
+        return fecha_solicitud
+    return ultimo.fecha if ultimo.estatus_a == estatus else None
+
+
+def _sumar(clave: dict[str, Any], n: int, segundos: int) -> None:
+    """UPDATE ... SET n = n + :n sobre la cubeta; si no existe, INSERT."""
+    cond = and_(*[getattr(H, k) == v for k, v in clave.items()])
+    stmt = (update(H).where(cond).values(n=H.n + n, suma_seg=H.suma_seg + segundos)
+            .execution_options(synchronize_session=False))
+    if db.session.execute(stmt).rowcount:
+        return
+    try:
+        with db.session.begin_nested():
+            db.session.execute(insert(H).values(**clave, n=n, suma_seg=segundos))
+    except IntegrityError:
+        # otra transacción creó la fila entre el UPDATE y el INSERT
+        db.session.execute(stmt)
+
+
+def _clave(fecha: date, estatus: str, pricer: str, tipo_servicio, prioridad: str | None,
+           segundos: int) -> dict[str, Any]:
+    return dict(
+        fecha=fecha,
+        estatus=estatus,
+        pricer=pricer or "",
+        tipo_servicio=getattr(tipo_servicio, "name", tipo_servicio) or "",
+        prioridad=prioridad or "",
+        cubeta=cubeta(segundos),
+    )
+
+
+def cambiar_estatus(s: Solicitud, nuevo: str, usuario_id: int | None = None) -> SolicitudEvento | None:
+    """
+    Cambia s.estatus y registra el evento y su tiempo en el histograma, en la transacción
+    de quien llama (el commit lo hace quien llama). Sin cambio real no registra nada.
+    """
+    anterior = s.estatus
+    if anterior == nuevo:
+        return None
+    ahora = datetime.utcnow()
+    entrada = _entrada(s.id, anterior, s.fecha_solicitud)
+    dur = max(0, int((ahora - entrada).total_seconds())) if entrada else None
+
+    s.estatus = nuevo
+    ev = E(solicitud_id=s.id, estatus_de=anterior, estatus_a=nuevo, usuario_id=usuario_id,
+           fecha=ahora, duracion_seg=dur)
+    db.session.add(ev)
+    if dur is not None:
+        pricer = _pricer(s.id, anterior, usuario_id)
+        _sumar(_clave(ahora.date(), anterior, pricer, s.tipo_servicio, s.prioridad, dur), 1, dur)
+    return ev
+
+
+def cambiar_estatus_lote(sol_ids: Iterable[int], de: str, a: str, usuario_id: int | None = None) -> list[int]:
+    """
+    Igual que cambiar_estatus para varias solicitudes que estén en `de`: un UPDATE, un INSERT
+    de eventos y una suma por cubeta. Regresa los ids que cambiaron.
+    """
+    sols = db.session.execute(
+        select(Solicitud.id, Solicitud.fecha_solicitud, Solicitud.tipo_servicio, Solicitud.prioridad)
+        .where(Solicitud.id.in_(set(sol_ids)), Solicitud.estatus == de)
+    ).all()
+    if not sols:
+        return []
+    ids = [r.id for r in sols]
+    ultimos = dict(
+        (r.solicitud_id, r) for r in db.session.execute(
+            select(E.solicitud_id, E.estatus_a, E.fecha)
+            .where(E.id.in_(select(func.max(E.id)).where(E.solicitud_id.in_(ids)).group_by(E.solicitud_id)))
+        )
+    )
+
+    db.session.execute(
+        update(Solicitud)
+        .where(Solicitud.id.in_(ids), Solicitud.estatus == de)
+        .values(estatus=a)
+        .execution_options(synchronize_session=False)
+    )
+
+    ahora = datetime.utcnow()
+    eventos = []
+    cubetas: dict[tuple, list[int]] = defaultdict(lambda: [0, 0])
+    for r in sols:
+        u = ultimos.get(r.id)
+        entrada = r.fecha_solicitud if u is None else (u.fecha if u.estatus_a == de else None)
+        dur = max(0, int((ahora - entrada).total_seconds())) if entrada else None
+        eventos.append(dict(solicitud_id=r.id, estatus_de=de, estatus_a=a, usuario_id=usuario_id,
+                            fecha=ahora, duracion_seg=dur))
+        if dur is not None:
+            clave = _clave(ahora.date(), de, _pricer(r.id, de, usuario_id), r.tipo_servicio, r.prioridad, dur)
+            acc = cubetas[tuple(clave.items())]
+            acc[0] += 1
+            acc[1] += dur
+    db.session.execute(insert(E), eventos)
+    for clave, (n, seg) in cubetas.items():
+        _sumar(dict(clave), n, seg)
+    return ids
+
+
+def reconstruir(lote: int = 1000) -> int:
+    """
+    Recalcula el histograma completo recorriendo los eventos en orden (y llena duracion_seg
+    donde falte, p. ej. los sembrados por la migración). Sólo ve la base activa: los eventos
+    ya archivados dejan de contar. Retorna filas del histograma.
+    """
+    nombres = {u.id: (u.nombre or u.email) for u in db.session.scalars(select(User))}
+    filas = db.session.execute(
+        select(E.id, E.solicitud_id, E.estatus_de, E.estatus_a, E.usuario_id, E.fecha, E.duracion_seg,
+               Solicitud.fecha_solicitud, Solicitud.tipo_servicio, Solicitud.prioridad)
+        .join(Solicitud, Solicitud.id == E.solicitud_id)
+        .order_by(E.solicitud_id, E.id)
+        .execution_options(yield_per=lote)
+    )
+
+    cubetas: dict[tuple, list[int]] = defaultdict(lambda: [0, 0])
+    duraciones: list[dict[str, int]] = []
+    sol_id, entrada, pricer = None, None, ""
+    for r in filas:
+        if r.solicitud_id != sol_id:
+            sol_id, entrada, pricer = r.solicitud_id, r.fecha_solicitud, ""
+        dur = r.duracion_seg
+        if dur is None and entrada is not None:
+            dur = max(0, int((r.fecha - entrada).total_seconds()))
+            duraciones.append({"_id": r.id, "_dur": dur})
+        if r.estatus_a == "en cotizacion" and not pricer:
+            pricer = nombres.get(r.usuario_id, "")
+        if dur is not None and r.estatus_de:
+            quien = nombres.get(r.usuario_id, "") if r.estatus_de == "pendiente" else pricer
+            acc = cubetas[tuple(_clave(r.fecha.date(), r.estatus_de, quien, r.tipo_servicio,
+                                       r.prioridad, dur).items())]
+            acc[0] += 1
+            acc[1] += dur
+        entrada = r.fecha
+
+    for i in range(0, len(duraciones), lote):
+        db.session.execute(
+            update(E.__table__).where(E.__table__.c.id == bindparam("_id")).values(duracion_seg=bindparam("_dur")),
+            duraciones[i:i + lote],
+        )
+    db.session.execute(delete(H))
+    if cubetas:
+        db.session.execute(insert(H), [dict(clave, n=n, suma_seg=seg) for clave, (n, seg) in cubetas.items()])
+    return len(cubetas)
+
+
+def _percentil(conteos: dict[int, int], total: int, q: float) -> float | None:
+    """Minutos del percentil q, interpolando dentro de la cubeta (la última no tiene tope)."""
+    if not total:
+        return None
+    objetivo = q * total
+    acumulado = 0
+    for i in sorted(conteos):
+        n = conteos[i]
+        if acumulado + n >= objetivo:
+            bajo = CUBETAS_MIN[i - 1] if i > 0 else 0
+            if i >= len(CUBETAS_MIN):
+                return float(bajo)
+            return bajo + (CUBETAS_MIN[i] - bajo) * (objetivo - acumulado) / n
+        acumulado += n
+    return float(CUBETAS_MIN[-1])
+
+
+def resumen(por: str, estatus: str, desde: date, hasta: date) -> list[dict[str, Any]]:
+    """n, promedio, p50 y p90 (minutos) del tiempo en `estatus` por dimensión; sólo lee el histograma."""
+    dims = DIMENSIONES[por]
+    rows = db.session.execute(
+        select(*dims, H.cubeta, func.sum(H.n).label("n"), func.sum(H.suma_seg).label("seg"))
+        .where(H.estatus == estatus, H.fecha >= desde, H.fecha <= hasta)
+        .group_by(*dims, H.cubeta)
+    ).all()
+
+    grupos: dict[tuple, dict[str, Any]] = {}
+    for r in rows:
+        g = grupos.setdefault(tuple(r[:len(dims)]), {"conteos": {}, "n": 0, "seg": 0})
+        g["conteos"][r.cubeta] = r.n
+        g["n"] += r.n
+        g["seg"] += r.seg or 0
+
+    out = []
+    for clave, g in grupos.items():
+        out.append(dict(
+            etiqueta=" · ".join(str(v) for v in clave if v) or "—",
+            n=g["n"],
+            promedio=g["seg"] / g["n"] / 60 if g["n"] else None,
+            p50=_percentil(g["conteos"], g["n"], 0.5),
+            p90=_percentil(g["conteos"], g["n"], 0.9),
+        ))
+    out.sort(key=lambda f: f["n"], reverse=True)
+    return out
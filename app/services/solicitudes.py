@@ -0,0 +1,254 @@
+# app/services/solicitudes.py
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+from app.models import Cliente, Folio, Modalidad, SerieAnual, TipoServicio
+from app.utils.normaliza import clave_cliente, clave_ruta
+from app.utils.piezas import lista_json
+
+TIPO_MAP = {
+    "aereo": TipoServicio.AEREO,
+    "maritimo": TipoServicio.MARITIMO,
+    "terrestre": TipoServicio.TERRESTRE,
+}
+
+
+def reservar_series_anuales(n: int) -> list[str]:
+    """
+    Siguientes `n` series Q####YYYY (una por solicitud nueva). Avanza el contador del año
+    con un UPDATE atómico dentro de la transacción en curso: el bloque es de quien lo pidió.
+    """
+    if n <= 0:
+        return []
+    anio = datetime.utcnow().year
+    upd = (update(SerieAnual)
+           .where(SerieAnual.anio == anio)
+           .values(ultimo=SerieAnual.ultimo + n)
+           .execution_options(synchronize_session=False))
+    if db.session.execute(upd).rowcount == 0:
+        # primer folio del año: crea el contador; si otro proceso se adelantó, incrementa el suyo
+        try:
+            with db.session.begin_nested():
+                db.session.add(SerieAnual(anio=anio, ultimo=n))
+        except IntegrityError:
+            db.session.execute(upd)
+    ultimo = db.session.execute(
+        select(SerieAnual.ultimo).where(SerieAnual.anio == anio)
+    ).scalar_one()
+    return [f"Q{i:04d}{anio}" for i in range(ultimo - n + 1, ultimo + 1)]
+
+
+def generar_numero_serie_anual() -> str:
+    """Siguiente serie Q####YYYY (ver reservar_series_anuales)."""
+    return reservar_series_anuales(1)[0]
+
+
+def generar_codigo_folio() -> str:
+    """Código único de folio padre (sufijo -N si ya hay otro en el mismo segundo)."""
+    base = "F-" + datetime.utcnow().strftime("%Y%m%d-%H%M%S")
+    usados = set(db.session.scalars(select(Folio.codigo).where(Folio.codigo.startswith(base))))
+
+    def libre(codigo: str) -> bool:
+        # también ocupado si ya se usó como prefijo (p.ej. folios de licitación <codigo>-L0001)
+        return codigo not in usados and not any(u.startswith(codigo + "-") for u in usados)
+
+    if libre(base):
+        return base
+    n = 2
+    while not libre(f"{base}-{n}"):
+        n += 1
+    return f"{base}-{n}"
+
+
+def bool_from_radio(val: str | None) -> bool:
+    return (val or "").strip().lower() in {"si", "sí", "true", "1", "on", "yes"}
+
+
+def _to_float_or_none(v: Any) -> Optional[float]:
+    if v is None:
+        return None
+    s = str(v).strip()
+    if s == "":
+        return None
+    try:
+        return float(s)
+    except ValueError:
+        return None
+
+
+# Campos <prefijo>_<campo> que lee detalle_servicio (también valida columnas de licitaciones)
+SERV_DETALLE_CAMPOS = (
+    "modalidad", "tipo_embarque", "incoterm", "un_clase", "estibable", "seguro",
+    "valor_factura", "tipo_cambio",
+    "origen_pais", "origen_ciudad", "origen_cp", "origen_recoleccion",
+    "origen_puerto", "origen_cruce", "origen_despacho",
+    "destino_pais", "destino_ciudad", "destino_cp", "destino_entrega",
+    "destino_puerto", "destino_cruce", "destino_despacho",
+    "unidad", "servicio_unidad", "maniobra",
+)
+
+
+def detalle_servicio(prefix: str, form) -> Dict[str, Any]:
+    """
+    Extrae el bloque de campos de un servicio con prefijo: aereo|maritimo|terrestre.
+    'modalidad' sólo aplica realmente a marítimo (FCL/LCL) según tu Enum.
+    `form` es cualquier mapping tipo request.form (el form o una fila de licitación).
+    """
+
+    def f(campo: str):
+        return form.get(f"{prefix}_{campo}")
+
+    modalidad = (f("modalidad") or "").upper().strip()
+    d = {
+        "modalidad": modalidad,  # útil para marítimo
+        "tipo_embarque": f("tipo_embarque") or "",
+        "incoterm": f("incoterm") or "",
+        "un_clase": f("un_clase") or "",
+        "estibable": bool_from_radio(f("estibable")),
+        "seguro": bool_from_radio(f("seguro") or "no"),
+        "valor_factura": (f("valor_factura") or "").strip(),
+        "tipo_cambio": f("tipo_cambio") or "",
+        "origen": {
+            "pais": f("origen_pais") or "",
+            "ciudad": f("origen_ciudad") or "",
+            "cp": f("origen_cp") or "",
+            "recoleccion": f("origen_recoleccion") or "",
+            "puerto": f("origen_puerto") or "",
+            "cruce": f("origen_cruce") or "",
+            "despacho": f("origen_despacho") or "",
+        },
+        "destino": {
+            "pais": f("destino_pais") or "",
+            "ciudad": f("destino_ciudad") or "",
+            "cp": f("destino_cp") or "",
+            "entrega": f("destino_entrega") or "",
+            "puerto": f("destino_puerto") or "",
+            "cruce": f("destino_cruce") or "",
+            "despacho": f("destino_despacho") or "",
+        },
+        "unidad": f("unidad") or "",
+        "servicio_unidad": f("servicio_unidad") or "",
+        "maniobra": f("maniobra") or "",
+    }
+
+    # Para marítimo-FCL admitimos lista de contenedores (si tu form los manda)
+    if modalidad == "FCL" and prefix == "maritimo":
+        cont_types = []
+        for k, v in form.items():
+            if k.startswith(f"{prefix}_cont_") and k.endswith("_tipo") and v:
+                base = k[:-5]  # quitar _tipo
+                cant = (form.get(f"{base}_cantidad") or "").strip()
+                cont_types.append({"tipo": v, "cantidad": int(cant or "0")})
+        if cont_types:
+            d["contenedores"] = cont_types
+            d["numero_contenedor"] = sum(c["cantidad"] for c in cont_types)
+    return d
+
+
+def campos_solicitud(tipo: str, det: Dict[str, Any], form) -> Dict[str, Any]:
+    """
+    Columnas de Solicitud que salen del detalle del TIPO y de los campos generales del form.
+    No incluye folio/serie/usuario/cliente (los pone quien crea la solicitud).
+    """
+    origen = det.get("origen", {})
+    destino = det.get("destino", {})
+    campos = dict(
+        departamento=form.get("departamento") or "C",
+        vendedor=form.get("vendedor") or "",
+        prioridad=form.get("prioridad") or "estándar",
+
+        tipo_embarque=det.get("tipo_embarque", ""),
+        incoterm=det.get("incoterm", ""),
+        un_clase=det.get("un_clase") or None,
+        estibable=bool(det.get("estibable", False)),
+        tipo_cambio=(det.get("tipo_cambio") or "") or None,
+        valor_factura=_to_float_or_none(det.get("valor_factura")) if det.get("seguro") else None,
+        seguro=bool(det.get("seguro", False)),
+
+        origen_pais=origen.get("pais", ""),
+        origen_ciudad=origen.get("ciudad", ""),
+        origen_cp=origen.get("cp", ""),
+        origen_recoleccion=origen.get("recoleccion") or None,
+        origen_puerto=origen.get("puerto") or None,
+        origen_cruce=origen.get("cruce") or None,
+        origen_despacho=origen.get("despacho") or None,
+
+        destino_pais=destino.get("pais", ""),
+        destino_ciudad=destino.get("ciudad", ""),
+        destino_cp=destino.get("cp", ""),
+        destino_entrega=destino.get("entrega") or None,
+        destino_puerto=destino.get("puerto") or None,
+        destino_cruce=destino.get("cruce") or None,
+        destino_despacho=destino.get("despacho") or None,
+
+        unidad=det.get("unidad", "") or "N/A",
+        servicio_unidad=det.get("servicio_unidad", "") or "sencillo",
+        maniobra=det.get("maniobra", "") or "ninguna",
+        numero_contenedor=str(det.get("numero_contenedor", "") or ""),
+        tipo_contenedor=(form.get(f"{tipo}_tipo_contenedor") or "") or None,
+
+        commodity=form.get("commodity") or "",
+        tipo_carga=form.get("tipo_carga") or "",
+        peso_unidad=form.get("peso_unidad") or "kg",
+        longitud_unidad=form.get("longitud_unidad") or "cm",
+        volumen_cbm=_to_float_or_none(form.get("volumen_cbm")) or 0.0,
+
+        cotiza_por=form.get("cotiza_por") or "totales",
+
+        no_s=int(form.get("no_s") or 0) or None,
+        dimensiones_totales=(form.get("dimensiones_totales") or "").strip()[:200] or None,
+        cbm_totales=_to_float_or_none(form.get("cbm_totales")),
+        gw_totales=_to_float_or_none(form.get("gw_totales")),
+        vw_totales=_to_float_or_none(form.get("vw_totales")),
+
+        no_dim=int(form.get("no_dim") or 0) or None,
+        largo_dim=_to_float_or_none(form.get("largo_dim")),
+        ancho_dim=_to_float_or_none(form.get("ancho_dim")),
+        alto_dim=_to_float_or_none(form.get("alto_dim")),
+        peso_dim=_to_float_or_none(form.get("peso_dim")),
+
+        totales_json=lista_json(form.get("totales_json")) or None,
+        dimensiones_json=lista_json(form.get("dimensiones_json")) or None,
+
+        # Cada hija conoce sólo su tipo
+        servicios_solicitados=[tipo],
+        tipo_servicio=TIPO_MAP[tipo],
+        modalidad=map_modalidad(tipo, det.get("modalidad")),
+        comentarios=form.get("comentarios") or None,
+        asunto_email=form.get("asunto_email") or None,
+    )
+    campos["lane_key"] = clave_ruta(campos)
+    return campos
+
+
+def ensure_cliente_for_name(nombre: str) -> Cliente:
+    nm = (nombre or "").strip()
+    if not nm:
+        raise ValueError("Nombre de cliente vacío.")
+    c = Cliente.query.filter_by(nombre_norm=clave_cliente(nm)).first()
+    if c:
+        return c
+    c = Cliente(nombre=nm, activo=True)
+    db.session.add(c)
+    db.session.flush()
+    return c
+
+
+def map_modalidad(tipo: str, raw: str | None) -> Modalidad | None:
+    """
+    Sólo tu Enum: FCL, LCL. Aplica a marítimo.
+    Para aéreo/terrestre regresamos None (no hay modalidad en el Enum para esos).
+    """
+    if tipo != "maritimo":
+        return None
+    v = (raw or "").strip().upper()
+    if v in {"FCL", "LCL"}:
+        return Modalidad[v]
+    # Por defecto, si no vino valor, asumimos LCL (ajústalo si prefieres FCL)
+    return Modalidad.LCL
@@ -0,0 +1,91 @@
+# app/services/tarifas.py
+from __future__ import annotations
+
+from typing import Any, Iterable
+
+from sqlalchemy import delete, func, insert, literal, select, String
+
+from app import db
+from app.models import CotizacionItem, CotizacionOpcion, Solicitud, TarifaHistorica
+
+T = TarifaHistorica
+
+# Máximo de precios por concepto en una consulta
+MAX_N = 10
+
+
+def registrar_tarifas_opcion(opcion_ids: Iterable[int]) -> None:
+    """
+    Reescribe las tarifas históricas de esas opciones desde sus ítems actuales
+    (DELETE + INSERT ... SELECT; sin cargar filas en Python). Sólo ítems con concepto
+    de catálogo; el proveedor del ítem manda sobre el de la opción.
+    """
+    ids = list(opcion_ids)
+    if not ids:
+        return
+    vacio = literal("", String)
+    db.session.execute(delete(T).where(T.opcion_id.in_(ids)))
+    db.session.execute(
+        insert(T).from_select(
+            ["concepto_id", "proveedor", "origen", "destino", "modo", "moneda", "unidad",
+             "precio_unit", "fecha", "opcion_id"],
+            select(
+                CotizacionItem.concepto_id,
+                func.trim(func.coalesce(func.nullif(func.trim(CotizacionItem.proveedor), ""),
+                                        CotizacionOpcion.proveedor)),
+                func.trim(Solicitud.origen_ciudad),
+                func.trim(Solicitud.destino_ciudad),
+                func.coalesce(CotizacionOpcion.tipo_servicio, vacio),
+                CotizacionItem.moneda,
+                CotizacionItem.unidad,
+                CotizacionItem.precio_unit,
+                func.coalesce(CotizacionOpcion.updated_at, func.now()),
+                CotizacionOpcion.id,
+            )
+            .select_from(CotizacionItem)
+            .join(CotizacionOpcion, CotizacionOpcion.id == CotizacionItem.opcion_id)
+            .join(Solicitud, Solicitud.id == CotizacionOpcion.solicitud_id)
+            .where(CotizacionItem.opcion_id.in_(ids), CotizacionItem.concepto_id.isnot(None))
+            .order_by(CotizacionItem.id),
+        )
+    )
+
+
+def ultimas_tarifas(concepto_ids: Iterable[int], origen: str, destino: str, modo: str,
+                    proveedor: str | None = None, n: int = 3,
+                    excluir_opcion: int | None = None) -> dict[int, list[dict[str, Any]]]:
+    """
+    Los `n` precios más recientes por concepto en la ruta, en una sola consulta
+    (ROW_NUMBER() por concepto sobre ix_tarifa_historica_ruta).
+    Regresa {concepto_id: [{precio_unit, moneda, unidad, proveedor, fecha, opcion_id}, ...]}.
+    """
+    ids = sorted({int(c) for c in concepto_ids})
+    if not ids:
+        return {}
+    n = max(1, min(n, MAX_N))
+    rn = func.row_number().over(partition_by=T.concepto_id, order_by=(T.fecha.desc(), T.id.desc()))
+    q = (
+        select(T.concepto_id, T.precio_unit, T.moneda, T.unidad, T.proveedor, T.fecha, T.opcion_id,
+               rn.label("rn"))
+        .where(T.concepto_id.in_(ids), T.origen == (origen or "").strip(),
+               T.destino == (destino or "").strip(), T.modo == (modo or ""))
+    )
+    if proveedor:
+        q = q.where(T.proveedor == proveedor.strip())
+    if excluir_opcion:
+        q = q.where(T.opcion_id != excluir_opcion)
+    sub = q.subquery()
+
+    out: dict[int, list[dict[str, Any]]] = {}
+    for r in db.session.execute(
+        select(sub).where(sub.c.rn <= n).order_by(sub.c.concepto_id, sub.c.rn)
+    ):
+        out.setdefault(r.concepto_id, []).append(dict(
+            precio_unit=float(r.precio_unit or 0),
+            moneda=r.moneda,
+            unidad=r.unidad or "",
+            proveedor=r.proveedor,
+            fecha=r.fecha.strftime("%Y-%m-%d") if r.fecha else None,
+            opcion_id=r.opcion_id,
+        ))
+    return out
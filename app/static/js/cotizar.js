@@ -0,0 +1,349 @@
+// app/static/js/cotizar.js — captura de opción (Pricing)
+/* ===== Helpers DOM ===== */
+const q  = (s, c=document)=>c.querySelector(s);
+const qa = (s, c=document)=>Array.from(c.querySelectorAll(s));
+const toNum = v => { const s=(v??'').toString().trim(); return s===''?0:parseFloat(s); };
+const clamp2 = n => isFinite(n) ? Math.round(n*100)/100 : 0;
+
+/* ===== Conversión tasas (UI % ⇄ interno fracción) ===== */
+const toRateDisplay  = v => { const n = toNum(v); return !isFinite(n) ? 0 : (n <= 1 ? n*100 : n); }; // 0.16 -> 16
+const toRateInternal = v => { const n = toNum(v); return !isFinite(n) ? 0 : (n > 1 ? n/100 : n);  }; // 16 -> 0.16
+
+/* ===== Carga de datos ===== */
+const dataEl = q('#cotizar-data');
+const IS_LCL     = (dataEl?.dataset.isLcl === '1');
+const MONEDA_DEF = (dataEl?.dataset.monedaDefault || 'MXN');
+const SOL_ID     = dataEl?.dataset.solId || '';
+const OPCION_ID  = dataEl?.dataset.opcionId || '';
+const SERVICIO   = dataEl?.dataset.servicio || '';
+const URL_TARIFAS = dataEl?.dataset.urlTarifas || '';
+
+function parseJSONTag(id){
+  const el = q(`#${id}`);
+  if (!el) return [];
+  try { return JSON.parse(el.textContent || '[]'); }
+  catch(e){ console.warn('JSON inválido en', id, e); return []; }
+}
+const CATALOG = parseJSONTag('catalogo-json');
+let ITEMS = parseJSONTag('items-json');
+
+/* ===== Referencias UI ===== */
+const selAddConcepto = q('#selAddConcepto');
+const btnAddFromSelect = q('#btnAddFromSelect');
+const tblBody        = q('#tblItems tbody');
+const sumSubtotalEl  = q('#sum_subtotal');
+const sumIvaEl       = q('#sum_iva');
+const sumRetEl       = q('#sum_ret');
+const sumTotalEl     = q('#sum_total');
+const totUsd         = q('#tot_usd');
+const totMxn         = q('#tot_mxn');
+const totEur         = q('#tot_eur');
+const hiddenItems    = q('#items_json');
+
+/* ===== Utilidades ===== */
+const esc = v => (v ?? '').toString().replace(/[&<>"']/g, ch => ({'&':'&amp;','<':'&lt;','>':'&gt;','"':'&quot;',"'":'&#39;'}[ch]));
+
+/* ===== Memoria de tarifas: últimos precios por concepto en esta ruta ===== */
+const SUGERENCIAS = {};  // concepto_id -> [{precio_unit, moneda, unidad, proveedor, fecha}]
+
+// Una sola petición para todos los conceptos que aún no se han consultado
+async function cargarSugerencias(ids){
+  ids = [...new Set(ids.filter(id => id && !(id in SUGERENCIAS)))];
+  if (!ids.length || !URL_TARIFAS || !SOL_ID) return;
+  ids.forEach(id => { SUGERENCIAS[id] = []; });
+  const params = new URLSearchParams({sol_id: SOL_ID, tipo: SERVICIO, n: '3'});
+  if (OPCION_ID) params.set('excluir_opcion', OPCION_ID);
+  ids.forEach(id => params.append('concepto_id', id));
+  try {
+    const r = await fetch(`${URL_TARIFAS}?${params}`, {headers: {'Accept': 'application/json'}});
+    if (!r.ok) return;
+    const data = await r.json();
+    Object.entries(data.tarifas || {}).forEach(([id, lista]) => { SUGERENCIAS[id] = lista; });
+    renderItems();
+  } catch(e){ console.warn('No se pudieron cargar tarifas históricas', e); }
+}
+
+function sugerenciasHtml(it){
+  const lista = it.concepto_id ? (SUGERENCIAS[it.concepto_id] || []) : [];
+  if (!lista.length) return '';
+  return `<div class="small mt-1">${lista.map((t, i) =>
+    `<button type="button" class="btn btn-link btn-sm p-0 me-2" data-sug="${i}"
+             title="${esc(t.proveedor)} · ${esc(t.fecha)}">${clamp2(t.precio_unit).toFixed(2)} ${esc(t.moneda)}</button>`
+  ).join('')}</div>`;
+}
+
+function aplicarSugerencia(idx, t){
+  const it = ITEMS[idx];
+  it.tarifa = t.precio_unit;   // precio_unit ya incluye PS
+  it.ps = 0;
+  it.moneda = t.moneda || it.moneda;
+  if (!it.proveedor) it.proveedor = t.proveedor || '';
+  if (!it.unidad) it.unidad = (t.unidad || '').toUpperCase();
+}
+
+// acción centralizada para agregar según selección
+function addFromSelect() {
+  if (!selAddConcepto) return;
+  const v = selAddConcepto.value;
+  if (!v) return;
+  if (v === '__OTROS__') {
+    addFromConcepto(null);
+  } else {
+    const id = parseInt(v, 10);
+    const c = conceptoById(id);
+    addFromConcepto(c || null);
+  }
+  selAddConcepto.value = ''; // limpiar selección
+}
+
+// enganchar botón y también Enter en el select
+btnAddFromSelect?.addEventListener('click', addFromSelect);
+selAddConcepto?.addEventListener('keydown', (e) => {
+  if (e.key === 'Enter') {
+    e.preventDefault();
+    addFromSelect();
+  }
+});
+
+function conceptoById(id){
+  id = id==null?null:parseInt(id,10);
+  if (!id) return null;
+  return CATALOG.find(c => c.id === id) || null;
+}
+function normalizeCantidad(unidad, cant){
+  let c = toNum(cant);
+  if (IS_LCL && (unidad||'').toUpperCase()==='CBM' && c>0 && c<1) c = 1;
+  return c;
+}
+function computeLine(row){
+  const tipo    = (row.tipo || 'Origen');
+  const unidad  = (row.unidad || '');
+  const cant    = normalizeCantidad(unidad, row.cantidad);
+  const tarifa  = toNum(row.tarifa);
+  const ps      = (tipo === 'Flete') ? toNum(row.ps) : 0;
+
+  const costo   = tarifa + ps;     // unitario
+  const base    = cant * costo;    // costo total base (sin impuestos)
+
+  // UI permite 16 -> 0.16
+  const ivaPct  = toRateInternal(row.iva_pct);
+  const retPct  = toRateInternal(row.ret_iva_pct);
+  const isrPct  = toRateInternal(row.isr_pct); // por si lo usas después
+
+  const iva  = base * ivaPct;      // proporcionales
+  const ret  = base * retPct;
+  const isr  = base * isrPct;
+
+  // Costo total = base + IVA + RET (no restamos retenciones)
+  const total = base + iva + ret;
+
+  return { costo, base, iva, ret, isr, total };
+}
+
+/* Faltaba esta función: transforma la fila UI en payload para backend */
+function asBackendPayload(row){
+  const tipo = (row.tipo || 'Origen');
+  const unidad = (row.unidad || '');
+  const cantidad = normalizeCantidad(unidad, row.cantidad);
+  const tarifa = toNum(row.tarifa);
+  const ps = (tipo === 'Flete') ? toNum(row.ps) : 0;
+
+  return {
+    concepto_id: row.concepto_id ?? null,
+    concepto_nombre: row.concepto_nombre || '',
+    proveedor: row.proveedor || '',
+    moneda: row.moneda || MONEDA_DEF,
+    unidad: unidad || null,
+    cantidad: cantidad,
+    precio_unit: tarifa + ps,
+    // Guardamos SIEMPRE como fracción 0–1
+    iva_pct: toRateInternal(row.iva_pct),
+    ret_iva_pct: toRateInternal(row.ret_iva_pct),
+    isr_pct: toRateInternal(row.isr_pct),
+    // Extras UI (ignorados por backend)
+    tipo: tipo,
+    ps: ps
+  };
+}
+
+/* ===== Render ===== */
+function renderItems(){
+  tblBody.innerHTML = '';
+  ITEMS.forEach((it, idx) => {
+    const calc = computeLine(it);
+    const tr = document.createElement('tr');
+    const isFlete = (it.tipo || 'Origen') === 'Flete';
+
+    tr.innerHTML = `
+      <td>
+        <select class="form-select form-select-sm" data-k="tipo">
+          ${['Origen','Flete','Destino'].map(t=>`<option value="${t}" ${t===(it.tipo||'Origen')?'selected':''}>${t}</option>`).join('')}
+        </select>
+      </td>
+      <td>
+        <input class="form-control form-control-sm" data-k="concepto_nombre" value="${it.concepto_nombre||''}" placeholder="Clave — Descripción">
+        <input type="hidden" data-k="concepto_id" value="${it.concepto_id??''}">
+        ${sugerenciasHtml(it)}
+      </td>
+      <td>
+        <input class="form-control form-control-sm" data-k="nombre_otros" value="${it.nombre_otros||''}" placeholder="Si no es del catálogo">
+      </td>
+      <td><input class="form-control form-control-sm" data-k="proveedor" value="${it.proveedor||''}" placeholder="Proveedor"></td>
+      <td>
+        <select class="form-select form-select-sm" data-k="moneda">
+          ${['MXN','USD','EUR'].map(m=>`<option value="${m}" ${m===(it.moneda||MONEDA_DEF)?'selected':''}>${m}</option>`).join('')}
+        </select>
+      </td>
+      <td><input class="form-control form-control-sm" list="unidadesList" data-k="unidad" value="${it.unidad||''}"></td>
+      <td><input class="form-control form-control-sm text-end" type="number" step="0.0001" data-k="cantidad" value="${it.cantidad??''}"></td>
+      <td><input class="form-control form-control-sm text-end" type="number" step="0.01" data-k="tarifa" value="${it.tarifa??(toNum(it.precio_unit)||0)}"></td>
+      <td><input class="form-control form-control-sm text-end" type="number" step="0.01" data-k="ps" value="${it.ps??0}" ${isFlete?'':'disabled'}></td>
+      <td class="text-end">${clamp2(calc.costo).toFixed(2)}</td>
+      <td class="text-end">${clamp2(calc.base).toFixed(2)}</td>
+      <td><input class="form-control form-control-sm text-end" type="number" step="0.01" data-k="iva_pct" value="${toRateDisplay(it.iva_pct)}" placeholder="%" title="Escribe 16 para 16%"></td>
+      <td class="text-end">${clamp2(calc.iva).toFixed(2)}</td>
+      <td><input class="form-control form-control-sm text-end" type="number" step="0.01" data-k="ret_iva_pct" value="${toRateDisplay(it.ret_iva_pct)}" placeholder="%" title="Escribe 4 para 4%"></td>
+      <td class="text-end">${clamp2(calc.ret).toFixed(2)}</td>
+      <td class="text-end"><button type="button" class="btn btn-sm btn-outline-danger" data-del>&times;</button></td>
+    `;
+
+    // Evita re-render en cada tecla: recalcula totales pero re-renderiza al salir del campo
+    qa('[data-k]', tr).forEach(inp=>{
+      const key = inp.dataset.k;
+
+      // oninput: solo recalcula totales
+      inp.addEventListener('input', ()=>{
+        let val = inp.value;
+        if (['cantidad','tarifa','ps','iva_pct','ret_iva_pct','isr_pct'].includes(key)) val = toNum(val);
+        ITEMS[idx][key] = val;
+        computeTotals();
+      });
+
+      // onblur: normaliza y re-renderiza fila
+      inp.addEventListener('blur', ()=>{
+        if (['tarifa','ps'].includes(key)) inp.value = clamp2(toNum(inp.value)).toFixed(2);
+        if (['iva_pct','ret_iva_pct','isr_pct'].includes(key)) {
+          const asPct = toRateDisplay(inp.value); // fuerza a 0–100
+          inp.value = clamp2(asPct).toFixed(2);
+        }
+        renderItems();
+        computeTotals();
+      });
+    }); // <-- FALTABA cerrar este forEach
+
+    qa('[data-sug]', tr).forEach(btn=>{
+      btn.addEventListener('click', ()=>{
+        aplicarSugerencia(idx, SUGERENCIAS[it.concepto_id][parseInt(btn.dataset.sug, 10)]);
+        renderItems();
+        computeTotals();
+      });
+    });
+
+    tr.querySelector('[data-del]')?.addEventListener('click', ()=>{
+      ITEMS.splice(idx,1);
+      renderItems();
+      computeTotals();
+    });
+
+    tblBody.appendChild(tr);
+  });
+
+  hiddenItems.value = JSON.stringify(ITEMS.map(asBackendPayload));
+}
+
+function computeTotals(){
+  const byM = {};
+  ITEMS.forEach(it=>{
+    const m = (it.moneda || MONEDA_DEF);
+    const r = computeLine(it);
+    byM[m] ??= {sub:0, iva:0, ret:0, isr:0, total:0};
+    byM[m].sub   += r.base;
+    byM[m].iva   += r.iva;
+    byM[m].ret   += r.ret;
+    byM[m].isr   += r.isr;
+    byM[m].total += r.total;
+  });
+
+  const usd = byM['USD'] || {total:0};
+  const mxn = byM['MXN'] || {total:0};
+  const eur = byM['EUR'] || {total:0};
+  totUsd.textContent = `Total USD: ${clamp2(usd.total).toFixed(2)}`;
+  totMxn.textContent = `Total MXN: ${clamp2(mxn.total).toFixed(2)}`;
+  totEur.textContent = `Total EUR: ${clamp2(eur.total).toFixed(2)}`;
+
+  // Para la fila de subtotales visibles (usa la moneda de mayor total)
+  const main = Object.entries(byM).sort((a,b)=>b[1].total - a[1].total)[0];
+  const m = main ? main[0] : 'MXN';
+  const t = main ? main[1] : {sub:0, iva:0, ret:0, total:0};
+  sumSubtotalEl.textContent = `${clamp2(t.sub).toFixed(2)} ${m}`;
+  sumIvaEl.textContent      = `${clamp2(t.iva).toFixed(2)} ${m}`;
+  sumRetEl.textContent      = `${clamp2(t.ret).toFixed(2)} ${m}`;
+  sumTotalEl.textContent    = `${clamp2(t.total).toFixed(2)} ${m}`;
+}
+
+/* ===== Acciones ===== */
+function addFromConcepto(c){
+  const base = {
+    tipo: 'Origen',
+    tarifa: 0,
+    ps: 0,
+    nombre_otros: '',
+    concepto_id: c?.id || null,
+    concepto_nombre: c ? `${c.clave} — ${c.descripcion}` : '',
+    proveedor: '',
+    moneda: c?.moneda || 'MXN',
+    unidad: (c?.unidad || '').toUpperCase(),
+    cantidad: 1,
+    precio_unit: 0,
+    // Al traer del catálogo (guardado en fracción), muéstralo en % al usuario
+    iva_pct: toRateDisplay(c?.iva_pct),
+    ret_iva_pct: toRateDisplay(c?.ret_iva_pct),
+    isr_pct: toRateDisplay(c?.isr_pct),
+  };
+  ITEMS.push(base);
+  renderItems();
+  computeTotals();
+  if (c) cargarSugerencias([c.id]);
+}
+
+document.addEventListener('DOMContentLoaded', ()=>{
+  ITEMS = (ITEMS || []).map(it=>{
+    const c = it.concepto_id ? conceptoById(it.concepto_id) : null;
+    const srcIva = (it.iva_pct ?? c?.iva_pct ?? 0);
+    const srcRet = (it.ret_iva_pct ?? c?.ret_iva_pct ?? 0);
+    const srcIsr = (it.isr_pct ?? c?.isr_pct ?? 0);
+    return {
+      tipo: it.tipo || 'Origen',
+      tarifa: toNum(it.precio_unit || 0),
+      ps: toNum(it.ps || 0),
+      concepto_id: it.concepto_id ?? null,
+      concepto_nombre: it.concepto_nombre || (c ? `${c.clave} — ${c.descripcion}` : ''),
+      proveedor: it.proveedor || '',
+      moneda: it.moneda || 'MXN',
+      unidad: (it.unidad || c?.unidad || '').toUpperCase(),
+      cantidad: toNum(it.cantidad),
+      precio_unit: toNum(it.precio_unit),
+      // MUÉSTRALAS en porcentaje (si venían como fracción, multiplícalas x100)
+      iva_pct: toRateDisplay(srcIva),
+      ret_iva_pct: toRateDisplay(srcRet),
+      isr_pct: toRateDisplay(srcIsr),
+      nombre_otros: it.concepto_id ? '' : (it.concepto_nombre || ''),
+    };
+  });
+
+  renderItems();
+  computeTotals();
+  cargarSugerencias(ITEMS.map(it => it.concepto_id));
+
+  selAddConcepto?.addEventListener('change', ()=>{
+    const v = selAddConcepto.value;
+    if (!v) return;
+    if (v === '__OTROS__'){
+      addFromConcepto(null);
+    } else {
+      const c = conceptoById(parseInt(v,10));
+      addFromConcepto(c);
+    }
+    selAddConcepto.value = '';
+  });
+});
@@ -0,0 +1,458 @@
+// app/static/js/nueva_solicitud.js — formulario de nueva solicitud (Ventas)
+// ---------- utilidades ----------
+const SVC_PREFIXES = ["aereo","maritimo","terrestre"];
+const CITIES_BY_COUNTRY = {"México":["CDMX","Guadalajara","Monterrey"],"USA":["Houston","Dallas","Los Angeles"]};
+const q  = (sel, ctx=document) => ctx.querySelector(sel);
+const qa = (sel, ctx=document) => Array.from(ctx.querySelectorAll(sel));
+const toNum  = v => { const s=(v??'').toString().trim(); return s===''?0:parseFloat(s); };
+const clamp2 = n => isFinite(n) ? Math.round(n*100)/100 : 0;
+const activeServices = () => SVC_PREFIXES.filter(p => q(`input[name="servicios[]"][value="${p}"]`)?.checked);
+
+// ---------- Cliente / Prospecto ----------
+function syncClienteHidden(){
+  const tipo = q('input[name="cliente_tipo"]:checked')?.value;
+  const hidden = q('#cliente_hidden');
+  if (!hidden) return;
+  if (tipo === 'cliente') {
+    hidden.value = (q('#cliente_buscar')?.value || '').trim();
+  } else {
+    const p = q('#prospecto_nombre');
+    hidden.value = (p?.value || '').trim();
+  }
+}
+function toggleProspecto(){
+  const isPros = q('input[name="cliente_tipo"]:checked')?.value === 'prospecto';
+  q('#prospectoField').hidden = !isPros;
+  q('#clienteSelectWrap').hidden = !!isPros;
+  const prospecto = q('#prospecto_nombre');
+  const clienteTxt = q('#cliente_buscar');
+  if (prospecto) prospecto.required = isPros;
+  if (clienteTxt) clienteTxt.required = !isPros;
+  if (isPros && clienteTxt) { clienteTxt.value = ""; q('#cliente_id').value = ""; }
+  if (!isPros && prospecto) prospecto.value = "";
+  syncClienteHidden();
+}
+
+// Autocompletado: si el texto no viene de una sugerencia, cliente_id va vacío
+// y el backend busca/crea el cliente por nombre.
+function initClienteTypeahead(){
+  const input = q('#cliente_buscar'), idInput = q('#cliente_id'), lista = q('#clienteSugerencias');
+  if (!input || !lista) return;
+  let timer = null, ctrl = null;
+  const cerrar = () => { lista.hidden = true; lista.innerHTML = ''; };
+  const elegir = (it) => { input.value = it.nombre; idInput.value = it.id; cerrar(); syncClienteHidden(); };
+
+  input.addEventListener('input', () => {
+    idInput.value = '';
+    syncClienteHidden();
+    clearTimeout(timer);
+    const texto = input.value.trim();
+    if (!texto) { cerrar(); return; }
+    timer = setTimeout(async () => {
+      ctrl?.abort();
+      ctrl = new AbortController();
+      try {
+        const url = `${input.dataset.url}?q=${encodeURIComponent(texto)}&limit=10`;
+        const r = await fetch(url, { signal: ctrl.signal, headers: { 'Accept': 'application/json' } });
+        if (!r.ok) return;
+        const { items } = await r.json();
+        lista.innerHTML = '';
+        items.forEach(it => {
+          const b = document.createElement('button');
+          b.type = 'button';
+          b.className = 'list-group-item list-group-item-action';
+          b.textContent = it.nombre;
+          b.addEventListener('mousedown', e => { e.preventDefault(); elegir(it); });
+          lista.appendChild(b);
+        });
+        lista.hidden = items.length === 0;
+      } catch (e) { /* abortada */ }
+    }, 150);
+  });
+  input.addEventListener('keydown', e => {
+    const first = lista.querySelector('button');
+    if (e.key === 'Enter' && !lista.hidden && first) { e.preventDefault(); first.dispatchEvent(new Event('mousedown')); }
+    if (e.key === 'Escape') cerrar();
+  });
+  input.addEventListener('blur', () => setTimeout(cerrar, 100));
+}
+
+// ---------- Cotiza por ----------
+function toggleCotiza(){
+  const selected = q('input[name="cotiza_por"]:checked')?.value || 'totales';
+  q('#totalesFields').style.display     = (selected === 'totales') ? 'block' : 'none';
+  q('#dimensionesFields').style.display = (selected === 'dimensiones') ? 'block' : 'none';
+}
+
+// ---------- País -> ciudades ----------
+function populateCitiesFor(paisSel, ciudadSel, selectedValue=""){
+  const cities = CITIES_BY_COUNTRY[paisSel.value] || [];
+  ciudadSel.innerHTML = '<option value="">Selecciona ciudad</option>' + cities.map(c=>`<option value="${c}">${c}</option>`).join('');
+  if (selectedValue && cities.includes(selectedValue)) ciudadSel.value = selectedValue; else ciudadSel.value='';
+}
+function setupCountryCity(prefix){
+  const oPais = q(`#${prefix}_origen_pais`);
+  const oCiu  = q(`#${prefix}_origen_ciudad`);
+  const dPais = q(`#${prefix}_destino_pais`);
+  const dCiu  = q(`#${prefix}_destino_ciudad`);
+  if (oPais && oCiu){ populateCitiesFor(oPais, oCiu); oPais.addEventListener('change', ()=>populateCitiesFor(oPais,oCiu,oCiu.value)); }
+  if (dPais && dCiu){ populateCitiesFor(dPais, dCiu); dPais.addEventListener('change', ()=>populateCitiesFor(dPais,dCiu,dCiu.value)); }
+}
+
+// ---------- Seguro => valor factura requerido ----------
+function setupSeguroRequired(svc){
+  const radios = qa(`input[name="${svc}_seguro"]`);
+  const vf = q(`#${svc}_valor_factura`);
+  function apply(){
+    const sel = q(`input[name="${svc}_seguro"]:checked`)?.value;
+    if (vf) vf.required = (sel === 'si');
+  }
+  radios.forEach(r=>r.addEventListener('change', apply));
+  apply();
+}
+
+// ---------- Modalidad FCL / LCL ----------
+function setupModalidadToggle(prefix){
+const radios = qa(`input[name="${prefix}_modalidad"]`);
+if (!radios.length) return;
+
+// Evitar wiring duplicado
+const flag = `data-wired-${prefix}-modalidad`;
+if (document.body.hasAttribute(flag)) {
+  // ya estaba cableado: solo aplica el estado actual
+  apply();
+  return;
+}
+document.body.setAttribute(flag, "1");
+
+const contCard = q(`#cardCont_${prefix}`);
+const totalInput = q(`#totalCont_${prefix}`);
+const tBody = q(`#tblCont_${prefix} tbody`);
+
+function apply(){
+  const val = q(`input[name="${prefix}_modalidad"]:checked`)?.value || 'FCL';
+  const show = (val === 'FCL');
+  if (contCard) contCard.classList.toggle('d-none', !show);
+  if (!show){ // LCL: limpia tabla/totales
+    if (tBody) tBody.innerHTML = '';
+    if (totalInput) totalInput.value = '';
+  }
+}
+
+radios.forEach(r=>r.addEventListener('change', apply));
+apply();
+}
+
+// ---------- Mostrar/ocultar secciones por servicio ----------
+function toggleSections(){
+  qa('.svc-section').forEach(sec => {
+    const svc = sec.dataset.svc;
+    const on = q(`input[name="servicios[]"][value="${svc}"]`)?.checked;
+    sec.hidden = !on;
+    qa('[data-req-svc]', sec).forEach(el => {
+      el.required = on && (el.getAttribute('data-req-svc') === svc);
+    });
+    if (on) seedFromMaster(svc); // <-- AÑADIDO: auto-sembra al activar
+});
+    
+  ["maritimo","terrestre"].forEach(setupModalidadToggle);
+}
+
+// ---------- Autorrelleno entre servicios ----------
+
+function masterService(){
+// primer servicio activo según SVC_PREFIXES
+const act = activeServices();
+return act.length ? act[0] : null;
+}
+
+function getFieldNodes(prefix, suffix){
+// Devuelve NodeList (pueden ser radios o un solo input/select)
+return qa(`[name="${prefix}_${suffix}"]`);
+}
+
+function getFieldValue(prefix, suffix){
+const nodes = getFieldNodes(prefix, suffix);
+if (!nodes.length) return null;
+// Radios
+if (nodes.length > 1 && nodes[0].type === "radio"){
+  const checked = nodes.find(n => n.checked);
+  return checked ? checked.value : null;
+}
+// Input/select único
+return nodes[0].value ?? "";
+}
+
+function isEmptyValueFor(nodes){
+// Vacío si: para radios ninguno seleccionado; para input/select string vacía
+if (!nodes || !nodes.length) return true;
+if (nodes.length > 1 && nodes[0].type === "radio"){
+  return !nodes.some(n => n.checked);
+}
+return (nodes[0].value ?? "").trim() === "";
+}
+
+function setFieldIfEmpty(prefix, suffix, value){
+const nodes = getFieldNodes(prefix, suffix);
+if (!nodes.length || value == null || value === "") return;
+// radios
+if (nodes.length > 1 && nodes[0].type === "radio"){
+  if (!isEmptyValueFor(nodes)){
+    return; // ya había algo seleccionado
+  }
+  const target = nodes.find(n => (n.value||"").toLowerCase() === (value||"").toLowerCase());
+  if (target){
+    target.checked = true;
+    target.dispatchEvent(new Event("change", {bubbles:true}));
+  }
+  return;
+}
+// input/select único
+if (isEmptyValueFor(nodes)){
+  nodes[0].value = value;
+  nodes[0].dispatchEvent(new Event("change", {bubbles:true}));
+}
+}
+
+function seedFromMaster(targetPrefix){
+const m = masterService();
+if (!m || targetPrefix === m) return;
+SHARED_SUFFIXES.forEach(sfx => {
+  const v = getFieldValue(m, sfx);
+  if (v != null && v !== ""){
+    setFieldIfEmpty(targetPrefix, sfx, v);
+  }
+});
+}
+
+function seedAllFromMaster(){
+const m = masterService();
+if (!m) return;
+activeServices().filter(p => p !== m).forEach(seedFromMaster);
+}
+
+const SHARED_SUFFIXES = [
+"tipo_embarque","incoterm",
+"origen_pais","origen_ciudad","origen_cp","origen_recoleccion","origen_puerto","origen_cruce","origen_despacho",
+"destino_pais","destino_ciudad","destino_cp","destino_entrega","destino_puerto","destino_cruce","destino_despacho",
+"unidad","servicio_unidad","maniobra"
+];
+
+function setField(prefix, suffix, value){
+  const name = `${prefix}_${suffix}`;
+  const els = qa(`[name="${name}"]`);
+  if (els.length === 0) return;
+  // radios
+  if (els.length > 1 && els[0].type === "radio"){
+    const target = els.find(e => (e.value||'').toLowerCase() === (value||'').toLowerCase());
+    if (target) { target.checked = true; target.dispatchEvent(new Event('change',{bubbles:true})); }
+    return;
+  }
+  // input/select único
+  const el = els[0];
+  if (!el.value){ // sólo si estaba vacío
+    el.value = value ?? "";
+    el.dispatchEvent(new Event('change', {bubbles:true}));
+  }
+}
+function copyToOthers(fromPrefix, suffix, value){
+  activeServices().filter(p => p !== fromPrefix).forEach(p => setField(p, suffix, value));
+}
+function wireSyncHandlers(){
+SVC_PREFIXES.forEach(prefix=>{
+  SHARED_SUFFIXES.forEach(suffix=>{
+    const name = `${prefix}_${suffix}`;
+    qa(`[name="${name}"]`).forEach(el=>{
+      // Usa 'change' en radios y SELECT, 'input' en inputs de texto/número
+      const evt = (el.type === 'radio' || el.tagName === 'SELECT') ? 'change' : 'input';
+      el.addEventListener(evt, ()=>{
+        // solo propaga si estoy editando el servicio maestro
+        if (prefix !== masterService()) return;
+        const value = (el.type === 'radio')
+            ? (q(`input[name="${name}"]:checked`)?.value ?? null)
+            : el.value;
+        activeServices()
+          .filter(p => p !== prefix)
+          .forEach(p => setFieldIfEmpty(p, suffix, value));
+      });
+    });
+  });
+});
+}
+
+// ---------- Totales (con Piezas) ----------
+function addTotalesRow(preset={piezas:'',dimensiones:'',cbm:'',gw:'',vw:''}){
+  const c = q('#totalesRows');
+  const row = document.createElement('div');
+  row.className='col-12';
+  row.innerHTML = `
+    <div class="row g-2 align-items-end totales-row">
+      <div class="col-md-2"><label>Piezas</label><input type="number" min="0" step="1" class="form-control pz" value="${preset.piezas}"></div>
+      <div class="col-md-3"><label>Dimensiones (texto)</label><input type="text" class="form-control dimen" placeholder="e.g. 120x80x100 cm" value="${preset.dimensiones}"></div>
+      <div class="col-md-2"><label>CBM</label><input type="number" step="0.01" class="form-control cbm" value="${preset.cbm}"></div>
+      <div class="col-md-2"><label>GW</label><input type="number" step="0.01" class="form-control gw" value="${preset.gw}"></div>
+      <div class="col-md-2"><label>VW</label><input type="number" step="0.01" class="form-control vw" value="${preset.vw}"></div>
+      <div class="col-md-1"><button type="button" class="btn btn-outline-danger w-100" onclick="removeRow(this)">✕</button></div>
+    </div>`;
+  c.appendChild(row);
+  qa('input', row).forEach(i=>i.addEventListener('input', recomputeTotales));
+  recomputeTotales();
+}
+function removeRow(btn){
+  const row = btn.closest('.col-12'); row.remove();
+  recomputeTotales(); recomputeDimensiones();
+}
+function recomputeTotales(){
+const rows = qa('#totalesRows .totales-row');
+let piezas=0, cbm=0, gw=0, vw=0, dims=[];
+rows.forEach(r=>{
+  piezas += parseInt((r.querySelector('.pz')?.value||'0'),10) || 0;
+  cbm    += toNum(r.querySelector('.cbm')?.value);
+  gw     += toNum(r.querySelector('.gw')?.value);
+  vw     += toNum(r.querySelector('.vw')?.value);
+  const d=(r.querySelector('.dimen')?.value||'').trim(); if (d) dims.push(d);
+});
+
+
+const elPiezas = q('#piezas_totales');
+if (elPiezas) elPiezas.value = piezas;
+
+const elCbm = q('#cbm_totales');     if (elCbm) elCbm.value = clamp2(cbm);
+const elGw  = q('#gw_totales');      if (elGw)  elGw.value  = clamp2(gw);
+const elVw  = q('#vw_totales');      if (elVw)  elVw.value  = clamp2(vw);
+const elNoS = q('#no_s');            if (elNoS) elNoS.value = rows.length;
+const elDim = q('#dimensiones_totales'); 
+if (elDim) elDim.value = dims.join(' | ');
+
+const arr = rows.map(r=>({
+  piezas: parseInt((r.querySelector('.pz')?.value||'0'),10) || 0,
+  dimensiones:(r.querySelector('.dimen')?.value||'').trim(),
+  cbm:toNum(r.querySelector('.cbm')?.value),
+  gw: toNum(r.querySelector('.gw')?.value),
+  vw: toNum(r.querySelector('.vw')?.value),
+}));
+const elJson = q('#totales_json');
+if (elJson) elJson.value = JSON.stringify(arr);
+}
+
+// ---------- Dimensiones ----------
+function addDimensionRow(preset={no:'',largo:'',ancho:'',alto:'',peso:''}){
+  const c = q('#dimRows');
+  const row = document.createElement('div');
+  row.className='col-12';
+  row.innerHTML = `
+    <div class="row g-2 align-items-end dim-row">
+      <div class="col-md-2"><label>No.</label><input type="number" class="form-control d-no" value="${preset.no}"></div>
+      <div class="col-md-2"><label>Largo</label><input type="number" step="0.01" class="form-control d-l" value="${preset.largo}"></div>
+      <div class="col-md-2"><label>Ancho</label><input type="number" step="0.01" class="form-control d-a" value="${preset.ancho}"></div>
+      <div class="col-md-2"><label>Alto</label><input type="number" step="0.01" class="form-control d-h" value="${preset.alto}"></div>
+      <div class="col-md-2"><label>Peso</label><input type="number" step="0.01" class="form-control d-p" value="${preset.peso}"></div>
+      <div class="col-md-2"><button type="button" class="btn btn-outline-danger w-100" onclick="removeRow(this)">Eliminar</button></div>
+    </div>`;
+  c.appendChild(row);
+  qa('input', row).forEach(i=>i.addEventListener('input', recomputeDimensiones));
+  recomputeDimensiones();
+}
+function recomputeDimensiones(){
+  const rows = qa('#dimRows .dim-row');
+  let totalNo = 0;
+  const arr = rows.map(r=>{
+    const no = toNum(r.querySelector('.d-no')?.value); totalNo += no;
+    return {
+      no,
+      largo: toNum(r.querySelector('.d-l')?.value),
+      ancho: toNum(r.querySelector('.d-a')?.value),
+      alto:  toNum(r.querySelector('.d-h')?.value),
+      peso:  toNum(r.querySelector('.d-p')?.value),
+    };
+  });
+  q('#no_dim').value = totalNo || '';
+  q('#dimensiones_json').value = JSON.stringify(arr);
+}
+
+// ---------- Contenedores (FCL) ----------
+function setupContenedores(svc){
+  const btnAdd = q(`#btnAddCont_${svc}`);
+  const tbl = q(`#tblCont_${svc}`);
+  if (!btnAdd || !tbl) return;
+  const tBody = tbl.querySelector('tbody');
+  const totalInput = q(`#totalCont_${svc}`);
+  let idx = 0;
+
+  function recalcTotal(){
+    let sum=0;
+    qa('input[type="number"][data-cont-cant]', tBody).forEach(inp=>{
+      const n=parseInt(inp.value||'0',10); if(!isNaN(n)) sum+=n;
+    });
+    if (totalInput) totalInput.value = sum;
+  }
+  function addRow(){
+    const tr = document.createElement('tr');
+    tr.innerHTML = `
+      <td>
+        <select class="form-select" name="${svc}_cont_${idx}_tipo">
+          <option value="">—</option>
+          <option>20DC</option><option>40DC</option><option>40HC</option>
+          <option>45HC</option><option>Open Top</option><option>Flat Rack</option>
+          <option>Reefer</option><option>LCL</option>
+        </select>
+      </td>
+      <td><input type="number" min="0" step="1" class="form-control" name="${svc}_cont_${idx}_cantidad" data-cont-cant></td>
+      <td class="text-end"><button type="button" class="btn btn-sm btn-outline-danger" data-cont-del>&times;</button></td>`;
+    tBody.appendChild(tr);
+    idx++;
+    tr.querySelector('[data-cont-cant]').addEventListener('input', recalcTotal);
+    tr.querySelector('[data-cont-del]').addEventListener('click',()=>{ tr.remove(); recalcTotal(); });
+  }
+  btnAdd.addEventListener('click', addRow);
+}
+
+// ---------- INIT ----------
+document.addEventListener('DOMContentLoaded', function(){
+
+// Cliente/prospecto + hidden legible
+qa('input[name="cliente_tipo"]').forEach(r=>r.addEventListener('change', toggleProspecto));
+toggleProspecto();
+initClienteTypeahead();
+q('#prospecto_nombre')?.addEventListener('input', syncClienteHidden);
+syncClienteHidden();
+
+// Cotiza por
+qa('input[name="cotiza_por"]').forEach(r=>r.addEventListener('change', toggleCotiza));
+toggleCotiza();
+
+// Servicios
+qa('input[name="servicios[]"]').forEach(c=>c.addEventListener('change', toggleSections));
+toggleSections();
+
+// ⬇⬇⬇ PASO 4: siembra inicial desde el servicio maestro (añadir aquí)
+seedAllFromMaster();
+
+// Seguro requerido
+SVC_PREFIXES.forEach(setupSeguroRequired);
+
+// País->Ciudad
+SVC_PREFIXES.forEach(setupCountryCity);
+
+// Contenedores y modalidad
+setupContenedores('maritimo');
+setupContenedores('terrestre');
+setupModalidadToggle('maritimo');
+setupModalidadToggle('terrestre');
+
+// Agrega filas iniciales
+addTotalesRow();
+addDimensionRow();
+
+// Autorrelleno entre servicios (listeners de propagación)
+wireSyncHandlers();
+
+// Validación al enviar
+q('#form-solicitud')?.addEventListener('submit', function(e){
+  const any = q('input[name="servicios[]"]:checked');
+  if (!any){ e.preventDefault(); e.stopPropagation(); alert('Selecciona al menos un tipo de servicio.'); return; }
+  syncClienteHidden();
+  recomputeTotales();
+  recomputeDimensiones();
+});
+});
@@ -0,0 +1,73 @@
+# app/utils/assets.py
+from __future__ import annotations
+import gzip
+import hashlib
+import json
+from pathlib import Path
+
+from flask import current_app, url_for
+
+# Carpetas de app/static que se empaquetan
+FUENTES = ("js", "css")
+DIST = "dist"
+MANIFEST = "manifest.json"
+
+_cache: dict[str, tuple[float, dict[str, str]]] = {}
+
+
+def dist_dir() -> Path:
+    return Path(current_app.static_folder) / DIST
+
+
+def _manifest() -> dict[str, str]:
+    """manifest.json de dist, recargado sólo si cambió el archivo."""
+    path = dist_dir() / MANIFEST
+    try:
+        mtime = path.stat().st_mtime
+    except OSError:
+        return {}
+    key = str(path)
+    if key not in _cache or _cache[key][0] != mtime:
+        _cache[key] = (mtime, json.loads(path.read_text(encoding="utf-8")))
+    return _cache[key][1]
+
+
+def asset_url(filename: str) -> str:
+    """
+    Como url_for('static', filename=...), pero regresa la versión con hash
+    (/assets/js/app.1a2b3c4d5e6f.js) si ya se corrió `flask build_assets`.
+    """
+    hashed = _manifest().get(filename)
+    if hashed:
+        return url_for("assets.servir", filename=hashed)
+    return url_for("static", filename=filename)
+
+
+def build(static_dir: Path) -> dict[str, str]:
+    """
+    Copia cada archivo de static/{js,css} a static/dist con el hash del contenido
+    en el nombre, junto con sus variantes .gz y .br, y escribe el manifest.
+    """
+    import brotli  # diferido: sólo lo necesita el build, no cada arranque
+
+    out = static_dir / DIST
+    out.mkdir(parents=True, exist_ok=True)
+    manifest: dict[str, str] = {}
+    for carpeta in FUENTES:
+        for src in sorted((static_dir / carpeta).rglob("*")):
+            if not src.is_file():
+                continue
+            data = src.read_bytes()
+            rel = src.relative_to(static_dir)
+            digest = hashlib.sha256(data).hexdigest()[:12]
+            hashed = rel.with_name(f"{src.stem}.{digest}{src.suffix}")
+            dest = out / hashed
+            dest.parent.mkdir(parents=True, exist_ok=True)
+            dest.write_bytes(data)
+            # mtime fijo: el .gz es idéntico entre builds del mismo contenido
+            dest.with_name(dest.name + ".gz").write_bytes(gzip.compress(data, compresslevel=9, mtime=0))
+            dest.with_name(dest.name + ".br").write_bytes(brotli.compress(data, quality=11))
+            manifest[rel.as_posix()] = hashed.as_posix()
+
+    (out / MANIFEST).write_text(json.dumps(manifest, indent=2, sort_keys=True), encoding="utf-8")
+    return manifest
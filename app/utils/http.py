@@ -0,0 +1,76 @@
+# app/utils/http.py
+from __future__ import annotations
+import hashlib
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+from flask import Response, current_app, request, session
+
+
+# Archivos que cambian el HTML que sale de las vistas
+_SUFIJOS_VERSION = (".py", ".html")
+
+
+def _hash_codigo(raiz: Path) -> str:
+    """sha1 de las rutas y el contenido de los .py y templates del paquete (orden estable)."""
+    h = hashlib.sha1()
+    for ruta in sorted(p for p in raiz.rglob("*") if p.suffix in _SUFIJOS_VERSION and p.is_file()):
+        h.update(ruta.relative_to(raiz).as_posix().encode("utf-8"))
+        h.update(b"\0")
+        h.update(ruta.read_bytes())
+    return h.hexdigest()
+
+
+def init_app(app) -> None:
+    """
+    Fija una sola vez, al crear la app, la versión que sala los ETags: DEPLOY_ID o, sin él,
+    un hash del código y los templates. Igual en todos los workers del mismo deploy,
+    distinta en cuanto cambia algo; nada de esto corre durante un request.
+    """
+    app.extensions["deploy_id"] = app.config.get("DEPLOY_ID") or _hash_codigo(Path(app.root_path))
+
+
+def _version() -> str:
+    return current_app.extensions["deploy_id"]
+
+
+def etag_de(*partes: Any) -> str:
+    """ETag (sin comillas) a partir de la versión desplegada y los valores que determinan el contenido."""
+    h = hashlib.sha1(repr((_version(),) + partes).encode("utf-8"))
+    return h.hexdigest()[:32]
+
+
+def _utc(dt: datetime | None) -> datetime | None:
+    if dt is None:
+        return None
+    return dt.replace(tzinfo=timezone.utc, microsecond=0) if dt.tzinfo is None else dt.replace(microsecond=0)
+
+
+def no_modificado(etag: str, last_modified: datetime | None = None) -> Response | None:
+    """
+    304 si el cliente ya tiene esta versión; None si hay que renderizar.
+    If-None-Match manda sobre If-Modified-Since. Con flashes pendientes no se
+    responde 304: la página los tiene que mostrar.
+    """
+    if session.get("_flashes"):
+        return None
+    if request.if_none_match:
+        fresco = request.if_none_match.contains_weak(etag)
+    elif request.if_modified_since and last_modified is not None:
+        fresco = _utc(last_modified) <= request.if_modified_since
+    else:
+        fresco = False
+    if not fresco:
+        return None
+    return con_validadores(Response(status=304), etag, last_modified)
+
+
+def con_validadores(resp: Response, etag: str, last_modified: datetime | None = None) -> Response:
+    """ETag débil + Last-Modified; el navegador revalida siempre (contenido por usuario)."""
+    resp.set_etag(etag, weak=True)
+    if last_modified is not None:
+        resp.last_modified = _utc(last_modified)
+    resp.cache_control.private = True
+    resp.cache_control.no_cache = True
+    return resp
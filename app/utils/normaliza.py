@@ -0,0 +1,66 @@
+# app/utils/normaliza.py
+from __future__ import annotations
+import hashlib
+import re
+import unicodedata
+from typing import Any, Mapping
+
+# Sufijos societarios ya normalizados (sin puntos ni acentos). Se prueban del más largo al más corto.
+_SUFIJOS = sorted((
+    "sa de cv", "sapi de cv", "sab de cv", "s de rl de cv", "s de rl", "s en c",
+    "sc de rl", "sa", "sapi", "sab", "sc", "sas", "ac",
+    "inc", "llc", "ltd", "ltda", "corp", "co", "gmbh", "srl", "sl", "sa de cv sofom",
+), key=len, reverse=True)
+
+
+def sin_acentos(s: str) -> str:
+    return "".join(ch for ch in unicodedata.normalize("NFKD", s) if not unicodedata.combining(ch))
+
+
+def clave_cliente(nombre: str | None) -> str:
+    """
+    Clave de comparación para nombres de cliente:
+    'ACME, S.A. de C.V.' y 'Acme SA de CV' -> 'acme'.
+    casefold, sin acentos, sin puntuación y sin sufijo societario.
+    """
+    s = sin_acentos((nombre or "").casefold())
+    s = re.sub(r"[.'´`]", "", s)                 # S.A. -> SA
+    s = re.sub(r"[^0-9a-z]+", " ", s).strip()   # resto de puntuación -> espacio
+    s = re.sub(r"\b([a-z]) (?=[a-z]\b)", r"\1", s)  # 's a de c v' -> 'sa de cv'
+    base = s
+    cambio = True
+    while cambio:
+        cambio = False
+        for suf in _SUFIJOS:
+            if s.endswith(" " + suf):
+                s = s[: -len(suf) - 1].rstrip()
+                cambio = True
+                break
+    return s or base
+
+
+# Columnas de Solicitud que definen una ruta (lane) para clave_ruta
+CAMPOS_RUTA = (
+    "origen_pais", "origen_ciudad", "origen_puerto", "origen_cruce",
+    "destino_pais", "destino_ciudad", "destino_puerto", "destino_cruce",
+    "tipo_servicio", "modalidad", "tipo_contenedor",
+)
+
+
+def texto_norm(s: Any) -> str:
+    """casefold, sin acentos y sin puntuación: 'Cd. de México ' -> 'cd de mexico'."""
+    s = sin_acentos(str(s or "").casefold())
+    return re.sub(r"[^0-9a-z]+", " ", s).strip()
+
+
+def clave_ruta(campos: Mapping[str, Any]) -> str:
+    """
+    Huella (sha1 hex, 40) de la ruta: origen/destino (país, ciudad, puerto, cruce)
+    + modo, modalidad y tipo de contenedor. Acepta el dict de columnas de Solicitud;
+    los enums cuentan por nombre.
+    """
+    partes = []
+    for k in CAMPOS_RUTA:
+        v = campos.get(k)
+        partes.append(texto_norm(getattr(v, "name", v)))
+    return hashlib.sha1("|".join(partes).encode("utf-8")).hexdigest()
@@ -1,21 +1,18 @@
 # app/utils/pdf.py
 from flask import current_app, render_template
-from pathlib import Path
-from weasyprint import HTML, CSS
+
+from app.utils.storage import almacen
 
 def render_pdf(template_name: str, out_rel_path: str, **context) -> str:
     """
-    Renderiza un template HTML a PDF y lo guarda bajo instance/out_rel_path.
-    Retorna la ruta absoluta.
+    Renderiza un template HTML a PDF y lo guarda en el almacén (app.utils.storage)
+    bajo la clave out_rel_path. Retorna la clave (relativa), no una ruta del servidor.
     """
-    # base: <proyecto>/instance
-    base_dir = Path(current_app.instance_path)
-    out_path = base_dir / out_rel_path
-    out_path.parent.mkdir(parents=True, exist_ok=True)
+    # WeasyPrint tarda en importarse: sólo se carga al generar el primer PDF
+    from weasyprint import HTML, CSS
 
     html = render_template(template_name, **context)
-    HTML(string=html, base_url=current_app.root_path).write_pdf(
-        out_path.as_posix(),
+    data = HTML(string=html, base_url=current_app.root_path).write_pdf(
         stylesheets=[CSS(string="""
             @page { size: A4; margin: 18mm 15mm; }
             body { font-family: -apple-system,BlinkMacSystemFont,"Segoe UI",Roboto,Arial; font-size: 11pt; }
@@ -28,4 +25,5 @@ def render_pdf(template_name: str, out_rel_path: str, **context) -> str:
             .small { font-size: 10pt; }
         """)]
     )
-    return out_path.as_posix()
+    almacen().guardar(out_rel_path, data)
+    return out_rel_path
@@ -0,0 +1,85 @@
+# app/utils/piezas.py
+from __future__ import annotations
+import json
+import re
+from typing import Any
+
+# Unidad de longitud -> m³ por unidad cúbica
+_M3_POR_UNIDAD3 = {"cm": 1e-6, "m": 1.0, "mm": 1e-9, "in": 0.0254 ** 3, "ft": 0.3048 ** 3}
+
+_NUM = r"(\d+(?:[.,]\d+)?)"
+_DIMS_RE = re.compile(_NUM + r"\s*[x×*]\s*" + _NUM + r"\s*[x×*]\s*" + _NUM, re.I)
+
+
+def lista_json(v: Any) -> list:
+    """Acepta lo que venga del form o de la BD (str JSON, lista o None) y regresa una lista."""
+    if isinstance(v, list):
+        return v
+    if isinstance(v, str) and v.strip():
+        try:
+            v = json.loads(v)
+        except ValueError:
+            return []
+        return v if isinstance(v, list) else []
+    return []
+
+
+def _num(v: Any) -> float | None:
+    try:
+        n = float(str(v).replace(",", ".")) if v not in (None, "") else None
+    except ValueError:
+        return None
+    return n if n else None
+
+
+def parse_dimensiones(txt: str | None) -> tuple[float | None, float | None, float | None]:
+    """'120x80x100 cm' -> (120.0, 80.0, 100.0); si no se entiende, (None, None, None)."""
+    m = _DIMS_RE.search(txt or "")
+    if not m:
+        return None, None, None
+    return tuple(float(g.replace(",", ".")) for g in m.groups())  # type: ignore[return-value]
+
+
+def cbm_de(cantidad: int, largo, ancho, alto, longitud_unidad: str) -> float | None:
+    if not (largo and ancho and alto):
+        return None
+    f = _M3_POR_UNIDAD3.get((longitud_unidad or "cm").lower(), 1e-6)
+    return round((cantidad or 1) * largo * ancho * alto * f, 4)
+
+
+def piezas_de(cotiza_por: str, totales: Any, dimensiones: Any,
+              longitud_unidad: str = "cm", peso_unidad: str = "kg") -> list[dict[str, Any]]:
+    """
+    Renglones de carga (columnas de SolicitudPieza) a partir de totales_json o
+    dimensiones_json, según `cotiza_por`. Renglones vacíos se omiten.
+    """
+    piezas: list[dict[str, Any]] = []
+    if (cotiza_por or "totales") == "dimensiones":
+        for r in lista_json(dimensiones):
+            if not isinstance(r, dict):
+                continue
+            cant = int(_num(r.get("no")) or 0)
+            l, a, h = _num(r.get("largo")), _num(r.get("ancho")), _num(r.get("alto"))
+            peso = _num(r.get("peso"))
+            if not (cant or l or a or h or peso):
+                continue
+            piezas.append(dict(
+                origen="dimensiones", cantidad=cant or 1, largo=l, ancho=a, alto=h,
+                peso=peso, peso_vol=None, cbm=cbm_de(cant or 1, l, a, h, longitud_unidad),
+                longitud_unidad=longitud_unidad, peso_unidad=peso_unidad,
+            ))
+    else:
+        for r in lista_json(totales):
+            if not isinstance(r, dict):
+                continue
+            cant = int(_num(r.get("piezas")) or 0)
+            l, a, h = parse_dimensiones(r.get("dimensiones"))
+            cbm, gw, vw = _num(r.get("cbm")), _num(r.get("gw")), _num(r.get("vw"))
+            if not (cant or cbm or gw or vw or l):
+                continue
+            piezas.append(dict(
+                origen="totales", cantidad=cant or 1, largo=l, ancho=a, alto=h,
+                peso=gw, peso_vol=vw, cbm=cbm if cbm is not None else cbm_de(cant or 1, l, a, h, longitud_unidad),
+                longitud_unidad=longitud_unidad, peso_unidad=peso_unidad,
+            ))
+    return piezas
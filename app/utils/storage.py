@@ -0,0 +1,199 @@
+# app/utils/storage.py
+from __future__ import annotations
+
+import gzip
+import hashlib
+import os
+import tempfile
+import zlib
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Iterator
+
+from flask import current_app
+
+# Bytes por bloque al leer para una descarga
+CHUNK = 64 * 1024
+
+
+@dataclass
+class Info:
+    tamano: int              # bytes guardados (comprimidos si gzip)
+    modificado: datetime     # UTC
+    gzip: bool
+
+
+def _gunzip(chunks: Iterator[bytes]) -> Iterator[bytes]:
+    d = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    for c in chunks:
+        out = d.decompress(c)
+        if out:
+            yield out
+    out = d.flush()
+    if out:
+        yield out
+
+
+class Almacen(ABC):
+    """
+    Archivos por clave relativa ('cotizaciones/<serie>/x.pdf'), nunca por ruta absoluta.
+    Con gzip=True se guardan comprimidos; `chunks(crudo=True)` da los bytes tal cual
+    (para mandar Content-Encoding: gzip) y `crudo=False` los descomprime al vuelo.
+    Un backend implementa guardar/info/_chunks/borrar (si falta alguno, no se puede crear).
+    """
+
+    def __init__(self, gzip: bool = True):
+        self.gzip = gzip
+
+    @abstractmethod
+    def guardar(self, clave: str, data: bytes) -> None:
+        ...
+
+    @abstractmethod
+    def info(self, clave: str) -> Info | None:
+        ...
+
+    @abstractmethod
+    def _chunks(self, clave: str) -> Iterator[bytes]:
+        ...
+
+    @abstractmethod
+    def borrar(self, clave: str) -> None:
+        ...
+
+    def chunks(self, clave: str, crudo: bool = False, info: Info | None = None) -> Iterator[bytes]:
+        info = info or self.info(clave)
+        if info is None:
+            raise FileNotFoundError(clave)
+        it = self._chunks(clave)
+        return it if (crudo or not info.gzip) else _gunzip(it)
+
+    def leer(self, clave: str) -> bytes:
+        return b"".join(self.chunks(clave))
+
+    def _empaquetar(self, data: bytes) -> bytes:
+        # mtime=0: mismo PDF -> mismos bytes
+        return gzip.compress(data, compresslevel=6, mtime=0) if self.gzip else data
+
+
+class AlmacenLocal(Almacen):
+    """
+    Directorio con reparto por hash: <raiz>/ab/cd/<sha1(clave)>[.gz].
+    Dos niveles de 256 acotan las entradas por directorio aunque haya millones de PDFs.
+    """
+
+    def __init__(self, raiz: str | os.PathLike, gzip: bool = True):
+        super().__init__(gzip)
+        self.raiz = Path(raiz)
+
+    def ruta(self, clave: str, gz: bool) -> Path:
+        h = hashlib.sha1(clave.encode("utf-8")).hexdigest()
+        return self.raiz / h[:2] / h[2:4] / (h + (".gz" if gz else ""))
+
+    def _existente(self, clave: str) -> tuple[Path, bool] | None:
+        for gz in (self.gzip, not self.gzip):
+            p = self.ruta(clave, gz)
+            if p.is_file():
+                return p, gz
+        return None
+
+    def guardar(self, clave: str, data: bytes) -> None:
+        destino = self.ruta(clave, self.gzip)
+        destino.parent.mkdir(parents=True, exist_ok=True)
+        # escribe a un temporal y renombra: nunca queda un archivo a medias
+        fd, tmp = tempfile.mkstemp(dir=destino.parent, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(self._empaquetar(data))
+            os.replace(tmp, destino)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+        otro = self.ruta(clave, not self.gzip)
+        if otro.exists():
+            otro.unlink()
+
+    def info(self, clave: str) -> Info | None:
+        e = self._existente(clave)
+        if e is None:
+            return None
+        st = e[0].stat()
+        return Info(st.st_size, datetime.fromtimestamp(st.st_mtime, tz=timezone.utc), e[1])
+
+    def _chunks(self, clave: str) -> Iterator[bytes]:
+        e = self._existente(clave)
+        if e is None:
+            raise FileNotFoundError(clave)
+        with open(e[0], "rb") as f:
+            while True:
+                b = f.read(CHUNK)
+                if not b:
+                    break
+                yield b
+
+    def borrar(self, clave: str) -> None:
+        for gz in (True, False):
+            self.ruta(clave, gz).unlink(missing_ok=True)
+
+
+class AlmacenS3(Almacen):
+    """
+    Bucket S3 o compatible (MinIO, etc.: STORAGE_S3_ENDPOINT). boto3 se importa al crear
+    el backend, así que sólo es requisito cuando STORAGE_BACKEND=s3.
+    """
+
+    def __init__(self, bucket: str, prefijo: str = "", endpoint_url: str | None = None,
+                 region: str | None = None, gzip: bool = True):
+        super().__init__(gzip)
+        try:
+            import boto3
+        except ImportError:
+            raise RuntimeError("STORAGE_BACKEND=s3 requiere boto3 (pip install boto3).")
+        self.bucket = bucket
+        self.prefijo = prefijo.strip("/")
+        self.cliente = boto3.client("s3", endpoint_url=endpoint_url or None, region_name=region or None)
+
+    def _key(self, clave: str) -> str:
+        return f"{self.prefijo}/{clave}" if self.prefijo else clave
+
+    def guardar(self, clave: str, data: bytes) -> None:
+        extra = {"Metadata": {"gzip": "1"}} if self.gzip else {}
+        self.cliente.put_object(Bucket=self.bucket, Key=self._key(clave), Body=self._empaquetar(data),
+                                ContentType="application/pdf", **extra)
+
+    def info(self, clave: str) -> Info | None:
+        from botocore.exceptions import ClientError
+        try:
+            h = self.cliente.head_object(Bucket=self.bucket, Key=self._key(clave))
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return None
+            raise
+        return Info(h["ContentLength"], h["LastModified"], h.get("Metadata", {}).get("gzip") == "1")
+
+    def _chunks(self, clave: str) -> Iterator[bytes]:
+        body = self.cliente.get_object(Bucket=self.bucket, Key=self._key(clave))["Body"]
+        try:
+            yield from body.iter_chunks(CHUNK)
+        finally:
+            body.close()
+
+    def borrar(self, clave: str) -> None:
+        self.cliente.delete_object(Bucket=self.bucket, Key=self._key(clave))
+
+
+def almacen() -> Almacen:
+    """Backend configurado (STORAGE_BACKEND), uno por app."""
+    ext = current_app.extensions
+    if "almacen" not in ext:
+        cfg = current_app.config
+        gz = cfg.get("STORAGE_GZIP", True)
+        if (cfg.get("STORAGE_BACKEND") or "local") == "s3":
+            ext["almacen"] = AlmacenS3(cfg["STORAGE_S3_BUCKET"], cfg.get("STORAGE_S3_PREFIX") or "",
+                                       cfg.get("STORAGE_S3_ENDPOINT"), cfg.get("STORAGE_S3_REGION"), gzip=gz)
+        else:
+            raiz = cfg.get("STORAGE_DIR") or os.path.join(current_app.instance_path, "almacen")
+            ext["almacen"] = AlmacenLocal(raiz, gzip=gz)
+    return ext["almacen"]
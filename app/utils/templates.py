@@ -0,0 +1,27 @@
+# app/utils/templates.py
+from __future__ import annotations
+import time
+from pathlib import Path
+
+from flask import Flask
+from jinja2 import FileSystemBytecodeCache
+
+
+def bytecode_cache(app: Flask) -> FileSystemBytecodeCache:
+    """Caché en disco del bytecode de los templates; la comparten todos los workers."""
+    ruta = Path(app.config.get("JINJA_CACHE_DIR") or Path(app.instance_path) / "jinja_cache")
+    ruta.mkdir(parents=True, exist_ok=True)
+    return FileSystemBytecodeCache(str(ruta))
+
+
+def precompilar_templates(app: Flask) -> tuple[int, float]:
+    """
+    Carga (y con eso compila y guarda en la caché de bytecode) todos los templates,
+    para que el primer request del worker no pague el parseo. Regresa (n, segundos).
+    """
+    t0 = time.perf_counter()
+    n = 0
+    for nombre in app.jinja_env.list_templates(extensions=("html", "txt", "xml")):
+        app.jinja_env.get_template(nombre)
+        n += 1
+    return n, time.perf_counter() - t0
@@ -9,3 +9,43 @@ class Config:
         "DATABASE_URL", f"sqlite:///{BASE_DIR / 'app.db'}"
     )
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+    # Índice en memoria para el typeahead de clientes: se reconstruye al cambiar cache_version
+    # (cualquier worker) y, como respaldo, pasados estos segundos
+    CLIENTES_INDICE_TTL = int(os.getenv("CLIENTES_INDICE_TTL", "300"))
+
+    # Divisores de peso volumétrico por modo (cm³ por kg): kg_vol = cm³ / divisor
+    DIVISORES_VOLUMETRICOS = {
+        "aereo": int(os.getenv("DIVISOR_AEREO", "6000")),
+        "maritimo": int(os.getenv("DIVISOR_MARITIMO", "1000")),   # 1 m³ = 1000 kg (W/M)
+        "terrestre": int(os.getenv("DIVISOR_TERRESTRE", "3000")),
+    }
+
+    # Ventana (días) para listar solicitudes/opciones recientes en la misma ruta
+    RUTA_RECIENTES_DIAS = int(os.getenv("RUTA_RECIENTES_DIAS", "30"))
+
+    # Cola de pricing: minutos que una solicitud tomada queda reservada a su pricer
+    COLA_LEASE_MIN = int(os.getenv("COLA_LEASE_MIN", "30"))
+
+    # Archivo de folios cerrados: SQLite adjunta (por defecto instance/archivo.db);
+    # con otro motor se usa el schema "archivo" de la misma base
+    ARCHIVO_DB = os.getenv("ARCHIVO_DB") or None
+    ARCHIVO_MESES = int(os.getenv("ARCHIVO_MESES", "12"))
+
+    # PDFs generados: "local" (por defecto instance/almacen, repartido por hash) o "s3"
+    # (S3 o compatible vía STORAGE_S3_ENDPOINT; requiere boto3). Se guardan con gzip.
+    STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "local")
+    STORAGE_DIR = os.getenv("STORAGE_DIR") or None
+    STORAGE_GZIP = os.getenv("STORAGE_GZIP", "1").lower() in ("1", "true", "si", "sí")
+    STORAGE_S3_BUCKET = os.getenv("STORAGE_S3_BUCKET")
+    STORAGE_S3_PREFIX = os.getenv("STORAGE_S3_PREFIX", "")
+    STORAGE_S3_ENDPOINT = os.getenv("STORAGE_S3_ENDPOINT") or None
+    STORAGE_S3_REGION = os.getenv("STORAGE_S3_REGION") or None
+
+    # Versión desplegada para los ETags (mismo valor en todos los workers y reinicios);
+    # sin ella se usa un hash del código y los templates (app.utils.http.init_app)
+    DEPLOY_ID = os.getenv("DEPLOY_ID") or None
+
+    # Caché de bytecode de Jinja (por defecto instance/jinja_cache) y precompilación al arrancar
+    JINJA_CACHE_DIR = os.getenv("JINJA_CACHE_DIR") or None
+    JINJA_PRECOMPILAR = os.getenv("JINJA_PRECOMPILAR", "0").lower() in ("1", "true", "si", "sí")
@@ -0,0 +1,39 @@
+"""serie_anual: contador por año para la serie Q####YYYY
+
+Revision ID: 138bc19cbf08
+Revises: d5cca4719df6
+Create Date: 2026-10-19 09:02:11.204518
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '138bc19cbf08'
+down_revision = 'd5cca4719df6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    serie_anual = op.create_table('serie_anual',
+    sa.Column('anio', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('ultimo', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('anio', name=op.f('pk_serie_anual'))
+    )
+
+    # Siembra: un contador por año con el número de solicitudes existentes
+    solicitud = sa.table('solicitud', sa.column('fecha_solicitud', sa.DateTime()))
+    anio = sa.extract('year', solicitud.c.fecha_solicitud)
+    rows = op.get_bind().execute(
+        sa.select(anio.label('anio'), sa.func.count().label('n'))
+        .where(solicitud.c.fecha_solicitud.isnot(None))
+        .group_by(anio)
+    ).all()
+    if rows:
+        op.bulk_insert(serie_anual, [{'anio': int(r.anio), 'ultimo': int(r.n)} for r in rows])
+
+
+def downgrade():
+    op.drop_table('serie_anual')
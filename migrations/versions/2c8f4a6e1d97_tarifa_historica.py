@@ -0,0 +1,83 @@
+"""tarifa_historica: precios por concepto, proveedor y ruta para sugerir en cotizar
+
+Revision ID: 2c8f4a6e1d97
+Revises: 9b3e71c0d452
+Create Date: 2026-10-19 14:48:02.390715
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2c8f4a6e1d97'
+down_revision = '9b3e71c0d452'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('tarifa_historica',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('concepto_id', sa.Integer(), nullable=False),
+    sa.Column('proveedor', sa.String(length=200), nullable=False),
+    sa.Column('origen', sa.String(length=80), nullable=False),
+    sa.Column('destino', sa.String(length=80), nullable=False),
+    sa.Column('modo', sa.String(length=20), nullable=False),
+    sa.Column('moneda', sa.String(length=3), nullable=False),
+    sa.Column('unidad', sa.String(length=32), nullable=True),
+    sa.Column('precio_unit', sa.Numeric(precision=18, scale=4), nullable=False),
+    sa.Column('fecha', sa.DateTime(), nullable=False),
+    sa.Column('opcion_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['concepto_id'], ['concepto.id'], name=op.f('fk_tarifa_historica_concepto_id_concepto')),
+    sa.ForeignKeyConstraint(['opcion_id'], ['cotizacion_opcion.id'], name=op.f('fk_tarifa_historica_opcion_id_cotizacion_opcion')),
+    sa.PrimaryKeyConstraint('id', name=op.f('pk_tarifa_historica'))
+    )
+
+    # Siembra con los ítems de catálogo ya capturados (mismo SELECT que registrar_tarifas_opcion)
+    item = sa.table('cotizacion_item', sa.column('id', sa.Integer()), sa.column('opcion_id', sa.Integer()),
+                    sa.column('concepto_id', sa.Integer()), sa.column('proveedor', sa.String()),
+                    sa.column('moneda', sa.String()), sa.column('unidad', sa.String()),
+                    sa.column('precio_unit', sa.Numeric()))
+    opcion = sa.table('cotizacion_opcion', sa.column('id', sa.Integer()), sa.column('solicitud_id', sa.Integer()),
+                      sa.column('proveedor', sa.String()), sa.column('tipo_servicio', sa.String()),
+                      sa.column('updated_at', sa.DateTime()))
+    solicitud = sa.table('solicitud', sa.column('id', sa.Integer()), sa.column('origen_ciudad', sa.String()),
+                         sa.column('destino_ciudad', sa.String()))
+    tarifa = sa.table('tarifa_historica', *[sa.column(c) for c in (
+        'concepto_id', 'proveedor', 'origen', 'destino', 'modo', 'moneda', 'unidad',
+        'precio_unit', 'fecha', 'opcion_id')])
+    op.get_bind().execute(
+        tarifa.insert().from_select(
+            [c.name for c in tarifa.c],
+            sa.select(
+                item.c.concepto_id,
+                sa.func.trim(sa.func.coalesce(sa.func.nullif(sa.func.trim(item.c.proveedor), ''), opcion.c.proveedor)),
+                sa.func.trim(solicitud.c.origen_ciudad),
+                sa.func.trim(solicitud.c.destino_ciudad),
+                sa.func.coalesce(opcion.c.tipo_servicio, ''),
+                item.c.moneda,
+                item.c.unidad,
+                item.c.precio_unit,
+                sa.func.coalesce(opcion.c.updated_at, sa.func.now()),
+                opcion.c.id,
+            )
+            .select_from(item.join(opcion, opcion.c.id == item.c.opcion_id)
+                         .join(solicitud, solicitud.c.id == opcion.c.solicitud_id))
+            .where(item.c.concepto_id.isnot(None))
+            .order_by(item.c.id)
+        )
+    )
+
+    with op.batch_alter_table('tarifa_historica', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_tarifa_historica_opcion_id'), ['opcion_id'], unique=False)
+        batch_op.create_index('ix_tarifa_historica_ruta',
+                              ['concepto_id', 'origen', 'destino', 'modo', 'proveedor', 'fecha'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('tarifa_historica', schema=None) as batch_op:
+        batch_op.drop_index('ix_tarifa_historica_ruta')
+        batch_op.drop_index(batch_op.f('ix_tarifa_historica_opcion_id'))
+
+    op.drop_table('tarifa_historica')
@@ -0,0 +1,68 @@
+"""solicitud: numero_serie_anual (serie Q####YYYY del contador serie_anual)
+
+Revision ID: 3a9c5e7f1b24
+Revises: 8e5a1f0c3b72
+Create Date: 2026-10-19 20:41:03.517290
+
+Las solicitudes existentes se numeran por año en orden de fecha_solicitud, id, y el
+contador de cada año queda en max(ultimo, solicitudes del año) para no repetir series.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3a9c5e7f1b24'
+down_revision = '8e5a1f0c3b72'
+branch_labels = None
+depends_on = None
+
+LOTE = 1000
+
+
+def upgrade():
+    with op.batch_alter_table('solicitud', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('numero_serie_anual', sa.String(length=16), nullable=True))
+        batch_op.create_index(batch_op.f('ix_solicitud_numero_serie_anual'), ['numero_serie_anual'], unique=True)
+
+    conn = op.get_bind()
+    solicitud = sa.table(
+        'solicitud',
+        sa.column('id', sa.Integer()),
+        sa.column('fecha_solicitud', sa.DateTime()),
+        sa.column('numero_serie_anual', sa.String()),
+    )
+    serie_anual = sa.table('serie_anual', sa.column('anio', sa.Integer()), sa.column('ultimo', sa.Integer()))
+
+    anio = sa.extract('year', solicitud.c.fecha_solicitud)
+    filas = conn.execute(
+        sa.select(solicitud.c.id, anio.label('anio'))
+        .where(solicitud.c.fecha_solicitud.isnot(None))
+        .order_by(solicitud.c.fecha_solicitud, solicitud.c.id)
+    ).all()
+
+    conteo: dict[int, int] = {}
+    valores = []
+    for f in filas:
+        a = int(f.anio)
+        conteo[a] = conteo.get(a, 0) + 1
+        valores.append({'_id': f.id, 'serie': f"Q{conteo[a]:04d}{a}"})
+
+    upd = (solicitud.update()
+           .where(solicitud.c.id == sa.bindparam('_id'))
+           .values(numero_serie_anual=sa.bindparam('serie')))
+    for i in range(0, len(valores), LOTE):
+        conn.execute(upd, valores[i:i + LOTE])
+
+    contadores = {r.anio: r.ultimo for r in conn.execute(sa.select(serie_anual.c.anio, serie_anual.c.ultimo))}
+    for a, n in conteo.items():
+        if a not in contadores:
+            conn.execute(serie_anual.insert().values(anio=a, ultimo=n))
+        elif contadores[a] < n:
+            conn.execute(serie_anual.update().where(serie_anual.c.anio == a).values(ultimo=n))
+
+
+def downgrade():
+    with op.batch_alter_table('solicitud', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_solicitud_numero_serie_anual'))
+        batch_op.drop_column('numero_serie_anual')
@@ -0,0 +1,55 @@
+"""venta_decision: clave del rollup congelada al confirmar
+
+Revision ID: 4c7e2a9d81f3
+Revises: b73b03fb6a24
+Create Date: 2026-10-19 18:40:12.902117
+
+Backfill con los valores actuales de la solicitud y la opción (lo más cercano que hay
+al momento de la decisión). Tras aplicar: `flask reconstruir_rollups`.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4c7e2a9d81f3'
+down_revision = 'b73b03fb6a24'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('venta_decision', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('rollup_cliente', sa.String(length=200), nullable=True))
+        batch_op.add_column(sa.Column('rollup_ruta', sa.String(length=170), nullable=True))
+        batch_op.add_column(sa.Column('rollup_proveedor', sa.String(length=200), nullable=True))
+        batch_op.add_column(sa.Column('rollup_tipo_servicio', sa.String(length=20), nullable=True))
+        batch_op.add_column(sa.Column('rollup_modalidad', sa.String(length=10), nullable=True))
+        batch_op.add_column(sa.Column('rollup_vendedor', sa.String(length=120), nullable=True))
+
+    # Mismos valores que rollups.congelar_clave (los enums van por nombre)
+    op.execute("""
+        UPDATE venta_decision SET
+          rollup_cliente = (SELECT COALESCE(s.cliente, '') FROM solicitud s
+                            WHERE s.id = venta_decision.solicitud_id),
+          rollup_ruta = (SELECT COALESCE(s.origen_ciudad, '') || ' - ' || COALESCE(s.destino_ciudad, '')
+                         FROM solicitud s WHERE s.id = venta_decision.solicitud_id),
+          rollup_tipo_servicio = (SELECT COALESCE(s.tipo_servicio, '') FROM solicitud s
+                                  WHERE s.id = venta_decision.solicitud_id),
+          rollup_modalidad = (SELECT COALESCE(s.modalidad, '') FROM solicitud s
+                              WHERE s.id = venta_decision.solicitud_id),
+          rollup_vendedor = (SELECT COALESCE(s.vendedor, '') FROM solicitud s
+                             WHERE s.id = venta_decision.solicitud_id),
+          rollup_proveedor = COALESCE((SELECT o.proveedor FROM cotizacion_opcion o
+                                       WHERE o.id = venta_decision.opcion_id), '')
+    """)
+
+
+def downgrade():
+    with op.batch_alter_table('venta_decision', schema=None) as batch_op:
+        batch_op.drop_column('rollup_vendedor')
+        batch_op.drop_column('rollup_modalidad')
+        batch_op.drop_column('rollup_tipo_servicio')
+        batch_op.drop_column('rollup_proveedor')
+        batch_op.drop_column('rollup_ruta')
+        batch_op.drop_column('rollup_cliente')
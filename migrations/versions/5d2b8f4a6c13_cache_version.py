@@ -0,0 +1,29 @@
+"""cache_version: versión compartida de los cachés en memoria (índice de clientes)
+
+Revision ID: 5d2b8f4a6c13
+Revises: 3a9c5e7f1b24
+Create Date: 2026-10-19 21:05:37.880412
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5d2b8f4a6c13'
+down_revision = '3a9c5e7f1b24'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    cache_version = op.create_table('cache_version',
+    sa.Column('nombre', sa.String(length=40), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('nombre', name=op.f('pk_cache_version'))
+    )
+    op.bulk_insert(cache_version, [{'nombre': 'clientes', 'version': 0}])
+
+
+def downgrade():
+    op.drop_table('cache_version')
@@ -0,0 +1,159 @@
+"""solicitud_pieza + totales/dimensiones/servicios_solicitados como JSON
+
+Revision ID: 5e8a0c2f7b91
+Revises: c319654f191a
+Create Date: 2026-10-19 11:02:48.310274
+
+"""
+import json
+import re
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5e8a0c2f7b91'
+down_revision = 'c319654f191a'
+branch_labels = None
+depends_on = None
+
+# Copia congelada de app.utils.piezas (lista_json/piezas_de) al escribir esta migración:
+# el backfill no debe cambiar si después cambia el cálculo de la app.
+_M3_POR_UNIDAD3 = {"cm": 1e-6, "m": 1.0, "mm": 1e-9, "in": 0.0254 ** 3, "ft": 0.3048 ** 3}
+_NUM = r"(\d+(?:[.,]\d+)?)"
+_DIMS_RE = re.compile(_NUM + r"\s*[x×*]\s*" + _NUM + r"\s*[x×*]\s*" + _NUM, re.I)
+
+
+def _lista_json(v):
+    if isinstance(v, list):
+        return v
+    if isinstance(v, str) and v.strip():
+        try:
+            v = json.loads(v)
+        except ValueError:
+            return []
+        return v if isinstance(v, list) else []
+    return []
+
+
+def _num(v):
+    try:
+        n = float(str(v).replace(",", ".")) if v not in (None, "") else None
+    except ValueError:
+        return None
+    return n if n else None
+
+
+def _parse_dimensiones(txt):
+    m = _DIMS_RE.search(txt or "")
+    if not m:
+        return None, None, None
+    return tuple(float(g.replace(",", ".")) for g in m.groups())
+
+
+def _cbm_de(cantidad, largo, ancho, alto, longitud_unidad):
+    if not (largo and ancho and alto):
+        return None
+    f = _M3_POR_UNIDAD3.get((longitud_unidad or "cm").lower(), 1e-6)
+    return round((cantidad or 1) * largo * ancho * alto * f, 4)
+
+
+def _piezas_de(cotiza_por, totales, dimensiones, longitud_unidad="cm", peso_unidad="kg"):
+    piezas = []
+    if (cotiza_por or "totales") == "dimensiones":
+        for r in _lista_json(dimensiones):
+            if not isinstance(r, dict):
+                continue
+            cant = int(_num(r.get("no")) or 0)
+            l, a, h = _num(r.get("largo")), _num(r.get("ancho")), _num(r.get("alto"))
+            peso = _num(r.get("peso"))
+            if not (cant or l or a or h or peso):
+                continue
+            piezas.append(dict(
+                origen="dimensiones", cantidad=cant or 1, largo=l, ancho=a, alto=h,
+                peso=peso, peso_vol=None, cbm=_cbm_de(cant or 1, l, a, h, longitud_unidad),
+                longitud_unidad=longitud_unidad, peso_unidad=peso_unidad,
+            ))
+    else:
+        for r in _lista_json(totales):
+            if not isinstance(r, dict):
+                continue
+            cant = int(_num(r.get("piezas")) or 0)
+            l, a, h = _parse_dimensiones(r.get("dimensiones"))
+            cbm, gw, vw = _num(r.get("cbm")), _num(r.get("gw")), _num(r.get("vw"))
+            if not (cant or cbm or gw or vw or l):
+                continue
+            piezas.append(dict(
+                origen="totales", cantidad=cant or 1, largo=l, ancho=a, alto=h,
+                peso=gw, peso_vol=vw, cbm=cbm if cbm is not None else _cbm_de(cant or 1, l, a, h, longitud_unidad),
+                longitud_unidad=longitud_unidad, peso_unidad=peso_unidad,
+            ))
+    return piezas
+
+
+def upgrade():
+    solicitud_pieza = op.create_table('solicitud_pieza',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('solicitud_id', sa.Integer(), nullable=False),
+    sa.Column('origen', sa.String(length=20), nullable=False),
+    sa.Column('cantidad', sa.Integer(), nullable=False),
+    sa.Column('largo', sa.Float(), nullable=True),
+    sa.Column('ancho', sa.Float(), nullable=True),
+    sa.Column('alto', sa.Float(), nullable=True),
+    sa.Column('peso', sa.Float(), nullable=True),
+    sa.Column('peso_vol', sa.Float(), nullable=True),
+    sa.Column('cbm', sa.Float(), nullable=True),
+    sa.Column('longitud_unidad', sa.String(length=10), nullable=False),
+    sa.Column('peso_unidad', sa.String(length=10), nullable=False),
+    sa.ForeignKeyConstraint(['solicitud_id'], ['solicitud.id'], name=op.f('fk_solicitud_pieza_solicitud_id_solicitud')),
+    sa.PrimaryKeyConstraint('id', name=op.f('pk_solicitud_pieza'))
+    )
+    with op.batch_alter_table('solicitud_pieza', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_solicitud_pieza_solicitud_id'), ['solicitud_id'], unique=False)
+
+    # Backfill: renglones de carga desde los JSON de texto, y limpia los JSON
+    # (texto vacío o inválido -> NULL / []) antes de cambiar el tipo de columna.
+    conn = op.get_bind()
+    solicitud = sa.table('solicitud',
+                         sa.column('id', sa.Integer()), sa.column('cotiza_por', sa.String()),
+                         sa.column('longitud_unidad', sa.String()), sa.column('peso_unidad', sa.String()),
+                         sa.column('totales_json', sa.Text()), sa.column('dimensiones_json', sa.Text()),
+                         sa.column('servicios_solicitados', sa.Text()))
+    piezas = []
+    for r in conn.execute(sa.select(solicitud)).all():
+        for p in _piezas_de(r.cotiza_por, r.totales_json, r.dimensiones_json,
+                           longitud_unidad=r.longitud_unidad or 'cm', peso_unidad=r.peso_unidad or 'kg'):
+            piezas.append(dict(solicitud_id=r.id, **p))
+
+        tot, dim = _lista_json(r.totales_json), _lista_json(r.dimensiones_json)
+        conn.execute(solicitud.update().where(solicitud.c.id == r.id).values(
+            totales_json=json.dumps(tot) if tot else None,
+            dimensiones_json=json.dumps(dim) if dim else None,
+            servicios_solicitados=json.dumps(_lista_json(r.servicios_solicitados)),
+        ))
+    if piezas:
+        op.bulk_insert(solicitud_pieza, piezas)
+
+    with op.batch_alter_table('solicitud', schema=None) as batch_op:
+        batch_op.alter_column('totales_json', existing_type=sa.Text(), type_=sa.JSON(),
+                              existing_nullable=True, postgresql_using='totales_json::json')
+        batch_op.alter_column('dimensiones_json', existing_type=sa.Text(), type_=sa.JSON(),
+                              existing_nullable=True, postgresql_using='dimensiones_json::json')
+        batch_op.alter_column('servicios_solicitados', existing_type=sa.Text(), type_=sa.JSON(),
+                              existing_nullable=False, postgresql_using='servicios_solicitados::json')
+
+
+def downgrade():
+    with op.batch_alter_table('solicitud', schema=None) as batch_op:
+        batch_op.alter_column('servicios_solicitados', existing_type=sa.JSON(), type_=sa.Text(),
+                              existing_nullable=False)
+        batch_op.alter_column('dimensiones_json', existing_type=sa.JSON(), type_=sa.Text(),
+                              existing_nullable=True)
+        batch_op.alter_column('totales_json', existing_type=sa.JSON(), type_=sa.Text(),
+                              existing_nullable=True)
+
+    with op.batch_alter_table('solicitud_pieza', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_solicitud_pieza_solicitud_id'))
+
+    op.drop_table('solicitud_pieza')
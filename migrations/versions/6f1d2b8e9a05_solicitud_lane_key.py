@@ -0,0 +1,66 @@
+"""solicitud: lane_key (huella normalizada de la ruta) con índice (lane_key, fecha_solicitud)
+
+Revision ID: 6f1d2b8e9a05
+Revises: 2c8f4a6e1d97
+Create Date: 2026-10-19 15:31:26.804419
+
+"""
+import hashlib
+import re
+import unicodedata
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6f1d2b8e9a05'
+down_revision = '2c8f4a6e1d97'
+branch_labels = None
+depends_on = None
+
+LOTE = 1000
+
+# Copia congelada de app.utils.normaliza (CAMPOS_RUTA/clave_ruta) al escribir esta migración:
+# las huellas del backfill no deben cambiar si después cambia la normalización de la app.
+CAMPOS_RUTA = (
+    "origen_pais", "origen_ciudad", "origen_puerto", "origen_cruce",
+    "destino_pais", "destino_ciudad", "destino_puerto", "destino_cruce",
+    "tipo_servicio", "modalidad", "tipo_contenedor",
+)
+
+
+def _texto_norm(s):
+    s = "".join(ch for ch in unicodedata.normalize("NFKD", str(s or "").casefold())
+                if not unicodedata.combining(ch))
+    return re.sub(r"[^0-9a-z]+", " ", s).strip()
+
+
+def _clave_ruta(campos):
+    partes = [_texto_norm(campos.get(k)) for k in CAMPOS_RUTA]
+    return hashlib.sha1("|".join(partes).encode("utf-8")).hexdigest()
+
+
+def upgrade():
+    with op.batch_alter_table('solicitud', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('lane_key', sa.String(length=40), nullable=True))
+
+    # Backfill (los enums vienen por nombre, igual que en _clave_ruta)
+    conn = op.get_bind()
+    solicitud = sa.table('solicitud', sa.column('id', sa.Integer()), sa.column('lane_key', sa.String()),
+                         *[sa.column(c, sa.String()) for c in CAMPOS_RUTA])
+    filas = conn.execute(sa.select(solicitud.c.id, *[solicitud.c[c] for c in CAMPOS_RUTA])).mappings().all()
+    upd = (solicitud.update()
+           .where(solicitud.c.id == sa.bindparam('_id'))
+           .values(lane_key=sa.bindparam('_lane_key')))
+    for i in range(0, len(filas), LOTE):
+        conn.execute(upd, [{'_id': f['id'], '_lane_key': _clave_ruta(f)} for f in filas[i:i + LOTE]])
+
+    with op.batch_alter_table('solicitud', schema=None) as batch_op:
+        batch_op.create_index('ix_solicitud_lane_key_fecha', ['lane_key', 'fecha_solicitud'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('solicitud', schema=None) as batch_op:
+        batch_op.drop_index('ix_solicitud_lane_key_fecha')
+        batch_op.drop_column('lane_key')
@@ -0,0 +1,63 @@
+"""tablas archivables: AUTOINCREMENT en SQLite (no reusar ids ya archivados)
+
+Revision ID: 8e5a1f0c3b72
+Revises: 4c7e2a9d81f3
+Create Date: 2026-10-19 19:12:45.208331
+
+Sin AUTOINCREMENT, SQLite asigna max(id)+1: al archivar las filas más nuevas, la base
+activa volvía a dar esos ids y archivo.obtener() regresaba el registro equivocado.
+Se recrean las tablas con AUTOINCREMENT y el contador arranca arriba del mayor id
+activo o archivado. En otros motores los ids salen de secuencias y no se tocan.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8e5a1f0c3b72'
+down_revision = '4c7e2a9d81f3'
+branch_labels = None
+depends_on = None
+
+# Mismas tablas que app.services.archivo.TABLAS (copia congelada)
+TABLAS = (
+    'folio', 'solicitud', 'solicitud_servicio', 'solicitud_pieza', 'solicitud_evento', 'cotizacion',
+    'cotizacion_opcion', 'cotizacion_item', 'tarifa_historica', 'venta_decision',
+    'venta_decision_item',
+)
+ESQUEMA = 'archivo'
+
+
+def _recrear(autoincrement):
+    conn = op.get_bind()
+    if conn.dialect.name != 'sqlite':
+        return
+    for nombre in TABLAS:
+        with op.batch_alter_table(nombre, recreate='always',
+                                  table_kwargs={'sqlite_autoincrement': autoincrement}):
+            pass
+    if not autoincrement:
+        return
+
+    # El contador queda en el mayor id activo (lo llena la copia del batch); si la base de
+    # archivo está adjunta y tiene ids mayores (ya archivados y quizá reasignados), arriba de ésos
+    adjuntas = {r[1] for r in conn.exec_driver_sql('PRAGMA database_list')}
+    for nombre in TABLAS:
+        maximo = conn.exec_driver_sql(f'SELECT MAX(id) FROM {nombre}').scalar() or 0
+        if ESQUEMA in adjuntas:
+            existe = conn.exec_driver_sql(
+                f"SELECT 1 FROM {ESQUEMA}.sqlite_master WHERE type = 'table' AND name = ?", (nombre,)
+            ).scalar()
+            if existe:
+                maximo = max(maximo, conn.exec_driver_sql(f'SELECT MAX(id) FROM {ESQUEMA}.{nombre}').scalar() or 0)
+        conn.exec_driver_sql('DELETE FROM sqlite_sequence WHERE name = ?', (nombre,))
+        if maximo:
+            conn.exec_driver_sql('INSERT INTO sqlite_sequence (name, seq) VALUES (?, ?)', (nombre, maximo))
+
+
+def upgrade():
+    _recrear(True)
+
+
+def downgrade():
+    _recrear(False)
@@ -0,0 +1,33 @@
+"""solicitud: asignado_a_id y lease_expira (cola de pricing) con índice (estatus, prioridad, fecha_solicitud)
+
+Revision ID: 9b31bc48886c
+Revises: e03ee4a4b759
+Create Date: 2026-10-19 17:20:51.604117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9b31bc48886c'
+down_revision = 'e03ee4a4b759'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('solicitud', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('asignado_a_id', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('lease_expira', sa.DateTime(), nullable=True))
+        batch_op.create_foreign_key(batch_op.f('fk_solicitud_asignado_a_id_usuario'), 'usuario',
+                                    ['asignado_a_id'], ['id'])
+        batch_op.create_index('ix_solicitud_cola', ['estatus', 'prioridad', 'fecha_solicitud'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('solicitud', schema=None) as batch_op:
+        batch_op.drop_index('ix_solicitud_cola')
+        batch_op.drop_constraint(batch_op.f('fk_solicitud_asignado_a_id_usuario'), type_='foreignkey')
+        batch_op.drop_column('lease_expira')
+        batch_op.drop_column('asignado_a_id')
@@ -0,0 +1,43 @@
+"""venta_rollup_diario: agregados diarios de ofertas y resultados
+
+Revision ID: 9b3e71c0d452
+Revises: f0c6a18b39d4
+Create Date: 2026-10-19 14:05:48.117302
+
+Tras aplicar: `flask reconstruir_rollups` para llenarla con el histórico.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9b3e71c0d452'
+down_revision = 'f0c6a18b39d4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('venta_rollup_diario',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('fecha', sa.Date(), nullable=False),
+    sa.Column('cliente', sa.String(length=200), nullable=False),
+    sa.Column('ruta', sa.String(length=170), nullable=False),
+    sa.Column('proveedor', sa.String(length=200), nullable=False),
+    sa.Column('tipo_servicio', sa.String(length=20), nullable=False),
+    sa.Column('modalidad', sa.String(length=10), nullable=False),
+    sa.Column('vendedor', sa.String(length=120), nullable=False),
+    sa.Column('moneda', sa.String(length=3), nullable=False),
+    sa.Column('ofertadas', sa.Integer(), nullable=False),
+    sa.Column('ganadas', sa.Integer(), nullable=False),
+    sa.Column('perdidas', sa.Integer(), nullable=False),
+    sa.Column('venta_total', sa.Numeric(precision=18, scale=6), nullable=False),
+    sa.Column('profit_total', sa.Numeric(precision=18, scale=6), nullable=False),
+    sa.PrimaryKeyConstraint('id', name=op.f('pk_venta_rollup_diario')),
+    sa.UniqueConstraint('fecha', 'cliente', 'ruta', 'proveedor', 'tipo_servicio', 'modalidad',
+                        'vendedor', 'moneda', name='uq_venta_rollup_diario_clave')
+    )
+
+
+def downgrade():
+    op.drop_table('venta_rollup_diario')
@@ -0,0 +1,48 @@
+"""solicitud: tipo_servicio y modalidad desnormalizados (indexados)
+
+Revision ID: a41f9d3e6c27
+Revises: 5e8a0c2f7b91
+Create Date: 2026-10-19 11:48:05.774120
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a41f9d3e6c27'
+down_revision = '5e8a0c2f7b91'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Los tipos enum ya existen (solicitud_servicio); no se vuelven a crear
+    tipo_enum = sa.Enum('AEREO', 'MARITIMO', 'TERRESTRE', name='tipo_servicio_enum', create_type=False)
+    modalidad_enum = sa.Enum('FCL', 'LCL', name='modalidad_enum', create_type=False)
+
+    with op.batch_alter_table('solicitud', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('tipo_servicio', tipo_enum, nullable=True))
+        batch_op.add_column(sa.Column('modalidad', modalidad_enum, nullable=True))
+        batch_op.create_index(batch_op.f('ix_solicitud_tipo_servicio'), ['tipo_servicio'], unique=False)
+        batch_op.create_index(batch_op.f('ix_solicitud_modalidad'), ['modalidad'], unique=False)
+
+    # Backfill desde el SolicitudServicio de cada solicitud (uno por solicitud)
+    solicitud = sa.table('solicitud', sa.column('id', sa.Integer()),
+                         sa.column('tipo_servicio', tipo_enum), sa.column('modalidad', modalidad_enum))
+    ss = sa.table('solicitud_servicio', sa.column('solicitud_id', sa.Integer()),
+                  sa.column('tipo_servicio', tipo_enum), sa.column('modalidad', modalidad_enum))
+    op.execute(
+        solicitud.update().values(
+            tipo_servicio=sa.select(ss.c.tipo_servicio).where(ss.c.solicitud_id == solicitud.c.id).scalar_subquery(),
+            modalidad=sa.select(ss.c.modalidad).where(ss.c.solicitud_id == solicitud.c.id).scalar_subquery(),
+        )
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('solicitud', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_solicitud_modalidad'))
+        batch_op.drop_index(batch_op.f('ix_solicitud_tipo_servicio'))
+        batch_op.drop_column('modalidad')
+        batch_op.drop_column('tipo_servicio')
@@ -0,0 +1,26 @@
+"""cotizacion_opcion: version (bloqueo optimista)
+
+Revision ID: b73b03fb6a24
+Revises: 9b31bc48886c
+Create Date: 2026-10-19 18:03:37.448921
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b73b03fb6a24'
+down_revision = '9b31bc48886c'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('cotizacion_opcion', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade():
+    with op.batch_alter_table('cotizacion_opcion', schema=None) as batch_op:
+        batch_op.drop_column('version')
@@ -0,0 +1,72 @@
+"""cliente: nombre_norm (clave normalizada con índice único)
+
+Revision ID: c319654f191a
+Revises: 138bc19cbf08
+Create Date: 2026-10-19 10:14:37.551902
+
+"""
+import re
+import unicodedata
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c319654f191a'
+down_revision = '138bc19cbf08'
+branch_labels = None
+depends_on = None
+
+# Copia congelada de app.utils.normaliza.clave_cliente al escribir esta migración:
+# el backfill no debe cambiar si después cambia la normalización de la app.
+_SUFIJOS = sorted((
+    "sa de cv", "sapi de cv", "sab de cv", "s de rl de cv", "s de rl", "s en c",
+    "sc de rl", "sa", "sapi", "sab", "sc", "sas", "ac",
+    "inc", "llc", "ltd", "ltda", "corp", "co", "gmbh", "srl", "sl", "sa de cv sofom",
+), key=len, reverse=True)
+
+
+def _clave_cliente(nombre):
+    s = "".join(ch for ch in unicodedata.normalize("NFKD", (nombre or "").casefold())
+                if not unicodedata.combining(ch))
+    s = re.sub(r"[.'´`]", "", s)
+    s = re.sub(r"[^0-9a-z]+", " ", s).strip()
+    s = re.sub(r"\b([a-z]) (?=[a-z]\b)", r"\1", s)
+    base = s
+    cambio = True
+    while cambio:
+        cambio = False
+        for suf in _SUFIJOS:
+            if s.endswith(" " + suf):
+                s = s[: -len(suf) - 1].rstrip()
+                cambio = True
+                break
+    return s or base
+
+
+def upgrade():
+    with op.batch_alter_table('cliente', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('nombre_norm', sa.String(length=200), nullable=True))
+
+    # Backfill: el cliente más antiguo de cada clave se queda con ella; los duplicados
+    # quedan en NULL hasta que `flask deduplicar_clientes --fusionar` los junte.
+    conn = op.get_bind()
+    cliente = sa.table('cliente', sa.column('id', sa.Integer()), sa.column('nombre', sa.String()),
+                       sa.column('nombre_norm', sa.String()))
+    vistos = set()
+    for cid, nombre in conn.execute(sa.select(cliente.c.id, cliente.c.nombre).order_by(cliente.c.id)).all():
+        clave = _clave_cliente(nombre)
+        if clave in vistos:
+            continue
+        vistos.add(clave)
+        conn.execute(cliente.update().where(cliente.c.id == cid).values(nombre_norm=clave))
+
+    with op.batch_alter_table('cliente', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_cliente_nombre_norm'), ['nombre_norm'], unique=True)
+
+
+def downgrade():
+    with op.batch_alter_table('cliente', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_cliente_nombre_norm'))
+        batch_op.drop_column('nombre_norm')
@@ -0,0 +1,87 @@
+"""solicitud_evento (bitácora de estatus) y sla_histograma
+
+Revision ID: e03ee4a4b759
+Revises: 6f1d2b8e9a05
+Create Date: 2026-10-19 16:42:09.310558
+
+Siembra eventos aproximados con lo que ya existe: 'en cotizacion' en la primera opción,
+'ofertado' en la primera decisión y ganada/perdida en el último cambio de la solicitud
+(sólo si ese cambio es posterior a la última decisión).
+Tras aplicar: `flask reconstruir_sla` para llenar el histograma.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e03ee4a4b759'
+down_revision = '6f1d2b8e9a05'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('solicitud_evento',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('solicitud_id', sa.Integer(), nullable=False),
+    sa.Column('estatus_de', sa.String(length=40), nullable=True),
+    sa.Column('estatus_a', sa.String(length=40), nullable=False),
+    sa.Column('usuario_id', sa.Integer(), nullable=True),
+    sa.Column('fecha', sa.DateTime(), nullable=False),
+    sa.Column('duracion_seg', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['solicitud_id'], ['solicitud.id'], name=op.f('fk_solicitud_evento_solicitud_id_solicitud')),
+    sa.ForeignKeyConstraint(['usuario_id'], ['usuario.id'], name=op.f('fk_solicitud_evento_usuario_id_usuario')),
+    sa.PrimaryKeyConstraint('id', name=op.f('pk_solicitud_evento'))
+    )
+    with op.batch_alter_table('solicitud_evento', schema=None) as batch_op:
+        batch_op.create_index('ix_solicitud_evento_solicitud_fecha', ['solicitud_id', 'fecha'], unique=False)
+
+    op.create_table('sla_histograma',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('fecha', sa.Date(), nullable=False),
+    sa.Column('estatus', sa.String(length=40), nullable=False),
+    sa.Column('pricer', sa.String(length=120), nullable=False),
+    sa.Column('tipo_servicio', sa.String(length=20), nullable=False),
+    sa.Column('prioridad', sa.String(length=20), nullable=False),
+    sa.Column('cubeta', sa.Integer(), nullable=False),
+    sa.Column('n', sa.Integer(), nullable=False),
+    sa.Column('suma_seg', sa.BigInteger(), nullable=False),
+    sa.PrimaryKeyConstraint('id', name=op.f('pk_sla_histograma')),
+    sa.UniqueConstraint('fecha', 'estatus', 'pricer', 'tipo_servicio', 'prioridad', 'cubeta',
+                        name='uq_sla_histograma_clave')
+    )
+
+    # Siembra: un INSERT ... SELECT por transición, en orden cronológico por solicitud
+    op.execute("""
+        INSERT INTO solicitud_evento (solicitud_id, estatus_de, estatus_a, fecha)
+        SELECT solicitud_id, 'pendiente', 'en cotizacion', MIN(created_at)
+        FROM cotizacion_opcion WHERE created_at IS NOT NULL
+        GROUP BY solicitud_id
+    """)
+    op.execute("""
+        INSERT INTO solicitud_evento (solicitud_id, estatus_de, estatus_a, fecha)
+        SELECT solicitud_id, 'en cotizacion', 'ofertado', MIN(created_at)
+        FROM venta_decision WHERE created_at IS NOT NULL
+        GROUP BY solicitud_id
+    """)
+    # updated_at se llenó con fecha_solicitud en las solicitudes sin cambios (e7b2d54c18a3):
+    # sólo sirve como fecha de cierre si es posterior a la última decisión. Si no, no hay
+    # fecha confiable y el cierre no se siembra (mejor sin dato que con una duración inventada).
+    op.execute("""
+        INSERT INTO solicitud_evento (solicitud_id, estatus_de, estatus_a, fecha)
+        SELECT s.id, 'ofertado', s.estatus, s.updated_at
+        FROM solicitud s
+        JOIN (SELECT solicitud_id, MAX(created_at) AS ultima
+              FROM venta_decision WHERE created_at IS NOT NULL
+              GROUP BY solicitud_id) d ON d.solicitud_id = s.id
+        WHERE s.estatus IN ('ganada', 'perdida')
+          AND s.updated_at > d.ultima
+    """)
+
+
+def downgrade():
+    op.drop_table('sla_histograma')
+    with op.batch_alter_table('solicitud_evento', schema=None) as batch_op:
+        batch_op.drop_index('ix_solicitud_evento_solicitud_fecha')
+
+    op.drop_table('solicitud_evento')
@@ -0,0 +1,34 @@
+"""solicitud: updated_at (para ETag/Last-Modified)
+
+Revision ID: e7b2d54c18a3
+Revises: a41f9d3e6c27
+Create Date: 2026-10-19 12:31:40.092215
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e7b2d54c18a3'
+down_revision = 'a41f9d3e6c27'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('solicitud', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('updated_at', sa.DateTime(), nullable=True))
+
+    solicitud = sa.table('solicitud', sa.column('fecha_solicitud', sa.DateTime()), sa.column('updated_at', sa.DateTime()))
+    op.execute(solicitud.update().values(
+        updated_at=sa.func.coalesce(solicitud.c.fecha_solicitud, sa.func.now())
+    ))
+
+    with op.batch_alter_table('solicitud', schema=None) as batch_op:
+        batch_op.alter_column('updated_at', existing_type=sa.DateTime(), nullable=False)
+
+
+def downgrade():
+    with op.batch_alter_table('solicitud', schema=None) as batch_op:
+        batch_op.drop_column('updated_at')
@@ -0,0 +1,40 @@
+"""api_token: tokens de sólo lectura para /api/v1
+
+Revision ID: f0c6a18b39d4
+Revises: e7b2d54c18a3
+Create Date: 2026-10-19 13:20:11.462987
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f0c6a18b39d4'
+down_revision = 'e7b2d54c18a3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('api_token',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('nombre', sa.String(length=120), nullable=False),
+    sa.Column('token_hash', sa.String(length=64), nullable=False),
+    sa.Column('scope', sa.String(length=40), nullable=False),
+    sa.Column('usuario_id', sa.Integer(), nullable=True),
+    sa.Column('activo', sa.Boolean(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('last_used_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['usuario_id'], ['usuario.id'], name=op.f('fk_api_token_usuario_id_usuario')),
+    sa.PrimaryKeyConstraint('id', name=op.f('pk_api_token'))
+    )
+    with op.batch_alter_table('api_token', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_api_token_token_hash'), ['token_hash'], unique=True)
+
+
+def downgrade():
+    with op.batch_alter_table('api_token', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_api_token_token_hash'))
+
+    op.drop_table('api_token')
@@ -0,0 +1,71 @@
+# tests/test_archivo.py
+import importlib
+from datetime import datetime, timedelta
+
+import pytest
+
+
+@pytest.fixture()
+def app(tmp_path, monkeypatch):
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{tmp_path / 'app.db'}")
+    monkeypatch.setenv("ARCHIVO_DB", str(tmp_path / "archivo.db"))
+    import config
+    importlib.reload(config)
+
+    from app import create_app, db
+    app = create_app()
+    app.config["TESTING"] = True
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+
+
+def _folio_cerrado(codigo, usuario_id):
+    """Folio con una solicitud ganada hace años, con opción y decisión."""
+    from app import db
+    from app.models import ClienteTipo, CotizacionOpcion, Folio, Solicitud, VentaDecision
+
+    viejo = datetime.utcnow() - timedelta(days=3 * 365)
+    f = Folio(codigo=codigo)
+    db.session.add(f)
+    db.session.flush()
+    s = Solicitud(folio_id=f.id, child_seq=1, numero_serie=f"{codigo}-01", usuario_id=usuario_id,
+                  cliente="ACME", cliente_tipo=ClienteTipo.CLIENTE, servicios_solicitados=["aereo"],
+                  estatus="ganada", fecha_solicitud=viejo, updated_at=viejo)
+    db.session.add(s)
+    db.session.flush()
+    op = CotizacionOpcion(solicitud_id=s.id, proveedor="P")
+    db.session.add(op)
+    db.session.flush()
+    dec = VentaDecision(solicitud_id=s.id, opcion_id=op.id, moneda="MXN", pdf_path=f"{codigo}.pdf")
+    db.session.add(dec)
+    db.session.commit()
+    return f.id, s.id, dec.id
+
+
+def test_ids_archivados_no_se_reusan(app):
+    from app import db
+    from app.models import Folio, Solicitud, User, VentaDecision
+    from app.services import archivo
+
+    u = User(email="a@a", rol="admin", nombre="A")
+    u.set_password("x")
+    db.session.add(u)
+    db.session.commit()
+
+    _folio_cerrado("F-VIEJO", u.id)
+    archivado = _folio_cerrado("F-ARCHIVADO", u.id)  # el más nuevo: sus ids son los máximos
+    archivo.preparar()
+    movidas = archivo.archivar_lote([archivado[0]], [archivado[1]])
+    assert movidas["folio"] == 1 and movidas["venta_decision"] == 1
+
+    nuevo = _folio_cerrado("F-NUEVO", u.id)
+    assert all(n > a for n, a in zip(nuevo, archivado))
+
+    for modelo, i, codigo in ((Folio, 0, "codigo"), (Solicitud, 1, "numero_serie"),
+                              (VentaDecision, 2, "pdf_path")):
+        obj, en_archivo = archivo.obtener(modelo, archivado[i])
+        assert en_archivo and getattr(obj, codigo).startswith("F-ARCHIVADO")
+        obj, en_archivo = archivo.obtener(modelo, nuevo[i])
+        assert not en_archivo and getattr(obj, codigo).startswith("F-NUEVO")